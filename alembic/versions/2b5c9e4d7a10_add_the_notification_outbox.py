@@ -0,0 +1,39 @@
+"""Add the Notification table used as outbox
+
+Revision ID: 2b5c9e4d7a10
+Revises: 4a1f6c2e8b93
+Create Date: 2026-10-17 14:21:53.118402
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '2b5c9e4d7a10'
+down_revision = '4a1f6c2e8b93'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    ''' Add the Notification table storing the fedmsg messages and emails
+    to send.
+    '''
+    op.create_table(
+        'Notification',
+        sa.Column('id', sa.Integer, nullable=False, primary_key=True),
+        sa.Column('kind', sa.String(10), nullable=False),
+        sa.Column('user', sa.String(32), nullable=False),
+        sa.Column('topic', sa.Text, nullable=True),
+        sa.Column('package_name', sa.String(200), nullable=True),
+        sa.Column('subject', sa.Text, nullable=True),
+        sa.Column('content', sa.Text, nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False, default=0),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('date_created', sa.DateTime, nullable=False),
+    )
+
+
+def downgrade():
+    ''' Drop the Notification table.
+    '''
+    op.drop_table('Notification')
@@ -0,0 +1,34 @@
+"""Index the ACLs per user, acl and status
+
+Revision ID: 3c9ebf6e5d47
+Revises: 1f179f37f12b
+Create Date: 2026-10-17 09:12:41.318209
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3c9ebf6e5d47'
+down_revision = '1f179f37f12b'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    ''' Add an index on the `fas_name`, `acl`, `status` and
+    `packagelisting_id` columns of the PackageListingAcl table.
+    '''
+    op.create_index(
+        'ix_PackageListingAcl_fas_name_acl_status',
+        'PackageListingAcl',
+        ['fas_name', 'acl', 'status', 'packagelisting_id'],
+    )
+
+
+def downgrade():
+    ''' Drop the index on the `fas_name`, `acl`, `status` and
+    `packagelisting_id` columns of the PackageListingAcl table.
+    '''
+    op.drop_index(
+        'ix_PackageListingAcl_fas_name_acl_status',
+        table_name='PackageListingAcl')
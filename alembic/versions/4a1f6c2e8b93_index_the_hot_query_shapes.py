@@ -0,0 +1,53 @@
+"""Index the ACLs per package listing and the listings per collection
+
+Revision ID: 4a1f6c2e8b93
+Revises: 3c9ebf6e5d47
+Create Date: 2026-10-17 11:02:17.540381
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4a1f6c2e8b93'
+down_revision = '3c9ebf6e5d47'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    ''' Add an index on the `packagelisting_id`, `acl` and `status`
+    columns of the PackageListingAcl table, a partial index on its pending
+    ACLs and an index on the `collection_id` and `status` columns of the
+    PackageListing table.
+    '''
+    op.create_index(
+        'ix_PackageListingAcl_packagelisting_id_acl_status',
+        'PackageListingAcl',
+        ['packagelisting_id', 'acl', 'status'],
+    )
+    op.create_index(
+        'ix_PackageListingAcl_awaiting_review',
+        'PackageListingAcl',
+        ['packagelisting_id'],
+        postgresql_where=sa.text("status = 'Awaiting Review'"),
+    )
+    op.create_index(
+        'ix_PackageListing_collection_id_status',
+        'PackageListing',
+        ['collection_id', 'status'],
+    )
+
+
+def downgrade():
+    ''' Drop the indexes on the PackageListingAcl and PackageListing
+    tables added in the upgrade.
+    '''
+    op.drop_index(
+        'ix_PackageListing_collection_id_status',
+        table_name='PackageListing')
+    op.drop_index(
+        'ix_PackageListingAcl_awaiting_review',
+        table_name='PackageListingAcl')
+    op.drop_index(
+        'ix_PackageListingAcl_packagelisting_id_acl_status',
+        table_name='PackageListingAcl')
@@ -0,0 +1,45 @@
+"""Add the LogArchive table
+
+Revision ID: 5d3e7f1a9c24
+Revises: 2b5c9e4d7a10
+Create Date: 2026-10-17 16:05:32.604127
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5d3e7f1a9c24'
+down_revision = '2b5c9e4d7a10'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    ''' Add the LogArchive table in which the old Log entries are moved.
+    '''
+    op.create_table(
+        'LogArchive',
+        sa.Column('id', sa.Integer, nullable=False, primary_key=True,
+                  autoincrement=False),
+        sa.Column('user', sa.String(32), nullable=False, index=True),
+        sa.Column('change_time', sa.DateTime, nullable=False, index=True),
+        sa.Column(
+            'package_id',
+            sa.Integer,
+            sa.ForeignKey(
+                'Package.id', ondelete='SET NULL', onupdate='CASCADE'),
+            nullable=True,
+            index=True),
+        sa.Column('description', sa.Text, nullable=False),
+    )
+
+
+def downgrade():
+    ''' Move the archived entries back to the Log table and drop the
+    LogArchive table.
+    '''
+    op.execute(
+        'INSERT INTO "Log" (id, "user", change_time, package_id, '
+        'description) SELECT id, "user", change_time, package_id, '
+        'description FROM "LogArchive"')
+    op.drop_table('LogArchive')
@@ -0,0 +1,41 @@
+"""Index the search of the packages
+
+Revision ID: 6e2a4b8c1d35
+Revises: 5d3e7f1a9c24
+Create Date: 2026-10-17 17:42:18.315064
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '6e2a4b8c1d35'
+down_revision = '5d3e7f1a9c24'
+
+from alembic import op
+
+
+def upgrade():
+    ''' Install the pg_trgm extension and index the name, summary and
+    description of the packages as searched by Package.search_text.
+
+    The other databases search the packages with an in-memory index.
+    '''
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(
+        'CREATE INDEX "ix_Package_name_trgm" ON "Package" '
+        'USING gin (lower(name) gin_trgm_ops)')
+    op.execute(
+        'CREATE INDEX "ix_Package_text_search" ON "Package" '
+        'USING gin (to_tsvector(\'english\', '
+        'coalesce(summary, \'\') || \' \' || coalesce(description, \'\')))')
+
+
+def downgrade():
+    ''' Drop the indexes used to search the packages. '''
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX "ix_Package_text_search"')
+    op.execute('DROP INDEX "ix_Package_name_trgm"')
@@ -0,0 +1,36 @@
+"""Persist the Awaiting Review status of the admin actions
+
+Revision ID: 8b4d2f6a1e57
+Revises: 6e2a4b8c1d35
+Create Date: 2026-10-17 21:14:51.207318
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8b4d2f6a1e57'
+down_revision = '6e2a4b8c1d35'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    ''' Add an index on the `status`, `date_created` and `id` columns of
+    the admin_actions table, used to list the actions having a given
+    status.
+
+    The actions Pending for more than 7 days are moved to Awaiting Review
+    by the next run of the ``pkgdb2_pending_actions.py`` script.
+    '''
+    op.create_index(
+        'ix_admin_actions_status_date_created',
+        'admin_actions',
+        ['status', 'date_created', 'id'],
+    )
+
+
+def downgrade():
+    ''' Drop the index on the admin_actions table added in the upgrade. '''
+    op.drop_index(
+        'ix_admin_actions_status_date_created',
+        table_name='admin_actions')
@@ -0,0 +1,70 @@
+"""Add the PendingAcl inbox
+
+Revision ID: 9c1e5a7d3b28
+Revises: 8b4d2f6a1e57
+Create Date: 2026-10-17 22:03:17.482915
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '9c1e5a7d3b28'
+down_revision = '8b4d2f6a1e57'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    ''' Add the PendingAcl table, keeping for each user the ACLs awaiting
+    review they can approve, and fill it from the current ACLs.
+    '''
+    op.create_table(
+        'PendingAcl',
+        sa.Column('approver', sa.Text, nullable=False, primary_key=True),
+        sa.Column(
+            'acl_id',
+            sa.Integer,
+            sa.ForeignKey(
+                'PackageListingAcl.id', ondelete='CASCADE',
+                onupdate='CASCADE'),
+            nullable=False,
+            primary_key=True),
+        sa.Column(
+            'packagelisting_id',
+            sa.Integer,
+            sa.ForeignKey(
+                'PackageListing.id', ondelete='CASCADE', onupdate='CASCADE'),
+            nullable=False,
+            index=True),
+    )
+    op.execute(
+        'INSERT INTO "PendingAcl" (approver, acl_id, packagelisting_id) '
+        'SELECT "PackageListing".point_of_contact, pending.id, '
+        '"PackageListing".id '
+        'FROM "PackageListingAcl" AS pending '
+        'JOIN "PackageListing" '
+        'ON pending.packagelisting_id = "PackageListing".id '
+        'JOIN "Collection" '
+        'ON "PackageListing".collection_id = "Collection".id '
+        'WHERE pending.status = \'Awaiting Review\' '
+        'AND "PackageListing".status = \'Approved\' '
+        'AND "Collection".status != \'EOL\' '
+        'UNION '
+        'SELECT approver.fas_name, pending.id, "PackageListing".id '
+        'FROM "PackageListingAcl" AS pending '
+        'JOIN "PackageListing" '
+        'ON pending.packagelisting_id = "PackageListing".id '
+        'JOIN "Collection" '
+        'ON "PackageListing".collection_id = "Collection".id '
+        'JOIN "PackageListingAcl" AS approver '
+        'ON approver.packagelisting_id = "PackageListing".id '
+        'WHERE pending.status = \'Awaiting Review\' '
+        'AND "PackageListing".status = \'Approved\' '
+        'AND "Collection".status != \'EOL\' '
+        'AND approver.acl = \'approveacls\' '
+        'AND approver.status = \'Approved\'')
+
+
+def downgrade():
+    ''' Drop the PendingAcl table. '''
+    op.drop_table('PendingAcl')
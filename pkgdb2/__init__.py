@@ -27,6 +27,7 @@ import logging
 import logging.handlers
 import os
 import sys
+import threading
 import urlparse
 
 import flask
@@ -56,12 +57,45 @@ if APP.config.get('LOGGER_CONFIG_FILE') \
 # Set up FAS extension
 FAS = FAS(APP)
 
+
+def refresh_in_background(cache, key, creator, mutex):
+    """ Regenerate an expired value of the cache in a thread.
+
+    Used by dogpile when a value of the cache has expired but is still
+    present: the expired value is returned to the caller while the new one
+    is being retrieved, instead of blocking the request on it.
+
+    """
+    def runner():
+        """ Retrieve and store the new value. """
+        try:
+            cache.set(key, creator())
+        except Exception, err:  # pragma: no cover
+            # Keep the expired value, it will be retried on the next access
+            APP.logger.exception(err)
+        finally:
+            mutex.release()
+
+    thread = threading.Thread(target=runner)
+    thread.daemon = True
+    thread.start()
+
+
 # Initialize the cache.
 CACHE = dogpile.cache.make_region().configure(
     APP.config.get('PKGDB2_CACHE_BACKEND', 'dogpile.cache.memory'),
     **APP.config.get('PKGDB2_CACHE_KWARGS', {})
 )
 
+# The information retrieved from FAS is cached in its own region, using the
+# same backend, whose expired values are refreshed in the background.
+FAS_CACHE = dogpile.cache.make_region(
+    async_creation_runner=refresh_in_background,
+).configure(
+    APP.config.get('PKGDB2_CACHE_BACKEND', 'dogpile.cache.memory'),
+    **APP.config.get('PKGDB2_CACHE_KWARGS', {})
+)
+
 if not APP.debug:
     APP.logger.addHandler(pkgdb2.mail_logging.get_mail_handler(
         smtp_server=APP.config.get('SMTP_SERVER', '127.0.0.1'),
@@ -76,6 +110,7 @@ APP.logger.addHandler(STDERR_LOG)
 LOG = APP.logger
 
 import pkgdb2.lib as pkgdblib
+import pkgdb2.lib.aclgraph
 import pkgdb2.proxy
 
 APP.wsgi_app = pkgdb2.proxy.ReverseProxied(APP.wsgi_app)
@@ -251,6 +286,14 @@ def shutdown_session(exception=None):
     SESSION.remove()
 
 
+@APP.before_first_request
+def load_acl_graph():
+    """ Load the in-memory graph of the ACLs when it is enabled, instead
+    of on the first request using it. """
+    if APP.config.get('PKGDB2_ACL_GRAPH', False):
+        pkgdb2.lib.aclgraph.get_graph(SESSION)
+
+
 # pylint: disable=W0613
 @APP.before_request
 def set_session():
@@ -28,10 +28,25 @@ import flask
 
 API = flask.Blueprint('api_ns', __name__, url_prefix='/api')
 
+import pkgdb2.lib.aclgraph
+import pkgdb2.lib.snapshots
 from pkgdb2 import __version__, __api_version__, APP
 from pkgdb2.doc_utils import load_doc
 
 
+# GET endpoints whose output does not depend only on the database: the
+# documentation shows the user logged in and the dead.package files come
+# from cgit
+NO_ETAG_ENDPOINTS = ['api_ns.api', 'api_ns.api_dead_package']
+
+# GET endpoints answered from the in-memory graph of the ACLs when
+# PKGDB2_ACL_GRAPH is set
+ACL_GRAPH_ENDPOINTS = [
+    'api_ns.api_notify', 'api_ns.api_notify_all', 'api_ns.api_critpath',
+    'api_ns.api_groups',
+]
+
+
 def get_limit():
     """ Retrieve the limit used to limit the output retrieved. """
     limit = flask.request.args.get('limit', 250)
@@ -54,6 +69,77 @@ from pkgdb2.api import packagers
 from pkgdb2.api import packages
 
 
+def _get_data_versions():
+    """ Return the versions of the data the output of the current request
+    depends on or None if they are not known.
+
+    Most of the endpoints depend on the version of all the data, the
+    information about a single package only depends on the version of this
+    package and of the collections.
+    """
+    endpoint = flask.request.endpoint
+    versions = []
+    if endpoint in ACL_GRAPH_ENDPOINTS \
+            and APP.config.get('PKGDB2_ACL_GRAPH', False):
+        # The graph may be older than the data, use its own version
+        version = pkgdb2.lib.aclgraph.get_version()
+        if version is None:
+            return None
+        versions.append(str(version))
+        scopes = ['catalog']
+    else:
+        pkg_name = flask.request.args.get(
+            'pkgname', (flask.request.view_args or {}).get('pkgname'))
+        if endpoint == 'api_ns.api_package_info' and pkg_name:
+            scopes = [
+                pkgdb2.lib.snapshots.package_scope(pkg_name), 'catalog']
+        else:
+            scopes = ['data']
+
+    generations = pkgdb2.lib.snapshots.get_generations(scopes)
+    if None in generations:
+        return None
+    return versions + generations
+
+
+@API.before_request
+def check_etag():
+    """ Compute the ETag of the GET requests from the version of the data
+    they return and answer them with a ``304 Not Modified`` if it matches
+    the ``If-None-Match`` header, before running any query.
+    """
+    flask.g.api_etag = None
+    if flask.request.method not in ('GET', 'HEAD') \
+            or flask.request.endpoint in NO_ETAG_ENDPOINTS:
+        return
+
+    versions = _get_data_versions()
+    if versions is None:
+        return
+
+    flask.g.api_etag = pkgdb2.lib.snapshots.compute_etag('\n'.join(
+        versions + [
+            flask.request.full_path,
+            flask.request.headers.get('Accept', ''),
+        ]))
+
+    if flask.request.if_none_match.contains_weak(flask.g.api_etag):
+        response = flask.Response(status=304)
+        response.set_etag(flask.g.api_etag, weak=True)
+        return response
+
+
+@API.after_request
+def set_etag(response):
+    """ Add the ETag computed by ``check_etag`` to the successful
+    responses not having their own. """
+    etag = getattr(flask.g, 'api_etag', None)
+    if etag and response.status_code == 200 \
+            and 'ETag' not in response.headers:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 @APP.template_filter('InsertDiv')
 def insert_div(content):
     """ Template filter inserting an opening <div> and closing </div>
@@ -103,10 +189,13 @@ def api():
     api_package_retire = load_doc(packages.api_package_retire)
     api_package_unretire = load_doc(packages.api_package_unretire)
     api_package_list = load_doc(packages.api_package_list)
+    api_package_batch = load_doc(packages.api_package_batch)
+    api_search = load_doc(packages.api_search)
     api_monitor_package = load_doc(packages.api_monitor_package)
     api_koschei_package = load_doc(packages.api_koschei_package)
 
     api_acl_update = load_doc(acls.api_acl_update)
+    api_acl_update_bulk = load_doc(acls.api_acl_update_bulk)
     api_acl_reassign = load_doc(acls.api_acl_reassign)
 
     api_admin_actions = load_doc(admin.api_admin_actions)
@@ -120,10 +209,12 @@ def api():
     api_extras_notify_all = load_doc(extras.api_notify_all)
     api_extras_vcs = load_doc(extras.api_vcs)
     api_extras_pendingacls = load_doc(extras.api_pendingacls)
+    api_extras_pendingacls_count = load_doc(extras.api_pendingacls_count)
     api_extras_api_groups = load_doc(extras.api_groups)
     api_extras_monitored = load_doc(extras.api_monitored)
     api_extras_koschei = load_doc(extras.api_koschei)
     api_extras_retired = load_doc(extras.api_retired)
+    api_extras_stats = load_doc(extras.api_stats)
 
     return flask.render_template(
         'api.html',
@@ -137,14 +228,15 @@ def api():
             api_packager_stats
         ],
         packages=[
-            api_package_info, api_package_list,
+            api_package_info, api_package_batch, api_package_list,
+            api_search,
             api_package_new, api_package_edit,
             api_package_critpath, api_monitor_package, api_koschei_package,
             api_package_orphan, api_package_unorphan,
             api_package_retire, api_package_unretire,
         ],
         acls=[
-            api_acl_update, api_acl_reassign,
+            api_acl_update, api_acl_update_bulk, api_acl_reassign,
         ],
         other=[
             api_version_doc,
@@ -156,8 +248,10 @@ def api():
             api_extras_bugzilla, api_extras_critpath,
             api_extras_notify, api_extras_notify_all,
             api_extras_vcs, api_extras_pendingacls,
+            api_extras_pendingacls_count,
             api_extras_api_groups, api_extras_monitored,
             api_extras_koschei, api_extras_retired,
+            api_extras_stats,
         ]
     )
 
@@ -156,6 +156,117 @@ def api_acl_update():
     return jsonout
 
 
+@API.route('/package/acl/bulk/', methods=['POST'])
+@pkgdb2.packager_login_required
+def api_acl_update_bulk():
+    '''
+    Update many ACLs
+    ----------------
+    Update in a single transaction the ACLs of many users on many packages
+    and branches.
+
+    ::
+
+        /api/package/acl/bulk/
+
+    Accepts POST queries only.
+
+    The ACLs to update are specified as lists of the same length, the
+    n-th element of each list describing the n-th ACL to update.
+
+    :arg pkgnames: List of strings of the package names.
+    :arg branches: List of strings of the branch names.
+    :arg acls: List of strings of the ACLs to change/update. Possible acl
+        are: 'commit', 'build', 'watchbugzilla', 'watchcommits',
+        'approveacls', 'checkout'.
+    :arg users: List of strings of the names of the users that are the
+        target of the ACL change/update.
+    :arg acl_status: List of strings of the status to set or a single
+        status to set for all the ACLs. Possible status are: 'Approved',
+        'Awaiting Review', 'Denied', 'Obsolete', 'Removed'.
+
+    Sample response:
+
+    ::
+
+        {
+          "output": "ok",
+          "messages": ["user: $USER set for $TARGET acl: $ACL of package: "
+                       "$PACKAGE from: $PREVIOUS_STATUS to: $NEW_STATUS "
+                       "on branch: $BRANCH"]
+        }
+
+        {
+          "output": "notok",
+          "error": "You are not allowed to update ACLs of someone else."
+        }
+
+    '''
+    httpcode = 200
+    output = {}
+
+    pkgnames = flask.request.form.getlist('pkgnames', None)
+    branches = flask.request.form.getlist('branches', None)
+    acls = flask.request.form.getlist('acls', None)
+    users = flask.request.form.getlist('users', None)
+    acl_status = flask.request.form.getlist('acl_status', None)
+    if len(acl_status) == 1:
+        acl_status = acl_status * len(pkgnames)
+
+    status = pkgdblib.get_status(SESSION, ['pkg_acl', 'acl_status'])
+    collections = pkgdblib.search_collection(
+        SESSION, '*', 'Under Development')
+    collections.extend(pkgdblib.search_collection(SESSION, '*', 'Active'))
+    collections = set([col.branchname for col in collections])
+
+    errors = []
+    if not pkgnames or len(set([
+            len(pkgnames), len(branches), len(acls), len(users),
+            len(acl_status)])) != 1:
+        errors.append(
+            'pkgnames, branches, acls, users and acl_status must be lists '
+            'of the same length')
+    else:
+        for branch in set(branches) - collections:
+            errors.append('branches: "%s" is not a valid choice' % branch)
+        for acl in set(acls) - set(status['pkg_acl']):
+            errors.append('acls: "%s" is not a valid choice' % acl)
+        for stat in set(acl_status) - set(status['acl_status']):
+            errors.append('acl_status: "%s" is not a valid choice' % stat)
+        if not all(users):
+            errors.append('users: This field is required.')
+
+    if errors:
+        output['output'] = 'notok'
+        output['error'] = 'Invalid input submitted'
+        output['error_detail'] = errors
+        httpcode = 500
+    else:
+        entries = []
+        for pkg_name, branch, acl, user, acl_status2 in zip(
+                pkgnames, branches, acls, users, acl_status):
+            if acl_status2 == 'Awaiting Review' and \
+                    acl in APP.config['AUTO_APPROVE']:
+                acl_status2 = 'Approved'
+            entries.append((pkg_name, branch, user, acl, acl_status2))
+
+        try:
+            messages = pkgdblib.set_acl_packages(
+                SESSION, entries, user=flask.g.fas_user)
+            SESSION.commit()
+            output['output'] = 'ok'
+            output['messages'] = messages or ['Nothing to update']
+        except pkgdblib.PkgdbException, err:
+            SESSION.rollback()
+            output['output'] = 'notok'
+            output['error'] = str(err)
+            httpcode = 500
+
+    jsonout = flask.jsonify(output)
+    jsonout.status_code = httpcode
+    return jsonout
+
+
 @API.route('/package/acl/reassign/', methods=['POST'])
 @pkgdb2.packager_login_required
 def api_acl_reassign():
@@ -57,6 +57,11 @@ List admin actions
     :kwarg limit: An integer to limit the number of results, defaults to
         250, maximum is 500.
     :kwarg page: The page number to return (useful in combination to limit).
+    :kwarg after: The ``cursor`` returned with the previous page, to return
+        the actions following it.
+
+    When the page is full, a ``cursor`` is returned to use as ``after``
+    argument to retrieve the next page.
 
     Sample response:
 
@@ -120,6 +125,7 @@ List admin actions
     action = flask.request.args.get('action', None)
     status = flask.request.args.get('status', None)
     page = flask.request.args.get('page', 1)
+    after = flask.request.args.get('after', None)
     limit = get_limit()
 
     httpcode = 200
@@ -132,16 +138,22 @@ List admin actions
 
     actions = []
     cnt_actions = 0
+    more = False
     try:
+        # Past a cursor, retrieve one more action to know if others follow
         actions = pkgdblib.search_actions(
             SESSION,
             package=package or None,
             packager=packager or None,
             action=action,
             status=status,
-            limit=limit,
-            page=page
+            limit=limit + 1 if after and limit else limit,
+            page=page,
+            after=after,
         )
+        if after and limit:
+            more = len(actions) > limit
+            actions = actions[:limit]
 
         cnt_actions += pkgdblib.search_actions(
             SESSION,
@@ -151,18 +163,18 @@ List admin actions
             status=status,
             count=True,
         )
-    except pkgdblib.PkgdbException, err:  # pragma: no cover
+    except pkgdblib.PkgdbException, err:
         SESSION.rollback()
         output['output'] = 'notok'
         output['error'] = str(err)
         httpcode = 500
 
-    if not actions:
+    if not actions and httpcode == 200:
         output['output'] = 'notok'
         output['actions'] = []
         output['error'] = 'No actions found for these parameters'
         httpcode = 404
-    else:
+    elif actions:
         output['actions'] = [
             act.to_json()
             for act in actions
@@ -170,6 +182,11 @@ List admin actions
         output['output'] = 'ok'
         output['page'] = int(page)
         output['page_total'] = int(ceil(cnt_actions / float(limit)))
+        if not after:
+            more = limit and (max(page, 1) - 1) * limit + len(actions) \
+                < cnt_actions
+        if more:
+            output['cursor'] = pkgdblib.get_cursor(actions[-1])
 
     if 'page_total' not in output:
         output['page'] = 1
@@ -23,14 +23,24 @@
 Extras API endpoints for the Flask application.
 '''
 
+import json
+
 import flask
 import requests
 
 import pkgdb2.lib as pkgdblib
+import pkgdb2.lib.aclgraph
+import pkgdb2.lib.snapshots
 from pkgdb2 import SESSION, APP
 from pkgdb2.api import API
 
 
+VCS_INTRO = """# VCS ACLs
+# avail|@groups,users|rpms/Package/branch
+
+"""
+
+
 def request_wants_json():
     """ Return weather a json output was requested. """
     best = flask.request.accept_mimetypes \
@@ -40,6 +50,48 @@ def request_wants_json():
         flask.request.accept_mimetypes['text/html']
 
 
+def _acl_graph():
+    ''' Return the in-memory graph of the ACLs if ``PKGDB2_ACL_GRAPH`` is
+    set, None otherwise.
+    '''
+    if not APP.config.get('PKGDB2_ACL_GRAPH', False):
+        return None
+    return pkgdb2.lib.aclgraph.get_graph(SESSION)
+
+
+def _stream_lines(lines, intro='', separator='', chunk_size=500):
+    ''' Stream the provided lines as a chunked text response.
+
+    The lines are consumed while the response is being sent, the request
+    context (and thus the database session) is kept alive until they have
+    all been sent.
+
+    :arg lines: an iterable of the lines to send.
+    :kwarg intro: a text to send before the lines.
+    :kwarg separator: the text to insert between two lines.
+    :kwarg chunk_size: the number of lines to send per chunk.
+
+    '''
+    def _generate():
+        ''' Group the lines into chunks. '''
+        chunk = [intro]
+        sep = ''
+        for line in lines:
+            chunk.append(sep)
+            chunk.append(line)
+            sep = separator
+            if len(chunk) >= 2 * chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    return flask.Response(
+        flask.stream_with_context(_generate()),
+        content_type="text/plain;charset=UTF-8"
+    )
+
+
 #@pkgdb.CACHE.cache_on_arguments(expiration_time=3600)
 def _bz_acls_cached(name=None, out_format='text'):
     '''Return the package attributes used by bugzilla.
@@ -61,48 +113,50 @@ def _bz_acls_cached(name=None, out_format='text'):
             is listed here
         :summary: Short description of the package
         :cclist: list of FAS userids that are watching the package
+
+    For the text format, an iterator over the lines is returned, the data
+    being retrieved from the database while iterating.
     '''
 
-    packages = pkgdblib.bugzilla(
+    packages = pkgdblib.iter_bugzilla(
         session=SESSION,
         name=name)
 
-    output = []
-    if out_format == 'json':
-        output = {'bugzillaAcls': {},
-                  'title': 'Fedora Package Database -- Bugzilla ACLs'}
-
-    for clt in sorted(packages):
-        for pkg in sorted(packages[clt]):
-            if out_format == 'json':
-                user = []
-                group = []
-                for ppl in packages[clt][pkg]['cc'].split(','):
-                    if ppl.startswith('group::'):
-                        group.append(ppl.replace('group::', '@').encode('UTF-8'))
-                    elif ppl:
-                        user.append(ppl.encode('UTF-8'))
-                poc = packages[clt][pkg]['poc']
-                if poc.startswith('group::'):
-                    poc = poc.replace('group::', '@')
-
-                if clt not in output['bugzillaAcls']:
-                    output['bugzillaAcls'][clt.encode('UTF-8')] = {}
-
-                output['bugzillaAcls'][clt][pkg.encode('UTF-8')] = {
-                    'owner': poc.encode('UTF-8'),
-                    'cclist': {
-                        'groups': group,
-                        'people': user,
-                    },
-                    'qacontact': None,
-                    'summary': packages[clt][pkg]['summary'].encode('UTF-8')
-                }
-            else:
-                output.append(
-                    '%(collection)s|%(name)s|%(summary)s|%(poc)s|%(qa)s'
-                    '|%(cc)s' % (packages[clt][pkg])
-                )
+    if out_format != 'json':
+        return (
+            '%(collection)s|%(name)s|%(summary)s|%(poc)s|%(qa)s'
+            '|%(cc)s' % pkg
+            for pkg in packages
+        )
+
+    output = {'bugzillaAcls': {},
+              'title': 'Fedora Package Database -- Bugzilla ACLs'}
+
+    for pkg in packages:
+        clt = pkg['collection']
+        user = []
+        group = []
+        for ppl in pkg['cc'].split(','):
+            if ppl.startswith('group::'):
+                group.append(ppl.replace('group::', '@').encode('UTF-8'))
+            elif ppl:
+                user.append(ppl.encode('UTF-8'))
+        poc = pkg['poc']
+        if poc.startswith('group::'):
+            poc = poc.replace('group::', '@')
+
+        if clt not in output['bugzillaAcls']:
+            output['bugzillaAcls'][clt.encode('UTF-8')] = {}
+
+        output['bugzillaAcls'][clt][pkg['name'].encode('UTF-8')] = {
+            'owner': poc.encode('UTF-8'),
+            'cclist': {
+                'groups': group,
+                'people': user,
+            },
+            'qacontact': None,
+            'summary': pkg['summary'].encode('UTF-8')
+        }
     return output
 
 
@@ -120,25 +174,32 @@ def _bz_notify_cache(
     :kwarg eol: Set to True if you want to include end of life
         distributions
     :kwarg out_format: Specify if the output if text or json.
+
+    For the text format, an iterator over the lines is returned, the data
+    being retrieved from the database while iterating.
     '''
-    packages = pkgdblib.notify(
-        session=SESSION,
-        eol=eol,
-        name=name,
-        version=version,
-        acls=acls)
-    output = []
-    if out_format == 'json':
-        output = {'packages': {},
-                  'eol': eol,
-                  'name': name,
-                  'version': version,
-                  'title': 'Fedora Package Database -- Notification List'}
-    for package in sorted(packages):
-        if out_format == 'json':
-            output['packages'][package] = packages[package].split(',')
-        else:
-            output.append('%s|%s\n' % (package, packages[package]))
+    graph = _acl_graph()
+    if graph is not None:
+        packages = graph.iter_notify(
+            eol=eol, name=name, version=version, acls=acls)
+    else:
+        packages = pkgdblib.iter_notify(
+            session=SESSION,
+            eol=eol,
+            name=name,
+            version=version,
+            acls=acls)
+
+    if out_format != 'json':
+        return ('%s|%s\n' % (package, users) for package, users in packages)
+
+    output = {'packages': {},
+              'eol': eol,
+              'name': name,
+              'version': version,
+              'title': 'Fedora Package Database -- Notification List'}
+    for package, users in packages:
+        output['packages'][package] = users.split(',')
     return output
 
 
@@ -150,23 +211,55 @@ def _vcs_acls_cache(out_format='text', eol=False):
     :kwarg eol: A boolean specifying whether to include information about
         End Of Life collections or not. Defaults to ``False``.
 
+    For the text format, an iterator over the lines is returned, the data
+    being retrieved from the database while iterating.
     '''
+    skip_pp = APP.config.get('PKGS_NOT_PROVENPACKAGER', None)
+
+    if out_format != 'json':
+        return (
+            'avail | %(group)s%(user)s | rpms/%(name)s/%(branch)s' % dict(
+                pkg, group=pkg['group'] + ',' if pkg['group'] else '')
+            for pkg in pkgdblib.iter_vcs_acls(
+                session=SESSION, eol=eol, skip_pp=skip_pp)
+        )
+
     packages = pkgdblib.vcs_acls(
-        session=SESSION, eol=eol, oformat=out_format,
-        skip_pp=APP.config.get('PKGS_NOT_PROVENPACKAGER', None))
-    output = []
-    if out_format == 'json':
-        output = {'packageAcls': packages,
-                  'title': 'Fedora Package Database -- VCS ACLs'}
-    else:
-        for package in sorted(packages):
-            for branch in sorted(packages[package]):
-                if packages[package][branch]['group']:
-                    packages[package][branch]['group'] += ','
-                output.append(
-                    'avail | %(group)s%(user)s | rpms/%(name)s/%(branch)s'
-                    % (packages[package][branch]))
-    return output
+        session=SESSION, eol=eol, oformat=out_format, skip_pp=skip_pp)
+    return {'packageAcls': packages,
+            'title': 'Fedora Package Database -- VCS ACLs'}
+
+
+def _vcs_acls_snapshot(out_format='text', eol=False):
+    '''Return the materialized ACLs for the version control system.
+
+    The snapshot is only rebuilt when the ACLs, the point of contacts, the
+    branches of a package or the collections changed since it was last
+    built.
+
+    :kwarg out_format: Specify if the output if text or json.
+    :kwarg eol: A boolean specifying whether to include information about
+        End Of Life collections or not. Defaults to ``False``.
+    :returns: a dict with two keys: ``etag`` the entity tag of the
+        snapshot and ``data`` the full text output or the dict to return
+        as JSON.
+
+    '''
+    def _build():
+        ''' Build the snapshot from the database. '''
+        acls = _vcs_acls_cache(out_format, eol=eol)
+        if out_format == 'json':
+            content = json.dumps(acls, sort_keys=True)
+        else:
+            acls = VCS_INTRO + "\n".join(acls)
+            content = acls
+        return {
+            'etag': pkgdb2.lib.snapshots.compute_etag(content),
+            'data': acls,
+        }
+
+    return pkgdb2.lib.snapshots.get_snapshot(
+        'vcs', (out_format, bool(eol)), _build)
 
 
 @API.route('/bugzilla/')
@@ -223,10 +316,7 @@ Bugzilla information
     if out_format == 'json':
         return flask.jsonify(acls)
     else:
-        return flask.Response(
-            intro + "\n".join(acls),
-            content_type="text/plain;charset=UTF-8"
-        )
+        return _stream_lines(acls, intro=intro, separator='\n')
 
 
 @API.route('/notify/')
@@ -269,10 +359,7 @@ def api_notify():
     if out_format == 'json':
         return flask.jsonify(output)
     else:
-        return flask.Response(
-            output,
-            content_type="text/plain;charset=UTF-8"
-        )
+        return _stream_lines(output)
 
 
 @API.route('/notify/all/')
@@ -313,10 +400,7 @@ def api_notify_all():
     if out_format == 'json':
         return flask.jsonify(output)
     else:
-        return flask.Response(
-            output,
-            content_type="text/plain;charset=UTF-8"
-        )
+        return _stream_lines(output)
 
 
 @API.route('/vcs/')
@@ -335,12 +419,11 @@ def api_vcs():
     :kwarg eol: A boolean specifying whether to include information about
         End Of Life collections or not. Defaults to ``False``.
 
-    '''
-    intro = """# VCS ACLs
-# avail|@groups,users|rpms/Package/branch
-
-"""
+    The response carries an ``ETag`` header, sending it back in the
+    ``If-None-Match`` header of the next query returns a ``304 Not
+    Modified`` if the ACLs did not change in the meantime.
 
+    '''
     out_format = flask.request.args.get('format', 'text')
     eol = flask.request.args.get('eol', False)
 
@@ -350,16 +433,21 @@ def api_vcs():
     if request_wants_json():
         out_format = 'json'
 
-    acls = _vcs_acls_cache(out_format, eol=eol)
+    snapshot = _vcs_acls_snapshot(out_format, eol=eol)
 
-    if out_format == 'json':
-        return flask.jsonify(acls)
+    if flask.request.if_none_match.contains(snapshot['etag']):
+        response = flask.Response(status=304)
+    elif out_format == 'json':
+        response = flask.jsonify(snapshot['data'])
     else:
-        return flask.Response(
-            intro + "\n".join(acls),
+        response = flask.Response(
+            snapshot['data'],
             content_type="text/plain;charset=UTF-8"
         )
 
+    response.set_etag(snapshot['etag'])
+    return response
+
 
 @API.route('/critpath/')
 @API.route('/critpath')
@@ -403,14 +491,21 @@ def api_critpath():
                 pkgdblib.search_collection(SESSION, branch)
             )
 
+    graph = _acl_graph()
     for collection in active_collections:
         if collection.name != 'Fedora':
             continue
-        pkgs = pkgdblib.get_critpath_packages(
-            SESSION, branch=collection.branchname)
+        if graph is not None:
+            pkgs = graph.get_critpath_packages(collection.branchname)
+        else:
+            pkgs = [
+                pkg.package.name
+                for pkg in pkgdblib.get_critpath_packages(
+                    SESSION, branch=collection.branchname)
+            ]
         if not pkgs:
             continue
-        output[collection.branchname] = [pkg.package.name for pkg in pkgs]
+        output[collection.branchname] = pkgs
 
     if out_format == 'json':
         output = {"pkgs": output}
@@ -479,6 +574,51 @@ def api_pendingacls():
         )
 
 
+@API.route('/pendingacls/count/')
+@API.route('/pendingacls/count')
+def api_pendingacls_count():
+    '''
+    Number of pending ACLs requests
+    -------------------------------
+    Return the number of ACLs request that are ``Awaiting Approval`` and
+    that the specified user can approve, without listing them.
+
+    ::
+
+        /api/pendingacls/count?username=<username>
+
+    :kwarg username: The user for which to count the pending ACL requests.
+
+    Sample response:
+
+    ::
+
+        {
+          "username": "pingou",
+          "total_requests_pending": 2,
+          "output": "ok"
+        }
+
+    '''
+    httpcode = 200
+    username = flask.request.args.get('username', None)
+
+    if username:
+        output = {
+            'username': username,
+            'total_requests_pending': pkgdblib.get_pending_acl_count(
+                SESSION, username),
+            'output': 'ok',
+        }
+    else:
+        output = {'output': 'notok', 'error': 'Invalid request'}
+        httpcode = 500
+
+    jsonout = flask.jsonify(output)
+    jsonout.status_code = httpcode
+    return jsonout
+
+
 @API.route('/groups/')
 @API.route('/groups')
 def api_groups():
@@ -505,7 +645,11 @@ def api_groups():
 
     output = {}
 
-    groups = pkgdblib.get_groups(SESSION)
+    graph = _acl_graph()
+    if graph is not None:
+        groups = graph.get_groups()
+    else:
+        groups = pkgdblib.get_groups(SESSION)
 
     if out_format == 'json':
         output = {"groups": groups}
@@ -610,6 +754,60 @@ def api_koschei():
         )
 
 
+@API.route('/stats/')
+@API.route('/stats')
+def api_stats():
+    '''
+    Statistics
+    ----------
+    Return the statistics about the packages shown on the stats page: the
+    number of packages in each active collection and in each Fedora
+    release, the packagers with commit rights on the most packages and
+    the ones who are the point of contact of the most packages.
+
+    ::
+
+        /api/stats
+
+    Sample response:
+
+    ::
+
+        {
+          "collections": {
+            "el6": 5,
+            "f20": 12,
+            "master": 15
+          },
+          "fedora_collections": [
+            [19, 11],
+            [20, 12],
+            ["devel", 15]
+          ],
+          "top_maintainers": [
+            ["pingou", 10],
+            ["ralph", 8]
+          ],
+          "top_poc": [
+            ["pingou", 7],
+            ["ralph", 6]
+          ],
+          "output": "ok"
+        }
+
+    '''
+    stats = pkgdblib.get_stats(SESSION)
+
+    output = {
+        'collections': dict(stats['collections']),
+        'fedora_collections': stats['fedora_collections'],
+        'top_maintainers': stats['top_maintainers'],
+        'top_poc': stats['top_poc'],
+        'output': 'ok',
+    }
+    return flask.jsonify(output)
+
+
 @API.route('/dead/package/<pkg_name>/<clt_name>')
 def api_dead_package(pkg_name, clt_name):
     '''
@@ -83,12 +83,15 @@ def api_packager_acl(packagername=None):
         If ``None`` it will not filter the ACLs returned based on the point
         of contact of the package (thus every packages is returned).
     :kwarg page: The page number to return (useful in combination to limit).
+    :kwarg after: The ``cursor`` returned with the previous page, to return
+        the ACLs following it.
     :kwarg limit: An integer to limit the number of results, defaults to
         250, maximum is 500 (acls).
     :kwarg count: A boolean to return the number of packages instead of the
         list. Defaults to False.
 
-    *Results are paginated*
+    *Results are paginated*, when the page is full a ``cursor`` is returned
+    to use as ``after`` argument to retrieve the next page.
 
     Sample response:
 
@@ -187,28 +190,44 @@ def api_packager_acl(packagername=None):
             return jsonout
 
     page = flask.request.args.get('page', 1)
+    after = flask.request.args.get('after', None)
     limit = get_limit()
     count = flask.request.args.get('count', False)
 
     if packagername:
-        packagers = pkgdblib.get_acl_packager(
-            SESSION,
-            packager=packagername,
-            acls=acls,
-            eol=eol,
-            poc=poc,
-            page=page,
-            limit=limit,
-            count=count)
+        more = False
+        try:
+            # Past a cursor, retrieve one more ACL to know if others follow
+            packagers = pkgdblib.get_acl_packager(
+                SESSION,
+                packager=packagername,
+                acls=acls,
+                eol=eol,
+                poc=poc,
+                page=page,
+                limit=limit + 1 if after and limit else limit,
+                count=count,
+                after=after)
+            if after and limit and not count:
+                more = len(packagers) > limit
+                packagers = packagers[:limit]
+        except pkgdblib.PkgdbException, err:
+            output = {'output': 'notok', 'error': str(err)}
+            httpcode = 500
+            packagers = None
+
         if packagers:
             output['output'] = 'ok'
             if count:
                 output['acls_count'] = packagers
             else:
                 tmp = []
+                # Serialize each package and collection only once
+                cache = {}
                 for pkg in packagers:
                     dic = pkg[0].to_json(pkglist=False)
-                    dic['packagelist'] = pkg[1].to_json(acls=False)
+                    dic['packagelist'] = pkg[1].to_json(
+                        acls=False, cache=cache)
                     tmp.append(dic)
                 output['acls'] = tmp
 
@@ -220,11 +239,17 @@ def api_packager_acl(packagername=None):
                 poc=poc,
                 count=True)
 
+            if not count and not after:
+                more = limit and (max(int(page), 1) - 1) * limit \
+                    + len(packagers) < total_acl
+            if more:
+                output['cursor'] = pkgdblib.get_cursor(packagers[-1])
+
             if count:
                 output['page_total'] = 1
             else:
                 output['page_total'] = int(ceil(total_acl / float(limit)))
-        else:
+        elif httpcode == 200:
             output = {'output': 'notok', 'error': 'No ACL found for this user'}
             httpcode = 404
     else:
@@ -461,32 +486,8 @@ def api_packager_stats(packagername=None):
     eol = flask.request.args.get('eol', False)
 
     if packagername:
-        if not eol:
-            collections = pkgdblib.search_collection(
-                SESSION, '*', status='Active')
-            collections.extend(pkgdblib.search_collection(
-                SESSION, '*', status='Under Development'))
-        else:
-            collections = pkgdblib.search_collection(SESSION, '*')
-
-        for collection in collections:
-            packages_co = pkgdblib.get_package_maintained(
-                SESSION,
-                packager=packagername,
-                poc=False,
-                branch=collection.branchname
-            )
-
-            packages = pkgdblib.get_package_maintained(
-                SESSION,
-                packager=packagername,
-                poc=True,
-                branch=collection.branchname
-            )
-            output[collection.branchname] = {
-                'point of contact': len(packages),
-                'co-maintainer': len(packages_co)
-            }
+        output = pkgdblib.get_packager_stats(
+            SESSION, packagername, eol=bool(eol))
         output['output'] = 'ok'
     else:
         output = {'output': 'notok', 'error': 'Invalid request'}
@@ -521,7 +522,13 @@ def api_packager_list(pattern=None):
 
     :kwarg pattern: String of the pattern to use to list find packagers.
         If no pattern is provided, it returns the list of all packagers.
+    :kwarg limit: An integer to limit the number of results, maximum is
+        500. Defaults to returning all the packagers.
+    :kwarg after: The ``cursor`` returned with the previous page, to return
+        the packagers following it.
 
+    When a ``limit`` is given and the page is full, a ``cursor`` is
+    returned to use as ``after`` argument to retrieve the next page.
 
     Sample response:
 
@@ -550,13 +557,27 @@ def api_packager_list(pattern=None):
     output = {}
 
     pattern = flask.request.args.get('pattern', pattern) or '*'
+    after = flask.request.args.get('after', None)
+    limit = None
+    if 'limit' in flask.request.args:
+        limit = get_limit()
     if pattern:
-        packagers = pkgdblib.search_packagers(
-            SESSION, pattern=pattern, eol=False)
-        packagers = [pkg[0] for pkg in packagers]
-        SESSION.commit()
-        output['output'] = 'ok'
-        output['packagers'] = packagers
+        try:
+            # Retrieve one more packager to know if others follow
+            packagers = pkgdblib.search_packagers(
+                SESSION, pattern=pattern, eol=False,
+                limit=limit + 1 if limit else limit, after=after)
+            SESSION.commit()
+            more = limit and len(packagers) > limit
+            packagers = packagers[:limit]
+            output['output'] = 'ok'
+            output['packagers'] = [pkg[0] for pkg in packagers]
+            if more:
+                output['cursor'] = pkgdblib.get_cursor(packagers[-1])
+        except pkgdblib.PkgdbException, err:
+            SESSION.rollback()
+            output = {'output': 'notok', 'error': str(err)}
+            httpcode = 500
     else:  # pragma: no cover # In theory we can never get here
         output = {'output': 'notok', 'error': 'Invalid request'}
         httpcode = 500
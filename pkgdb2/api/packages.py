@@ -33,10 +33,15 @@ from math import ceil
 from sqlalchemy.orm.exc import NoResultFound
 
 import pkgdb2.lib as pkgdblib
+import pkgdb2.lib.search
 from pkgdb2 import APP, SESSION, forms, is_admin, packager_login_required
 from pkgdb2.api import API, get_limit
 
 
+# Maximum number of packages returned by /api/packages/batch
+BATCH_MAX_PACKAGES = 500
+
+
 ## Some of the object we use here have inherited methods which apparently
 ## pylint does not detect.
 # pylint: disable=E1101
@@ -760,9 +765,11 @@ def api_package_info(pkgname=None):
             httpcode = 404
         else:
             output['output'] = 'ok'
+            # Serialize the package only once for all its branches
+            cache = {}
             output['packages'] = [
                 pkg.to_json(not_provenpackager=APP.config.get(
-                    'PKGS_NOT_PROVENPACKAGER'), acls=acls)
+                    'PKGS_NOT_PROVENPACKAGER'), acls=acls, cache=cache)
                 for pkg in packages]
     except NoResultFound:
         output['output'] = 'notok'
@@ -774,6 +781,121 @@ def api_package_info(pkgname=None):
     return jsonout
 
 
+@API.route('/packages/batch/', methods=['GET', 'POST'])
+@API.route('/packages/batch', methods=['GET', 'POST'])
+def api_package_batch():
+    '''
+    Packages information
+    --------------------
+    Return information about several packages at once.
+
+    ::
+
+        /api/packages/batch/?pkgnames=<pkg_name>&pkgnames=<pkg_name>
+
+    Accepts GET and POST queries, POST queries allow to send more package
+    names than an URL can hold.
+
+    :arg pkgnames: One or more names of packages to retrieve the
+        information of, up to 500.
+    :kwarg branches: Restricts the packages information to one or more
+        collection (branches).
+    :kwarg eol: a boolean to specify whether to include results for
+        EOL collections or not. Defaults to False.
+    :kwarg acls: a boolean to specify whether to include the ACLs in the
+        results. Defaults to True.
+
+    The information of each package is the list of ``packages`` returned
+    by ``/api/package/<pkg_name>``. The packages not found (or not found
+    in the specified branches) are listed in ``not_found``.
+
+    Sample response:
+
+    ::
+
+        /api/packages/batch/?pkgnames=guake&pkgnames=foo&branches=master
+
+        {
+          "output": "ok",
+          "packages": {
+            "guake": [
+              {
+                "status": "Approved",
+                "point_of_contact": "pingou",
+                "critpath": False,
+                "package": {
+                  "status": "Approved",
+                  "upstream_url": null,
+                  "description": "Top down terminal...",
+                  "summary": "Top down terminal for GNOME",
+                  "creation_date": 1385365548.0,
+                  "review_url": null,
+                  "name": "guake"
+                },
+                "collection": {
+                  "status": "Under Development",
+                  "branchname": "master",
+                  "version": "devel",
+                  "name": "Fedora"
+                },
+                "acls": [
+                  {
+                    "status": "Approved",
+                    "fas_name": "pingou",
+                    "acl": "commit"
+                  },
+                  ...
+                ],
+                "status_change": 1385366044.0
+              }
+            ]
+          },
+          "not_found": ["foo"]
+        }
+
+    '''
+    httpcode = 200
+    output = {}
+
+    pkg_names = flask.request.values.getlist('pkgnames')
+    branches = flask.request.values.getlist('branches')
+    eol = flask.request.values.get('eol', False)
+    acls = flask.request.values.get('acls', True)
+    if str(acls).lower() in ['0', 'false']:
+        acls = False
+
+    try:
+        if len(set(pkg_names)) > BATCH_MAX_PACKAGES:
+            raise pkgdblib.PkgdbException(
+                'Too many packages requested, the maximum is %s'
+                % BATCH_MAX_PACKAGES)
+        packages = pkgdblib.get_acl_packages(
+            SESSION,
+            pkg_names=pkg_names,
+            pkg_clt=branches,
+            eol=eol,
+        )
+        output['output'] = 'ok'
+        # Serialize each package only once for all its branches
+        cache = {}
+        output['packages'] = dict(
+            (pkg_name, [
+                pkg.to_json(not_provenpackager=APP.config.get(
+                    'PKGS_NOT_PROVENPACKAGER'), acls=acls, cache=cache)
+                for pkg in pkglistings])
+            for pkg_name, pkglistings in packages.items()
+        )
+        output['not_found'] = sorted(set(pkg_names) - set(packages))
+    except pkgdblib.PkgdbException, err:
+        output['output'] = 'notok'
+        output['error'] = str(err)
+        httpcode = 500
+
+    jsonout = flask.jsonify(output)
+    jsonout.status_code = httpcode
+    return jsonout
+
+
 @API.route('/packages/')
 @API.route('/packages')
 @API.route('/packages/<pattern>/')
@@ -814,10 +936,14 @@ def api_package_list(pattern=None):
     :kwarg limit: An integer to limit the number of results, defaults to
         250, maximum is 500.
     :kwarg page: The page number to return (useful in combination to limit).
+    :kwarg after: The ``cursor`` returned with the previous page, to return
+        the packages following it. This is faster than ``page`` on large
+        results, ``page`` is then only used to compute ``page_total``.
     :kwarg count: A boolean to return the number of packages instead of the
         list. Defaults to False.
 
-    *Results are paginated*
+    *Results are paginated*, when more results are available a ``cursor``
+    is returned to use as ``after`` argument to retrieve the next page.
 
     Sample response:
 
@@ -909,69 +1035,45 @@ def api_package_list(pattern=None):
     statuses = flask.request.args.getlist('status', None)
     eol = flask.request.args.get('eol', False)
     page = flask.request.args.get('page', 1)
+    after = flask.request.args.get('after', None)
     limit = get_limit()
     count = flask.request.args.get('count', False)
     try:
-        if not branches:
-            branches = [None]
-        if not statuses:
-            statuses = [None]
-
         if count:
-            packages = 0
-            for status, branch in itertools.product(
-                    statuses, branches):
-                packages += pkgdblib.search_package(
-                    SESSION,
-                    pkg_name=pattern,
-                    pkg_branch=branch,
-                    pkg_poc=poc,
-                    orphaned=orphaned,
-                    critpath=critpath,
-                    status=status,
-                    eol=eol,
-                    page=page,
-                    limit=limit,
-                    count=count,
-                )
+            packages = pkgdblib.search_package(
+                SESSION,
+                pkg_name=pattern,
+                pkg_branch=branches,
+                pkg_poc=poc,
+                orphaned=orphaned,
+                critpath=critpath,
+                status=statuses,
+                eol=eol,
+                page=page,
+                limit=limit,
+                count=count,
+            )
 
             output['output'] = 'ok'
             output['packages'] = packages
             output['page'] = 1
             output['page_total'] = 1
         else:
-            packages = set()
-            packages_count = 0
-            for status, branch in itertools.product(
-                    statuses, branches):
-                packages.update(
-                    pkgdblib.search_package(
-                        SESSION,
-                        pkg_name=pattern,
-                        pkg_branch=branch,
-                        pkg_poc=poc,
-                        orphaned=orphaned,
-                        critpath=critpath,
-                        status=status,
-                        eol=eol,
-                        page=page,
-                        limit=limit,
-                        count=count,
-                    )
-                )
-                packages_count += pkgdblib.search_package(
-                    SESSION,
-                    pkg_name=pattern,
-                    pkg_branch=branch,
-                    pkg_poc=poc,
-                    orphaned=orphaned,
-                    critpath=critpath,
-                    status=status,
-                    eol=eol,
-                    page=page,
-                    limit=limit,
-                    count=True,
-                )
+            packages, packages_count = pkgdblib.search_package(
+                SESSION,
+                pkg_name=pattern,
+                pkg_branch=branches,
+                pkg_poc=poc,
+                orphaned=orphaned,
+                critpath=critpath,
+                status=statuses,
+                eol=eol,
+                page=page,
+                limit=limit,
+                with_count=True,
+                after=after,
+                with_acls=acls,
+            )
 
             if not packages:
                 output['output'] = 'notok'
@@ -979,13 +1081,27 @@ def api_package_list(pattern=None):
                 output['error'] = 'No packages found for these parameters'
                 httpcode = 404
             else:
+                # Serialize each collection only once
+                cache = {}
                 output['packages'] = [
-                    pkg.to_json(acls=acls, collection=branches, package=False)
+                    pkg.to_json(acls=acls, collection=branches, package=False,
+                                cache=cache)
                     for pkg in packages
                 ]
                 output['output'] = 'ok'
                 output['page'] = int(page)
-                output['page_total'] = int(ceil(packages_count / float(limit)))
+                if after:
+                    # The count only covers the packages after the cursor
+                    output['page_total'] = int(page) - 1 + int(
+                        ceil(packages_count / float(limit)))
+                    more = packages_count > len(packages)
+                else:
+                    output['page_total'] = int(
+                        ceil(packages_count / float(limit)))
+                    more = (int(page) - 1) * limit + len(packages) \
+                        < packages_count
+                if more:
+                    output['cursor'] = pkgdblib.get_cursor(packages[-1])
 
     except pkgdblib.PkgdbException, err:
         SESSION.rollback()
@@ -1002,6 +1118,73 @@ def api_package_list(pattern=None):
     return jsonout
 
 
+@API.route('/search/')
+@API.route('/search')
+def api_search():
+    '''
+    Search packages
+    ---------------
+    Search packages by name, summary and description, the most relevant
+    first.
+
+    ::
+
+        /api/search/?term=<term>
+
+    Accepts GET queries only
+
+    :arg term: The text to search, for example a part of the name of the
+        package or words of its summary.
+    :kwarg limit: An integer to limit the number of results, defaults to
+        250, maximum is 500.
+
+    The packages named after the term come first, then the ones whose name
+    starts with it, contains it or looks like it and finally the ones whose
+    summary or description contains all its words.
+
+    Sample response:
+
+    ::
+
+        /api/search/?term=terminal
+
+        {
+          "output": "ok",
+          "term": "terminal",
+          "packages": [
+            {
+              "name": "guake",
+              "summary": "Top down terminal for GNOME",
+              "status": "Approved",
+              "score": 1.0
+            }
+          ]
+        }
+
+    '''
+    httpcode = 200
+    output = {}
+
+    term = flask.request.args.get('term', None)
+    limit = get_limit()
+
+    try:
+        packages = pkgdb2.lib.search.search_packages(
+            SESSION, term, limit=limit)
+        output['output'] = 'ok'
+        output['term'] = term
+        output['packages'] = packages
+    except pkgdblib.PkgdbException, err:
+        SESSION.rollback()
+        output['output'] = 'notok'
+        output['error'] = str(err)
+        httpcode = 500
+
+    jsonout = flask.jsonify(output)
+    jsonout.status_code = httpcode
+    return jsonout
+
+
 @API.route('/package/critpath/', methods=['POST'])
 @is_admin
 def api_package_critpath():
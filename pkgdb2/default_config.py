@@ -99,6 +99,27 @@ PKGDB2_EMAIL_TO = '{pkg_name}-owner@fedoraproject.org'
 PKGDB2_EMAIL_FROM = 'nobody@fedoraproject.org'
 PKGDB2_EMAIL_SMTP_SERVER = 'localhost'
 PKGDB2_EMAIL_CC = None
+# Store the fedmsg messages and emails in the database, to be sent by the
+# ``pkgdb2_notifications.py`` script, instead of sending them in the
+# requests
+PKGDB2_NOTIFICATION_OUTBOX = False
+# Number of times the script tries to send a notification before giving up
+PKGDB2_NOTIFICATION_MAX_ATTEMPTS = 5
+
+# Backend used to search the packages: ``postgresql`` (requires the pg_trgm
+# extension), ``memory`` or ``auto`` to use ``postgresql`` when available
+PKGDB2_SEARCH_BACKEND = 'auto'
+
+# Answer /api/notify, /api/critpath and /api/groups from a graph of the ACLs
+# kept in memory by each worker
+PKGDB2_ACL_GRAPH = False
+# Number of seconds the graph is used before checking if the ACLs changed,
+# ie: how out of date its answers may be
+PKGDB2_ACL_GRAPH_MAX_AGE = 30
+
+# Cache the stats of each packager (/api/packager/stats) until their ACLs
+# change
+PKGDB2_PACKAGER_STATS_CACHE = False
 
 MAIL_ADMIN = 'pingou@pingoured.fr'
 
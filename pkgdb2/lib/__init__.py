@@ -23,12 +23,15 @@
 PkgDB internal API to interact with the database.
 '''
 
+import base64
+import hashlib
+import itertools
 import operator
 import json
 
 import sqlalchemy
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import scoped_session
 from sqlalchemy.orm.exc import NoResultFound
@@ -38,6 +41,7 @@ from fedora.client.fas2 import FASError
 
 import pkgdb2
 from pkgdb2.lib import model
+import pkgdb2.lib.snapshots
 import pkgdb2.lib.utils
 from pkgdb2.lib.exceptions import PkgdbException, PkgdbBugzillaException
 
@@ -152,6 +156,72 @@ def _validate_fas_user(username):
             'User "%s" could not be found in FAS' % username)
 
 
+_CURSOR_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def get_cursor(item):
+    """ Return the cursor pointing to the provided item, to be given as
+    ``after`` argument to retrieve the results following it.
+
+    :arg item: the last item of a page of results, either a ``Package``, a
+        ``Log``, an ``AdminAction``, a ``PackageListingAcl`` (possibly as
+        first element of a tuple) or a row of a list of packagers.
+    :returns: a string that can be given back as ``after`` argument.
+
+    """
+    if isinstance(item, tuple) \
+            and isinstance(item[0], model.PackageListingAcl):
+        item = item[0]
+
+    if isinstance(item, model.Package):
+        values = [item.name]
+    elif isinstance(item, (model.Log, model.LogArchive)):
+        values = [item.change_time, item.id]
+    elif isinstance(item, model.AdminAction):
+        values = [item.date_created, item.id]
+    elif isinstance(item, model.PackageListingAcl):
+        values = [item.id]
+    else:
+        values = list(item)
+
+    values = [
+        {'date': value.strftime(_CURSOR_DATE_FORMAT)}
+        if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values))
+
+
+def _decode_cursor(cursor, size):
+    """ Return the tuple of values stored in the provided cursor.
+
+    :arg cursor: a cursor as returned by ``get_cursor``.
+    :arg size: the number of values the cursor should contain.
+    :raises pkgdb2.lib.PkgdbException: if the cursor is not a valid one.
+
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError('Wrong number of values')
+        for value in values:
+            if isinstance(value, dict):
+                if value.keys() != ['date'] \
+                        or not isinstance(value['date'], basestring):
+                    raise ValueError('Invalid date value')
+            elif isinstance(value, bool) \
+                    or not isinstance(value, (basestring, int, long, float)):
+                raise ValueError('Invalid value')
+        values = tuple(
+            datetime.strptime(value['date'], _CURSOR_DATE_FORMAT)
+            if isinstance(value, dict) else value
+            for value in values
+        )
+    except (TypeError, ValueError, KeyError):
+        raise PkgdbException('Invalid cursor provided')
+    return values
+
+
 def create_session(db_url, debug=False, pool_recycle=3600):
     """ Create the Session object to use to query the database.
 
@@ -289,26 +359,45 @@ def get_acl_package(session, pkg_name, pkg_clt=None, eol=False):
         found in the database with the name ``pkg_name``.
 
     """
+    if isinstance(pkg_clt, basestring):
+        pkg_clt = [pkg_clt]
+
     package = model.Package.by_name(session, pkg_name)
-    pkglisting = model.PackageListing.by_package_id(session, package.id)
+    return model.PackageListing.by_package_id(
+        session, package.id, branches=pkg_clt, eol=eol)
+
+
+def get_acl_packages(session, pkg_names, pkg_clt=None, eol=False):
+    """ Return the ACLs for the specified packages.
+
+    Same as ``get_acl_package`` but for several packages at once, in two
+    queries whatever the number of packages.
+
+    :arg session: session with which to connect to the database.
+    :arg pkg_names: the list of the names of the packages to retrieve the
+        ACLs for.
+    :kward pkg_clt: the branche name of the collection or collections to
+        retrieve the ACLs of.
+    :kwarg eol: a boolean to specify whether to include results for
+        EOL collections or not. Defaults to False.
+    :returns: a dictionary associating to the name of each package found
+        its list of ``PackageListing``.
+    :rtype: dict(str, list(PackageListing))
+    :raises pkgdb2.lib.PkgdbException: no package name was provided.
+
+    """
+    if not pkg_names:
+        raise PkgdbException('No package provided')
 
-    if pkg_clt:
-        if isinstance(pkg_clt, basestring):
-            pkg_clt = [pkg_clt]
-        tmp = []
-        for pkglist in pkglisting:
-            if pkglist.collection.branchname in pkg_clt:
-                tmp.append(pkglist)
-        pkglisting = tmp
+    if isinstance(pkg_clt, basestring):
+        pkg_clt = [pkg_clt]
 
-    if not eol:
-        tmp = []
-        for pkglist in pkglisting:
-            if pkglist.collection.status != 'EOL':
-                tmp.append(pkglist)
-        pkglisting = tmp
+    output = {}
+    for pkglist in model.PackageListing.by_package_names(
+            session, set(pkg_names), branches=pkg_clt, eol=eol):
+        output.setdefault(pkglist.package.name, []).append(pkglist)
 
-    return pkglisting
+    return output
 
 
 def set_acl_package(session, pkg_name, pkg_branch, pkg_user, acl, status,
@@ -422,6 +511,224 @@ def set_acl_package(session, pkg_name, pkg_branch, pkg_user, acl, status,
     ))
 
 
+def _validate_users(poc_users, fas_users):
+    """ Validate a set of users and groups retrieving the list of packagers
+    from FAS only once.
+
+    :arg poc_users: the users and groups that must be valid point of
+        contact, see ``_validate_poc``.
+    :arg fas_users: the users that must have a FAS account, see
+        ``_validate_fas_user``.
+
+    """
+    for username in sorted(poc_users):
+        if username.startswith('group::'):
+            _validate_poc(username)
+
+    users = set(
+        username for username in poc_users | fas_users
+        if username != 'orphan' and not username.startswith('group::'))
+    if not users:
+        return
+
+    packagers = pkgdb2.lib.utils.get_packagers()
+    for username in sorted(users):
+        if username in packagers:
+            continue
+        if username in poc_users:
+            raise PkgdbException(
+                'User "%s" is not in the packager group' % username)
+        _validate_fas_user(username)
+
+
+def set_acl_packages(session, acls, user, force=False):
+    """ Set a list of ACLs in a single transaction.
+
+    Each ACL is set as ``set_acl_package`` would do it but the users are
+    validated at once, the packages, collections, package listings and
+    ACLs are retrieved and written by batch, the changes are logged using
+    a single query and a single fedmsg message summarizes them.
+
+    Nothing is changed if one of the ACLs cannot be set.
+
+    :arg session: session with which to connect to the database.
+    :arg acls: a list of tuple (package name, branch name, FAS user, acl,
+        status), see ``set_acl_package`` for the meaning of each element.
+    :arg user: the user making the action.
+    :kwarg force: a boolean to force creating the ACLs w/o checking if the
+        user is an admin or not
+    :returns: the list of messages describing each change made, ACLs
+        already having the requested status are not reported.
+    :raises pkgdb2.lib.PkgdbException: For the same reasons as
+        ``set_acl_package``.
+
+    """
+    if not acls:
+        return []
+
+    poc_users = set()
+    fas_users = set()
+    for _, _, pkg_user, acl, status in acls:
+        if acl not in pkgdb2.APP.config['AUTO_APPROVE'] \
+                and status not in ('Removed', 'Obsolete'):
+            poc_users.add(pkg_user)
+        if pkg_user.startswith('group:'):
+            poc_users.add(pkg_user)
+        else:
+            fas_users.add(pkg_user)
+    _validate_users(poc_users, fas_users)
+
+    packages = dict(
+        (package.name, package)
+        for package in model.Package.by_names(
+            session, [item[0] for item in acls])
+    )
+    collections = dict(
+        (collection.branchname, collection)
+        for collection in model.Collection.by_names(
+            session, [item[1] for item in acls])
+    )
+    listings = dict(
+        ((pkglist.package_id, pkglist.collection_id), pkglist)
+        for pkglist in model.PackageListing.by_pkgids_collectionids(
+            session,
+            [package.id for package in packages.values()],
+            [collection.id for collection in collections.values()])
+    )
+    # (user, package listing id, acl) -> (acl id, status)
+    existing = dict(
+        ((fas_name, pkglist_id, acl), (acl_id, status))
+        for acl_id, fas_name, pkglist_id, acl, status in
+        model.PackageListingAcl.get_many(
+            session,
+            [item[2] for item in acls],
+            [pkglist.id for pkglist in listings.values()])
+    )
+
+    admins = {}
+    current = {}
+    changes = []
+    for pkg_name, pkg_branch, pkg_user, acl, status in acls:
+        package = packages.get(pkg_name)
+        if package is None:
+            raise PkgdbException(
+                'No package found by the name of %s' % pkg_name)
+
+        collection = collections.get(pkg_branch)
+        if collection is None:
+            raise PkgdbException('No collection found by the name of %s'
+                                 % pkg_branch)
+
+        if not force:
+            if (pkg_name, pkg_branch) not in admins:
+                admins[(pkg_name, pkg_branch)] = pkgdb2.is_pkg_admin(
+                    session, user, pkg_name, pkg_branch)
+            if not admins[(pkg_name, pkg_branch)]:
+                if user.username != pkg_user \
+                        and not pkg_user.startswith('group::'):
+                    raise PkgdbException('You are not allowed to update '
+                                         'ACLs of someone else.')
+                elif user.username == pkg_user and status not in \
+                        ('Awaiting Review', 'Removed', 'Obsolete', '') \
+                        and acl not in pkgdb2.APP.config['AUTO_APPROVE']:
+                    raise PkgdbException(
+                        'You are not allowed to approve or deny '
+                        'ACLs for yourself.')
+
+        if pkg_user.startswith('group::') and acl == 'approveacls':
+            raise PkgdbException(
+                'Groups cannot have "approveacls".')
+
+        pkglisting = listings.get((package.id, collection.id))
+        if pkglisting is None:
+            pkglisting = package.create_listing(
+                point_of_contact=pkg_user,
+                collection=collection,
+                statusname='Approved')
+            session.add(pkglisting)
+            session.flush()
+            pkgdb2.lib.utils.log(
+                session, package, 'package.branch.new', dict(
+                    agent=user.username,
+                    package=package.to_json(acls=False),
+                    package_listing=pkglisting.to_json(),
+                ))
+            listings[(package.id, collection.id)] = pkglisting
+
+        key = (pkg_user, pkglisting.id, acl)
+        if key in current:
+            prev_status = current[key]
+        else:
+            prev_status = existing.get(key, (None, ''))[1]
+        if prev_status == status:
+            continue
+        current[key] = status
+
+        changes.append((package, dict(
+            agent=user.username,
+            username=pkg_user,
+            acl=acl,
+            previous_status=prev_status,
+            status=status,
+            package_name=package.name,
+            package_listing=pkglisting.to_json(acls=False, package=False),
+        )))
+
+    new = []
+    changed = []
+    removed = []
+    for key, status in current.items():
+        if key in existing:
+            acl_id, prev_status = existing[key]
+            if not status:
+                removed.append(acl_id)
+            elif status != prev_status:
+                changed.append(dict(id=acl_id, status=status))
+        elif status:
+            new.append(dict(
+                fas_name=key[0], packagelisting_id=key[1], acl=key[2],
+                status=status))
+
+    try:
+        model.PackageListingAcl.bulk_set(session, new, changed, removed)
+        model.PendingAcl.refresh(
+            session, [pkglisting.id for pkglisting in listings.values()])
+    except SQLAlchemyError, err:
+        pkgdb2.LOG.exception(err)
+        raise PkgdbException('Could not update the ACLs.')
+
+    # The ACLs were changed behind the back of the ORM
+    for pkglisting in listings.values():
+        session.expire(pkglisting, ['acls'])
+    for obj in session.identity_map.values():
+        if not isinstance(obj, model.PackageListingAcl):
+            continue
+        key = (obj.fas_name, obj.packagelisting_id, obj.acl)
+        if key not in current:
+            continue
+        if current[key]:
+            session.expire(obj)
+        else:
+            session.expunge(obj)
+
+    return pkgdb2.lib.utils.log_bulk(
+        session, 'acl.update', changes, 'acl.update.bulk', dict(
+            agent=user.username,
+            changes=[
+                dict(
+                    package_name=message['package_name'],
+                    branch=message['package_listing'][
+                        'collection']['branchname'],
+                    username=message['username'],
+                    acl=message['acl'],
+                    previous_status=message['previous_status'],
+                    status=message['status'],
+                )
+                for _, message in changes
+            ],
+        ))
+
+
 def update_pkg_poc(session, pkg_name, pkg_branch, pkg_poc, user,
                    former_poc=None):
     """ Change the point of contact of a package.
@@ -671,17 +978,19 @@ def update_pkg_status(session, pkg_name, pkg_branch, status, user,
 
 def search_package(session, pkg_name, pkg_branch=None, pkg_poc=None,
                    orphaned=None, critpath=None, status=None, eol=False,
-                   page=None, limit=None, count=False, case_sensitive=True):
+                   page=None, limit=None, count=False, case_sensitive=True,
+                   with_count=False, after=None, with_acls=False):
     """ Return the list of packages matching the given criteria.
 
     :arg session: session with which to connect to the database.
     :arg pkg_name: the name of the package.
-    :kwarg pkg_branch: branchname of the collection to search.
+    :kwarg pkg_branch: branchname of the collection to search, or list of
+        branchnames.
     :kwarg pkg_poc: point of contact of the packages searched.
     :kwarg orphaned: boolean to restrict search to orphaned packages.
     :kwarg critpath: Boolean to retrict the search to critpath packages.
     :kwarg status: allows filtering the packages by their status:
-        Approved, Retired, Removed, Orphaned.
+        Approved, Retired, Removed, Orphaned. Can be a list of status.
     :kwarg eol: a boolean to specify whether to include results for
         EOL collections or not. Defaults to False.
         If True, it will return results for all collections (including EOL).
@@ -692,13 +1001,24 @@ def search_package(session, pkg_name, pkg_branch=None, pkg_poc=None,
        if true, returns the data if false (default).
     :kwarg case_sensitive: a boolean to specify doing a case insensitive
         search. Defaults to True.
+    :kwarg with_count: a boolean to also return the total number of
+        packages matching, retrieved with the same query as the page.
+    :kwarg after: a cursor as returned by ``get_cursor`` for the last
+        package of the previous page. When provided, ``page`` is ignored
+        and the total returned with ``with_count`` is the number of
+        packages following the cursor.
+    :kwarg with_acls: a boolean to load, in a fixed number of queries, the
+        listings, collections and ACLs of the packages returned, for when
+        they are serialized with their ACLs. Defaults to False.
     :returns: a list of ``Package`` entry corresponding to the given
-        criterias.
+        criterias, or a tuple (list of ``Package``, total number of
+        packages) if ``with_count`` is True.
     :rtype: list(Package)
     :raises pkgdb2.lib.PkgdbException: There are few conditions leading to
         this exception beeing raised:
             - The provided ``limit`` is not an integer.
             - The provided ``page`` is not an integer.
+            - The provided ``after`` is not a valid cursor.
 
     """
     if '*' in pkg_name:
@@ -722,6 +1042,10 @@ def search_package(session, pkg_name, pkg_branch=None, pkg_poc=None,
     if page is not None and page > 0 and limit is not None and limit > 0:
         page = (page - 1) * limit
 
+    if after:
+        after = _decode_cursor(after, 1)
+        page = None
+
     return model.Package.search(
         session,
         pkg_name=pkg_name,
@@ -735,6 +1059,9 @@ def search_package(session, pkg_name, pkg_branch=None, pkg_poc=None,
         limit=limit,
         count=count,
         case_sensitive=case_sensitive,
+        with_count=with_count,
+        after=after,
+        with_acls=with_acls,
     )
 
 
@@ -785,7 +1112,7 @@ def search_collection(session, pattern, status=None, page=None,
 
 
 def search_packagers(session, pattern, eol=False, page=None, limit=None,
-                     count=False):
+                     count=False, after=None):
     """ Return the list of Packagers maching the given pattern.
 
     :arg session: session with which to connect to the database.
@@ -798,6 +1125,8 @@ def search_packagers(session, pattern, eol=False, page=None, limit=None,
     :kwarg limit: the number of results to return.
     :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+    :kwarg after: a cursor as returned by ``get_cursor`` for the last
+        packager of the previous page. When provided, ``page`` is ignored.
     :returns: a list of ``PackageListing`` entry corresponding to the given
         criterias.
     :rtype: list(PackageListing)
@@ -805,6 +1134,7 @@ def search_packagers(session, pattern, eol=False, page=None, limit=None,
         this exception beeing raised:
             - The provided ``limit`` is not an integer.
             - The provided ``page`` is not an integer.
+            - The provided ``after`` is not a valid cursor.
 
     """
     if '*' in pattern:
@@ -825,13 +1155,18 @@ def search_packagers(session, pattern, eol=False, page=None, limit=None,
     if page is not None and page > 0 and limit is not None and limit > 0:
         page = (page - 1) * limit
 
+    if after:
+        after = _decode_cursor(after, 1)
+        page = None
+
     packagers = model.PackageListing.search_packagers(
         session,
         pattern=pattern,
         eol=eol,
         offset=page,
         limit=limit,
-        count=count)
+        count=count,
+        after=after)
 
     return packagers
 
@@ -839,7 +1174,7 @@ def search_packagers(session, pattern, eol=False, page=None, limit=None,
 def search_actions(
         session, package=None, packager=None,
         action=None, status='Awaiting Review', page=None,
-        limit=None, count=False):
+        limit=None, count=False, after=None):
     """ Return the list of actions requiring an admin and matching the
     given criteria.
 
@@ -853,12 +1188,15 @@ def search_actions(
     :kwarg limit: the number of results to return.
     :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+    :kwarg after: a cursor as returned by ``get_cursor`` for the last
+        action of the previous page. When provided, ``page`` is ignored.
     :returns: a list of ``Log`` entry corresponding to the given criterias.
     :rtype: list(Log)
     :raises pkgdb2.lib.PkgdbException: There are few conditions leading to
         this exception beeing raised:
             - The provided ``limit`` is not an integer.
             - The provided ``page`` is not an integer.
+            - The provided ``after`` is not a valid cursor.
             - The ``package`` name specified does not correspond to any
                 package.
 
@@ -886,6 +1224,10 @@ def search_actions(
     if page is not None and page > 0 and limit is not None and limit > 0:
         page = (page - 1) * limit
 
+    if after:
+        after = _decode_cursor(after, 2)
+        page = None
+
     if status and status.lower() == 'all':
         status = None
 
@@ -897,12 +1239,13 @@ def search_actions(
         status=status,
         offset=page,
         limit=limit,
-        count=count)
+        count=count,
+        after=after)
 
 
 def search_logs(session, package=None, packager=None,
                 from_date=None, page=None,
-                limit=None, count=False):
+                limit=None, count=False, after=None):
     """ Return the list of Collection matching the given criteria.
 
     :arg session: session with which to connect to the database.
@@ -913,12 +1256,15 @@ def search_logs(session, package=None, packager=None,
     :kwarg limit: the number of results to return.
     :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+    :kwarg after: a cursor as returned by ``get_cursor`` for the last
+        log of the previous page. When provided, ``page`` is ignored.
     :returns: a list of ``Log`` entry corresponding to the given criterias.
     :rtype: list(Log)
     :raises pkgdb2.lib.PkgdbException: There are few conditions leading to
         this exception beeing raised:
             - The provided ``limit`` is not an integer.
             - The provided ``page`` is not an integer.
+            - The provided ``after`` is not a valid cursor.
             - The ``package`` name specified does not correspond to any
                 package.
 
@@ -946,22 +1292,141 @@ def search_logs(session, package=None, packager=None,
     if page is not None and page > 0 and limit is not None and limit > 0:
         page = (page - 1) * limit
 
+    if after:
+        after = _decode_cursor(after, 2)
+        if not isinstance(after[0], datetime):
+            raise PkgdbException('Invalid cursor provided')
+        page = None
+
     if from_date:
         # Make sure we get all the events of the day asked
         from_date = from_date + timedelta(days=1)
 
+    if count:
+        return model.Log.search(
+            session,
+            package_id=package_id,
+            packager=packager,
+            from_date=from_date,
+            count=True,
+        ) + _count_archived_logs(session, package_id, packager, from_date)
+
     return model.Log.search(session,
                             package_id=package_id,
                             packager=packager,
                             from_date=from_date,
                             offset=page,
                             limit=limit,
-                            count=count)
+                            after=after)
+
+
+def _count_archived_logs(session, package_id, packager, from_date):
+    """ Return the number of archived logs matching the given criteria.
+
+    The archive only changes when logs are archived, which changes the
+    date of the oldest log in the Log table and so the key of the count
+    in the cache: the count never expires.
+    """
+    key = 'pkgdb2.log_archive.count:%s' % hashlib.sha1('|'.join([
+        str(model.Log.oldest(session)),
+        str(package_id),
+        packager.encode('utf-8') if packager else '',
+        str(from_date),
+    ])).hexdigest()
+
+    return pkgdb2.CACHE.get_or_create(
+        key,
+        lambda: model.LogArchive.search(
+            session,
+            package_id=package_id,
+            packager=packager,
+            from_date=from_date,
+            count=True),
+    )
+
+
+def archive_logs(session, days):
+    """ Move the logs older than the specified number of days out of the
+    Log table, to the LogArchive table.
+
+    :arg session: session with which to connect to the database.
+    :arg days: the number of days of logs to keep in the Log table.
+    :returns: the number of logs archived.
+    :raises pkgdb2.lib.PkgdbException: The provided ``days`` is not a
+        positive integer.
+
+    """
+    try:
+        days = int(days)
+    except ValueError:
+        raise PkgdbException('Wrong number of days provided')
+    if days < 1:
+        raise PkgdbException('Wrong number of days provided')
+
+    return model.Log.archive(
+        session, datetime.utcnow() - timedelta(days=days))
+
+
+def expire_pending_actions(session, user, days=7):
+    """ Move the admin actions ``Pending`` for more than the specified
+    number of days to ``Awaiting Review``, logging the change of each of
+    them.
+
+    This method only flushes the changes, nothing is committed to the
+    database.
+
+    :arg session: session with which to connect to the database.
+    :arg user: the user making the action.
+    :kwarg days: the number of days an action stays ``Pending``, defaults
+        to 7.
+    :returns: the list of the messages logged, one per action moved.
+    :rtype: list(str)
+    :raises pkgdb2.lib.PkgdbException: There are two conditions leading to
+        this exception beeing raised:
+            - The provided ``days`` is not a positive integer.
+            - An error occured while updating the actions in the database.
+
+    """
+    try:
+        days = int(days)
+    except ValueError:
+        raise PkgdbException('Wrong number of days provided')
+    if days < 1:
+        raise PkgdbException('Wrong number of days provided')
+
+    actions = model.AdminAction.get_expired_pending(
+        session, datetime.utcnow() - timedelta(days=days))
+
+    changes = []
+    for action in actions:
+        action._status = 'Awaiting Review'
+        changes.append((action.package, dict(
+            agent=user.username,
+            old_status='Pending',
+            new_status='Awaiting Review',
+            action=action.to_json(),
+        )))
+
+    try:
+        session.flush()
+    except SQLAlchemyError, err:  # pragma: no cover
+        session.rollback()
+        pkgdb2.LOG.exception(err)
+        raise PkgdbException('Could not update the actions.')
+
+    return pkgdb2.lib.utils.log_bulk(
+        session, 'admin.action.status.update', changes,
+        'admin.action.status.update.bulk', dict(
+            agent=user.username,
+            old_status='Pending',
+            new_status='Awaiting Review',
+            actions=[message['action']['id'] for _, message in changes],
+        ))
 
 
 def get_acl_packager(
         session, packager, acls=None, eol=False, poc=None,
-        page=1, limit=100, count=False):
+        page=1, limit=100, count=False, after=None):
     """ Return the list of ACL associated with a packager.
 
     :arg session: session with which to connect to the database.
@@ -984,6 +1449,8 @@ def get_acl_packager(
     :kwarg limit: the number of results to return.
     :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+    :kwarg after: a cursor as returned by ``get_cursor`` for the last
+        ACL of the previous page. When provided, ``page`` is ignored.
     :returns: a list of ``PackageListingAcl`` associated to the specified
         user.
     :rtype: list(PackageListingAcl)
@@ -999,6 +1466,10 @@ def get_acl_packager(
     if page is not None and page > 0 and limit is not None and limit > 0:
         page = (page - 1) * limit
 
+    if after:
+        after = _decode_cursor(after, 1)
+        page = None
+
     return model.PackageListingAcl.get_acl_packager(
         session,
         packager=packager,
@@ -1007,7 +1478,8 @@ def get_acl_packager(
         poc=poc,
         offset=page,
         limit=limit,
-        count=count)
+        count=count,
+        after=after)
 
 
 def get_critpath_packages(session, branch=None):
@@ -1066,6 +1538,61 @@ def get_package_maintained(
     return [output[key] for key in sorted(output)]
 
 
+def get_packager_stats(session, packager, eol=False):
+    """ Return the number of packages the given packager is the point of
+    contact of and co-maintains on each active collection.
+
+    The counts are computed in a single query. If
+    ``PKGDB2_PACKAGER_STATS_CACHE`` is set, they are cached until the ACLs
+    of the packager, the status of one of the packages or the collections
+    change.
+
+    :arg session: session with which to connect to the database.
+    :arg packager: the name of the packager to retrieve the stats of.
+    :kwarg eol: a boolean to specify whether to include the EOL
+        collections in the output. The packages are only counted on the
+        collections that are not EOL.
+    :returns: a dictionary associating to the branch name of each
+        collection a dictionary with the number of packages of the
+        packager as ``point of contact`` and as ``co-maintainer``.
+    :rtype: dict(str, dict(str, int))
+
+    """
+    def _get_stats():
+        ''' Query the database for the stats of the packager. '''
+        counts = dict(
+            (branchname, (poc, comaintainer))
+            for branchname, poc, comaintainer in
+            model.Package.count_package_of_user(session, packager)
+        )
+
+        output = {}
+        for collection in model.Collection.all(session):
+            if not eol and collection.status not in [
+                    'Active', 'Under Development']:
+                continue
+            poc, comaintainer = counts.get(collection.branchname, (0, 0))
+            output[collection.branchname] = {
+                'point of contact': poc,
+                'co-maintainer': comaintainer,
+            }
+        return output
+
+    if not pkgdb2.APP.config.get('PKGDB2_PACKAGER_STATS_CACHE', False):
+        return _get_stats()
+
+    generations = pkgdb2.lib.snapshots.get_generations(
+        [pkgdb2.lib.snapshots.user_scope(packager), 'packagers'])
+    if None in generations:
+        return _get_stats()
+
+    key = hashlib.sha1('|'.join(
+        [packager.encode('utf-8'), str(bool(eol))] + generations
+    )).hexdigest()
+    return pkgdb2.CACHE.get_or_create(
+        'pkgdb2.packager_stats.%s' % key, _get_stats)
+
+
 def get_package_watch(
         session, packager, branch=None, pkg_status=None, eol=False):
     """ Return all the packages and branches that the given packager
@@ -1287,6 +1814,98 @@ def edit_package(session, package, pkg_name=None, pkg_summary=None,
             raise PkgdbException('Could not edit package.')
 
 
+def sync_package_info(session, packages_info, user, dry_run=False):
+    """ Update the summary, description and upstream URL of the approved
+    packages with the ones found in the metadata of a repository.
+
+    The packages are read with one query and only the ones which changed
+    are updated, with one query. The changes are logged at once and a
+    single fedmsg message summarizes them.
+
+    This method only flushes the changes, nothing is committed to the
+    database.
+
+    :arg session: the session with which to connect to the database.
+    :arg packages_info: a dict associating the name of the packages to a
+        tuple (summary, description, upstream URL) as found in the metadata
+        of the repository.
+    :arg user: The user performing the update.
+    :kwarg dry_run: a boolean specifying whether to only return the changes
+        to make or to apply them. Defaults to False.
+    :returns: a tuple (changes, unknown), ``changes`` being a list of dict
+        with the ``name`` of each package to update and the ``fields`` to
+        update, associated to a tuple (current value, new value), and
+        ``unknown`` the list of the name of the approved packages absent
+        from ``packages_info``.
+    :raises pkgdb2.lib.PkgdbException: There are two conditions leading to
+        this exception beeing raised:
+            - You are not allowed to edit a package, only pkgdb admin can.
+            - An error occured while updating the packages in the database
+                the message returned is a dummy information message to
+                return to the user, the trace back is in the logs.
+
+    """
+    if not pkgdb2.is_pkgdb_admin(user):
+        raise PkgdbException('You are not allowed to edit packages')
+
+    changes = []
+    updates = []
+    unknown = []
+    for package in model.Package.by_status(session, 'Approved'):
+        if package.name not in packages_info:
+            unknown.append(package.name)
+            continue
+
+        edited = []
+        values = {}
+        for field, value in zip(
+                ['summary', 'description', 'upstream_url'],
+                packages_info[package.name]):
+            # As in edit_package, empty values are ignored
+            if value and value != getattr(package, field):
+                edited.append(field)
+                values[field] = value
+
+        if edited:
+            updates.append((package, edited, values))
+            changes.append(dict(
+                name=package.name,
+                fields=dict(
+                    (field, (getattr(package, field), values[field]))
+                    for field in edited
+                ),
+            ))
+
+    if dry_run or not updates:
+        return changes, unknown
+
+    try:
+        model.Package.bulk_update_info(
+            session, [(package, values) for package, _, values in updates])
+        pkgdb2.lib.utils.log_bulk(
+            session, 'package.update',
+            [
+                (package, dict(
+                    agent=user.username,
+                    fields=edited,
+                    package=package.to_json(acls=False),
+                ))
+                for package, edited, _ in updates
+            ],
+            'package.update.bulk', dict(
+                agent=user.username,
+                changes=[
+                    dict(package_name=package.name, fields=edited)
+                    for package, edited, _ in updates
+                ],
+            ))
+    except SQLAlchemyError, err:  # pragma: no cover
+        pkgdb2.LOG.exception(err)
+        raise PkgdbException('Could not update the packages.')
+
+    return changes, unknown
+
+
 def update_collection_status(session, clt_branchname, clt_status, user):
     """ Update the status of a collection.
 
@@ -1371,6 +1990,20 @@ def get_pending_acl_user(session, user=None):
     return output
 
 
+def get_pending_acl_count(session, user):
+    """ Return the number of pending ACLs on any of the packages owned by
+    the specified user.
+
+    :arg session: session with which to connect to the database.
+    :arg user: the user owning the packages on which to count the pending
+        ACLs.
+    :returns: the number of ACLs awaiting review the user can approve.
+    :rtype: int
+
+    """
+    return model.PendingAcl.count(session, user)
+
+
 def get_acl_user_package(session, user, package, status=None):
     """ Return the ACLs on a specified package for the specified user.
 
@@ -1425,22 +2058,11 @@ def has_acls(session, user, package, acl, branch=None):
     if package is None or acl is None:
         return False
 
-    acls = get_acl_user_package(session, user=user,
-                                package=package, status='Approved')
-
     if isinstance(acl, basestring):
         acl = [acl]
 
-    user_has_acls = False
-    for user_acl in acls:
-        if not branch and user_acl['acl'] in acl:
-            user_has_acls = True
-            break
-        elif branch and user_acl['collection'] == branch \
-                and user_acl['acl'] in acl:
-            user_has_acls = True
-            break
-    return user_has_acls
+    return model.PackageListingAcl.has_acls(
+        session, user=user, package=package, acls=acl, branch=branch)
 
 
 def get_status(session, status='all'):
@@ -1605,19 +2227,26 @@ def unorphan_package(session, pkg_name, pkg_branch, pkg_user, user):
     )
 
 
-def add_branch(session, clt_from, clt_to, user):
+def add_branch(session, clt_from, clt_to, user, chunk_size=500,
+               progress=None):
     """ Clone a the permission from a branch to another.
 
-    This method only flushes the new objects, the only thing committed is
-    the log message when the branching starts.
+    The packages are branched by chunks of ``chunk_size`` packages, each
+    chunk being committed on its own. If a chunk fails, its packages are
+    branched one by one to find out which ones fail.
+    Packages already present in the branch to are skipped, so running it
+    again after a failure resumes the branching where it stopped.
 
     :arg session: session with which to connect to the database.
     :arg clt_from: the ``branchname`` of the collection to branch from.
     :arg clt_to: the ``branchname`` of the collection to branch to.
     :arg user: the user making the action.
-    :returns: a list of errors generated while branching, these errors
-        might be the results of trying to create a PackageListing object
-        already existing.
+    :kwarg chunk_size: the number of packages to branch per transaction.
+        Defaults to 500.
+    :kwarg progress: a callable called after each chunk with the number
+        of packages processed and the total number of packages to branch.
+    :returns: a list of messages generated while branching, saying which
+        package was branched and which one failed to be branched.
     :rtype: list(str)
     :raises pkgdb2.lib.PkgdbException: There are three conditions leading to
         this exception beeing raised:
@@ -1647,26 +2276,41 @@ def add_branch(session, clt_from, clt_to, user):
     ))
     session.commit()
 
+    packages = model.PackageListing.get_packages_to_branch(
+        session, clt_from, clt_to)
+    success = '%%s branched successfully from %s to %s %s' % (
+        clt_from.name, clt_to.name, clt_to.version)
+    failure = 'FAILED: %%s failed to branch from %s to %s %s' % (
+        clt_from.name, clt_to.name, clt_to.version)
+
     messages = []
-    for pkglist in model.PackageListing.by_collectionid(
-            session, clt_from.id):
-        if pkglist.status in ('Approved','Orphaned'):
-            try:
-                pkglist.branch(session, clt_to)
-                # Should not fail since the flush() passed
-                session.commit()
-                messages.append(
-                    '%s branched successfully from %s to %s %s' % (
-                        pkglist.package.name, clt_from.name, clt_to.name,
-                        clt_to.version))
-            except SQLAlchemyError, err:  # pragma: no cover
-                session.rollback()
-                pkgdb2.LOG.debug(err)
-                messages.append(
-                    'FAILED: %s failed to branch from %s to %s %s' % (
-                        pkglist.package.name, clt_from.name, clt_to.name,
-                        clt_to.version))
-                messages.append(str(err))
+    for cnt in range(0, len(packages), chunk_size):
+        chunk = packages[cnt:cnt + chunk_size]
+        try:
+            model.PackageListing.bulk_branch(
+                session, clt_from, clt_to, [pkg[0] for pkg in chunk])
+            session.commit()
+            messages.extend([success % pkg[1] for pkg in chunk])
+        except SQLAlchemyError, err:
+            session.rollback()
+            pkgdb2.LOG.debug(err)
+            for pkgid, pkgname in chunk:
+                try:
+                    model.PackageListing.bulk_branch(
+                        session, clt_from, clt_to, [pkgid])
+                    session.commit()
+                    messages.append(success % pkgname)
+                except SQLAlchemyError, err:
+                    session.rollback()
+                    pkgdb2.LOG.debug(err)
+                    messages.append(failure % pkgname)
+                    messages.append(str(err))
+
+        if progress:
+            progress(cnt + len(chunk), len(packages))
+
+    # The new package listings were created behind the back of the ORM
+    model.PendingAcl.refresh(session)
 
     pkgdb2.lib.utils.log(session, None, 'branch.complete', dict(
         agent=user.username,
@@ -1919,6 +2563,42 @@ def count_fedora_collection(session):
     return collections_fedora
 
 
+def get_stats(session):
+    """ Return the statistics about the packages displayed on the stats
+    page.
+
+    The statistics are computed once and kept as a snapshot (see
+    ``pkgdb2.lib.snapshots``) until a change impacting them is logged.
+    The object returned is shared, it must not be modified.
+
+    :arg session: the session to connect to the database with.
+    :returns: a dictionary with:
+        - ``collections``: the list of [branch name, number of packages] of
+            each active collection, see ``count_collection``,
+        - ``fedora_collections``: the list of [version, number of packages]
+            of each Fedora collection, see ``count_fedora_collection``,
+        - ``top_maintainers``: the list of [username, number of packages]
+            of the top maintainers, see ``get_top_maintainers``,
+        - ``top_poc``: the list of [username, number of packages] of the top
+            points of contact, see ``get_top_poc``.
+
+    """
+    def _get_stats():
+        ''' Query the database for the statistics. '''
+        return {
+            'collections': [
+                list(row) for row in count_collection(session)],
+            'fedora_collections': [
+                list(row) for row in count_fedora_collection(session)],
+            'top_maintainers': [
+                list(row) for row in get_top_maintainers(session)],
+            'top_poc': [
+                list(row) for row in get_top_poc(session)],
+        }
+
+    return pkgdb2.lib.snapshots.get_snapshot('stats', 'stats', _get_stats)
+
+
 def get_groups(session):
     """ Return the list of FAS groups involved in maintaining packages in
     the database
@@ -1929,6 +2609,29 @@ def get_groups(session):
     return model.get_groups(session)
 
 
+def iter_notify(session, eol=False, name=None, version=None, acls=None):
+    """ Iterate over the users that should be notify for each package.
+
+    The packages are returned in the order of their name, the rows being
+    fetched from the database by batch.
+
+    :arg session: the session to connect to the database with.
+    :kwarg eol: a boolean to specify wether the output should include End
+        Of Life releases or not.
+    :kwarg name: restricts the output to a specific collection name.
+    :kwarg version: restricts the output to a specific collection version.
+    :kwarg acls: a list of ACLs to filter the package/user to retrieve.
+        See ``notify`` for the details.
+    :returns: an iterator of tuple (package name, comma separated list of
+        users).
+
+    """
+    pkgs = model.notify(session=session, eol=eol, name=name,
+                        version=version, acls=acls, stream=True)
+    for pkgname, rows in itertools.groupby(pkgs, operator.itemgetter(0)):
+        yield pkgname, ','.join([row[1] for row in rows])
+
+
 def notify(session, eol=False, name=None, version=None, acls=None):
     """ Return the user that should be notify for each package.
 
@@ -1945,15 +2648,36 @@ def notify(session, eol=False, name=None, version=None, acls=None):
         If the acls specified is ``all`` then all ACLs are used.
 
     """
-    output = {}
-    pkgs = model.notify(session=session, eol=eol, name=name,
-                        version=version, acls=acls)
-    for pkg in pkgs:
-        if pkg[0] in output:  # pragma: no cover
-            output[pkg[0]] += ',' + pkg[1]
-        else:
-            output[pkg[0]] = pkg[1]
-    return output
+    return dict(iter_notify(
+        session=session, eol=eol, name=name, version=version, acls=acls))
+
+
+def iter_bugzilla(session, name=None):
+    """ Iterate over the information to sync ACLs with bugzilla.
+
+    The packages are returned ordered by collection name and package name,
+    the rows being fetched from the database by batch.
+
+    :arg session: the session to connect to the database with.
+    :kwarg name: restricts the output to a specific collection name.
+    :returns: an iterator of dict having for keys: 'collection', 'name',
+        'summary', 'poc', 'qa' and 'cc', 'cc' being the comma separated
+        list of the people watching a branch of the package of which they
+        are not the point of contact.
+
+    """
+    for clt, pkgname, summary, poc, watchers in model.bugzilla_grouped(
+            session=session, name=name, stream=True):
+        watchers = set(watchers.split(',')) if watchers else set()
+        watchers.discard('orphan')
+        yield {
+            'collection': clt,
+            'name': pkgname,
+            'summary': summary,
+            'poc': poc,
+            'qa': '',
+            'cc': ','.join(sorted(watchers)),
+        }
 
 
 def bugzilla(session, name=None):
@@ -1964,77 +2688,38 @@ def bugzilla(session, name=None):
 
     """
     output = {}
-    pkgs = model.bugzilla(session=session, name=name)
-
-    # 0  Collection.name
-    # 1  Collection.version
-    # 2  Package.name
-    # 3  Package.summary
-    # 4  PackageListing.point_of_contact
-    # 5  PackageListingAcl.fas_name
-    # 6  Collection.branchname
-
-    for pkg in pkgs:
-        version = pkg[1]
-        if pkg[1] == 'devel':
-            if pkg[4] != 'orphan':
-                version = 10000
-            else:
-                version = 0
-
-        if pkg[0] in output:
-            if pkg[2] in output[pkg[0]]:
-                # Check poc
-                if pkg[4] == 'orphan':
-                    pass
-                elif output[pkg[0]][pkg[2]]['poc'] == 'orphan':
-                    output[pkg[0]][pkg[2]]['poc'] = pkg[4]
-                    output[pkg[0]][pkg[2]]['version'] = version
-                elif int(version) > int(output[pkg[0]][pkg[2]]['version']):
-                    output[pkg[0]][pkg[2]]['poc'] = pkg[4]
-                    output[pkg[0]][pkg[2]]['version'] = version
-                # If #5 is not poc, add it to cc
-                if pkg[5] != 'orphan' \
-                        and pkg[5] != output[pkg[0]][pkg[2]]['poc'] \
-                        and pkg[5] not in output[pkg[0]][pkg[2]]['cc']:
-                    if output[pkg[0]][pkg[2]]['cc']:
-                        output[pkg[0]][pkg[2]]['cc'] += ','
-                    output[pkg[0]][pkg[2]]['cc'] += pkg[5]
-            else:
-                cc = ''
-                if pkg[5] != pkg[4]:  # pragma: no cover
-                    cc = pkg[5]
-                output[pkg[0]][pkg[2]] = {
-                    'collection': pkg[0],
-                    'name': pkg[2],
-                    'summary': pkg[3],
-                    'poc': pkg[4],
-                    'qa': '',
-                    'cc': cc,
-                    'version': version,
-                }
-        else:
-            cc = ''
-            if pkg[5] != pkg[4]:
-                cc = pkg[5]
-            output[pkg[0]] = {
-                pkg[2]: {
-                    'collection': pkg[0],
-                    'name': pkg[2],
-                    'summary': pkg[3],
-                    'poc': pkg[4],
-                    'qa': '',
-                    'cc': cc,
-                    'version': version,
-                }
-            }
-
+    for entry in iter_bugzilla(session=session, name=name):
+        output.setdefault(entry['collection'], {})[entry['name']] = entry
     return output
 
 
+def _iter_vcs_acls(packages):
+    """ For a given list of package/user/branch ordered by package and
+    branch, iterate over the users and groups having commit access to each
+    package in each branch.
+
+    :returns: an iterator of tuple (package name, branch name, list of
+        users, list of groups).
+
+    """
+    for (pkgname, branchname), rows in itertools.groupby(
+            packages, operator.itemgetter(0, 2)):
+        users = []
+        groups = []
+        for _, username, _ in rows:
+            if not username:
+                continue
+            if username.startswith('group::'):
+                groups.append(username.replace('group::', ''))
+            else:
+                users.append(username)
+        yield pkgname, branchname, users, groups
+
+
 def _vcs_acls_json(packages, skip_pp=None):
-    """ For a given list of package/user/branch build a dict of dict
-    representating of who has commit access to which package.
+    """ For a given list of package/user/branch ordered by package and
+    branch build a dict of dict representating of who has commit access to
+    which package.
 
     The output dict is something like:
 
@@ -2058,36 +2743,47 @@ def _vcs_acls_json(packages, skip_pp=None):
     }
     """
     output = {}
-    for pkgname, username, branchname in packages:
-        user = None
-        group = None
-        if username and username.startswith('group::'):
-                group = username.replace('group::', '')
-        else:
-            user = username
+    for pkgname, branchname, users, groups in _iter_vcs_acls(packages):
+        if skip_pp and pkgname not in skip_pp:
+            groups.insert(0, 'provenpackager')
 
-        if pkgname not in output:
-            output[pkgname] = {}
+        output.setdefault(pkgname, {})[branchname] = {
+            'commit': {'groups': groups, 'people': users}
+        }
+    return output
 
-        if branchname not in output[pkgname]:
-            groups = []
-            if skip_pp and pkgname not in skip_pp:
-                groups.append('provenpackager')
 
-            output[pkgname][branchname] = {
-                'commit': {'groups': groups, 'people': []}
-            }
+def _iter_vcs_acls_text(packages, skip_pp=None):
+    """ For a given list of package/user/branch ordered by package and
+    branch iterate over who has access to each package on each branch.
 
-        if group:
-            output[pkgname][branchname]['commit']['groups'].append(group)
-        if user:
-            output[pkgname][branchname]['commit']['people'].append(user)
-    return output
+    Each entry is something like:
+
+        {
+          name: "pkg1",
+          branch: "branch1",
+          user: "user1,user2",
+          group: "@group1,@group2",
+        }
+
+    """
+    for pkgname, branchname, users, groups in _iter_vcs_acls(packages):
+        groups = ['@%s' % group for group in groups]
+        if skip_pp is None or pkgname not in skip_pp:
+            groups.insert(0, '@provenpackager')
+
+        yield {
+            'name': pkgname,
+            'user': ','.join(users),
+            'group': ','.join(groups),
+            'branch': branchname,
+        }
 
 
 def _vcs_acls_text(packages, skip_pp=None):
-    """ For a given list of package/user/branch return a dict of dict of dict
-    listing for each package, for each branch who has access to what.
+    """ For a given list of package/user/branch ordered by package and
+    branch return a dict of dict of dict listing for each package, for
+    each branch who has access to what.
 
     The output dict is something like:
 
@@ -2096,14 +2792,14 @@ def _vcs_acls_text(packages, skip_pp=None):
         branch1: {
           name: "pkg1",
           branch: "branch1",
-          user: "user1, user2",
-          group: "@group1, @group2",
+          user: "user1,user2",
+          group: "@group1,@group2",
         },
         branch2: {
           name: "pkg1",
           branch: "branch2",
           user: "user1",
-          group: "@group1, @group3"
+          group: "@group1,@group3"
         },
       },
       pkg2:
@@ -2113,51 +2809,28 @@ def _vcs_acls_text(packages, skip_pp=None):
 
     """
     output = {}
-    for pkgname, username, branchname in packages:
-        user = None
-        group = None
-        if username and username.startswith('group::'):
-                group = username.replace('group::', '@')
-        else:
-            user = username
-
-        groups = ''
-        if pkgname not in skip_pp:
-            groups = '@provenpackager'
-
-        if pkgname in output:
-            if branchname in output[pkgname]:
-                if user:
-                    if output[pkgname][branchname]['user']:
-                        output[pkgname][branchname]['user'] += ','
-                    output[pkgname][branchname]['user'] += user
-                elif group:  # pragma: no cover
-                    if output[pkgname][branchname]['group'].strip():
-                        output[pkgname][branchname]['group'] += ','
-                    output[pkgname][branchname]['group'] += group
-            else:
-                if group and groups:  # pragma: no cover
-                    group = ',' + group
+    for entry in _iter_vcs_acls_text(packages, skip_pp):
+        output.setdefault(entry['name'], {})[entry['branch']] = entry
+    return output
 
 
-                output[pkgname][branchname] = {
-                    'name': pkgname,
-                    'user': user or '',
-                    'group': groups + (group or ''),
-                    'branch': branchname,
-                }
-        else:
-            if group and groups:
-                group = ',' + group
-            output[pkgname] = {
-                branchname: {
-                    'name': pkgname,
-                    'user': user or '',
-                    'group': groups + (group or ''),
-                    'branch': branchname,
-                }
-            }
-    return output
+def iter_vcs_acls(session, eol=False, skip_pp=None):
+    """ Iterate over the information to sync ACLs with gitolite.
+
+    The entries are returned ordered by package name and branch name, the
+    rows being fetched from the database by batch.
+
+    :arg session: the session to connect to the database with.
+    :kwarg eol: A boolean specifying whether to include information about
+        End Of Life collections or not. Defaults to ``False``.
+    :kwarg skip_pp: the list of packages on which the provenpackager group
+        does not have commit.
+    :returns: an iterator of dict having for keys: 'name', 'branch', 'user'
+        and 'group', 'user' and 'group' being comma separated lists.
+
+    """
+    pkgs = model.vcs_acls(session=session, eol=eol, stream=True)
+    return _iter_vcs_acls_text(pkgs, skip_pp)
 
 
 def vcs_acls(session, eol=False, oformat='text', skip_pp=None):
@@ -2171,7 +2844,7 @@ def vcs_acls(session, eol=False, oformat='text', skip_pp=None):
 
     """
     output = {}
-    pkgs = model.vcs_acls(session=session, eol=eol)
+    pkgs = model.vcs_acls(session=session, eol=eol, stream=True)
     if oformat == 'json':
         output = _vcs_acls_json(pkgs, skip_pp)
     else:
@@ -2245,6 +2918,9 @@ def set_critpath_packages(
             branches=branches,
             package=package.to_json(),
         ))
+        # Not logged against the package, invalidate its information
+        pkgdb2.lib.snapshots.mark_changed(
+            session, 'package.critpath.update', packages=[package.name])
     except SQLAlchemyError, err:  # pragma: no cover
         pkgdb2.LOG.exception(err)
         raise PkgdbException('Could not edit package.')
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+In-memory graph of the ACLs.
+
+When ``PKGDB2_ACL_GRAPH`` is set, each worker loads the packages, their
+listings and their ACLs in an ``AclGraph`` and answers the read-only
+endpoints listing who maintains what (``/api/notify``, ``/api/critpath``
+and ``/api/groups``) from it, without querying the database.
+
+The graph is used for at most ``PKGDB2_ACL_GRAPH_MAX_AGE`` seconds before
+checking whether the ACLs changed, in which case it is reloaded. The
+changes are detected with the generation of the ``acls`` scope of
+``pkgdb2.lib.snapshots`` or, if the cache backend does not keep it, with
+the identifier of the last entry of the Log table.
+'''
+
+import array
+import itertools
+import threading
+import time
+
+import pkgdb2
+from pkgdb2.lib import model
+from pkgdb2.lib import snapshots
+
+
+# The graph currently used by this process, as a tuple (graph, version,
+# time of the last check)
+_CURRENT = None
+_LOCK = threading.Lock()
+
+
+class AclGraph(object):
+    ''' The ACLs of all the packages, stored in arrays of integers.
+
+    The strings (user names, ACLs, status...) are stored once in
+    ``strings`` and referred to by their index in this list.
+
+    The listings of the package ``idx`` are the ones from
+    ``package_start[idx]`` to ``package_start[idx + 1]`` and the ACLs of
+    the listing ``idx`` are the ones from ``acl_start[idx]`` to
+    ``acl_start[idx + 1]``.
+    '''
+
+    def __init__(self, collections, listings, acls):
+        ''' Instanciate an AclGraph object.
+
+        :arg collections: an iterable of ``Collection``.
+        :arg listings: an iterable of tuples as returned by
+            ``model.PackageListing.get_acl_graph_data``.
+        :arg acls: an iterable of tuples as returned by
+            ``model.PackageListingAcl.get_acl_graph_data``.
+
+        '''
+        self.strings = []
+        self._ids = {}
+        self._notify = {}
+
+        self.collections = dict(
+            (clt.id, (clt.name, clt.version, clt.branchname, clt.status))
+            for clt in collections
+        )
+
+        self.packages = []
+        self.package_ids = array.array('l')
+        self.package_status = array.array('l')
+        self.package_start = array.array('l')
+
+        self.listing_ids = array.array('l')
+        self.listing_package = array.array('l')
+        self.listing_collection = array.array('l')
+        self.listing_poc = array.array('l')
+        self.listing_status = array.array('l')
+        self.critpath = array.array('l')
+
+        for (listing_id, pkg_id, pkg_name, pkg_status, clt_id, poc, status,
+                critpath) in listings:
+            if not self.packages or self.packages[-1] != pkg_name:
+                self.packages.append(pkg_name)
+                self.package_ids.append(pkg_id)
+                self.package_status.append(self._intern(pkg_status))
+                self.package_start.append(len(self.listing_ids))
+            if critpath:
+                self.critpath.append(len(self.listing_ids))
+            self.listing_ids.append(listing_id)
+            self.listing_package.append(len(self.packages) - 1)
+            self.listing_collection.append(clt_id)
+            self.listing_poc.append(self._intern(poc))
+            self.listing_status.append(self._intern(status))
+        self.package_start.append(len(self.listing_ids))
+
+        self.acl_start = array.array('l')
+        self.acl_listing = array.array('l')
+        self.acl_user = array.array('l')
+        self.acl_kind = array.array('l')
+        self.acl_status = array.array('l')
+
+        # Both iterables are in the same order, so the ACLs of each
+        # listing follow each other. They are read by two queries, the
+        # ACLs of the listings created or renamed in between are unknown
+        # or out of order: they are skipped, the graph is reloaded anyway
+        # since the ACLs changed.
+        positions = dict(
+            (listing_id, idx) for idx, listing_id in enumerate(
+                self.listing_ids))
+        listing = 0
+        for listing_id, fas_name, acl, status in acls:
+            idx = positions.get(listing_id)
+            if idx is None or idx < listing:
+                continue
+            listing = idx
+            while len(self.acl_start) <= listing:
+                self.acl_start.append(len(self.acl_user))
+            self.acl_listing.append(listing)
+            self.acl_user.append(self._intern(fas_name))
+            self.acl_kind.append(self._intern(acl))
+            self.acl_status.append(self._intern(status))
+        while len(self.acl_start) <= len(self.listing_ids):
+            self.acl_start.append(len(self.acl_user))
+
+        # Per user index: the ACLs of each user and the listings they are
+        # the point of contact of
+        self.user_acls = {}
+        for idx, user in enumerate(self.acl_user):
+            self.user_acls.setdefault(user, array.array('l')).append(idx)
+        self.user_listings = {}
+        for idx, user in enumerate(self.listing_poc):
+            self.user_listings.setdefault(
+                user, array.array('l')).append(idx)
+
+    def _intern(self, value):
+        ''' Return the index of the provided string in ``strings``. '''
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+    def _string_id(self, value):
+        ''' Return the index of the provided string in ``strings`` or -1 if
+        no package, listing or ACL uses it. '''
+        return self._ids.get(value, -1)
+
+    def iter_notify(self, eol=False, name=None, version=None, acls=None):
+        ''' Iterate over the users that should be notify for each package.
+
+        Same as ``pkgdb2.lib.iter_notify``. The graph never changes once
+        loaded, so the result is kept for the next calls with the same
+        arguments.
+
+        :kwarg eol: a boolean to specify wether the output should include
+            End Of Life releases or not.
+        :kwarg name: restricts the output to a specific collection name.
+        :kwarg version: restricts the output to a specific collection
+            version.
+        :kwarg acls: a list of ACLs to filter the package/user to retrieve,
+            see ``pkgdb2.lib.model.notify``.
+        :returns: an iterator of tuple (package name, comma separated list
+            of users).
+
+        '''
+        if acls is None:
+            acls = ['watchcommits', 'watchbugzilla', 'commit']
+        elif acls == 'all':
+            acls = ['watchcommits', 'watchbugzilla', 'commit', 'approveacl']
+        elif isinstance(acls, basestring):
+            acls = [acls]
+
+        key = (eol is not False, name, version, tuple(sorted(acls)))
+        if key not in self._notify:
+            self._notify[key] = list(
+                self._iter_notify(eol, name, version, acls))
+        return iter(self._notify[key])
+
+    def _iter_notify(self, eol, name, version, acls):
+        ''' Iterate over the users that should be notify for each package.
+        '''
+        collections = set(
+            clt_id
+            for clt_id, (clt_name, clt_version, _, status)
+            in self.collections.items()
+            if (eol is not False or status != 'EOL')
+            and (not name or clt_name == name)
+            and (not version or clt_version == version)
+        )
+        kinds = set(self._string_id(acl) for acl in acls)
+        approved = self._string_id('Approved')
+        orphan = self._string_id('orphan')
+
+        for pkg_idx, pkg_name in enumerate(self.packages):
+            if self.package_status[pkg_idx] != approved:
+                continue
+            users = set()
+            for listing in range(
+                    self.package_start[pkg_idx],
+                    self.package_start[pkg_idx + 1]):
+                if self.listing_collection[listing] not in collections \
+                        or self.listing_poc[listing] == orphan:
+                    continue
+                for acl in range(
+                        self.acl_start[listing],
+                        self.acl_start[listing + 1]):
+                    if self.acl_kind[acl] in kinds \
+                            and self.acl_status[acl] == approved:
+                        users.add(self.strings[self.acl_user[acl]])
+            if users:
+                yield pkg_name, ','.join(sorted(users))
+
+    def get_critpath_packages(self, branch):
+        ''' Return the name of the packages marked as being critpath in the
+        specified branch.
+
+        Same as ``pkgdb2.lib.get_critpath_packages``, but returning the
+        name of the packages rather than their listing.
+
+        :arg branch: the branchname to retrieve the critpath packages of.
+        :returns: the list of the name of the packages, in the order of
+            their creation.
+
+        '''
+        collections = set(
+            clt_id
+            for clt_id, (_, _, branchname, _) in self.collections.items()
+            if branchname == branch
+        )
+        approved = self._string_id('Approved')
+
+        packages = [
+            (self.package_ids[self.listing_package[idx]],
+             self.packages[self.listing_package[idx]])
+            for idx in self.critpath
+            if self.listing_status[idx] == approved
+            and self.listing_collection[idx] in collections
+        ]
+        return [pkg_name for _, pkg_name in sorted(packages)]
+
+    def get_groups(self):
+        ''' Return the list of FAS groups involved in maintaining packages.
+
+        Same as ``pkgdb2.lib.get_groups``, the groups being sorted by name.
+
+        '''
+        approved = self._string_id('Approved')
+        active = set(
+            clt_id
+            for clt_id, (_, _, _, status) in self.collections.items()
+            if status != 'EOL'
+        )
+
+        def maintains(listing):
+            ''' Whether the listing is approved in an active collection. '''
+            return self.listing_status[listing] == approved \
+                and self.listing_collection[listing] in active
+
+        groups = []
+        for idx, user in enumerate(self.strings):
+            if not user.startswith('group::'):
+                continue
+            listings = itertools.chain(
+                self.user_listings.get(idx, ()),
+                (self.acl_listing[acl] for acl in self.user_acls.get(idx, ())),
+            )
+            if any(maintains(listing) for listing in listings):
+                groups.append(user.split('group::')[1])
+
+        return sorted(groups)
+
+
+def load(session):
+    ''' Load the ACL graph from the database.
+
+    :arg session: session with which to connect to the database.
+
+    '''
+    return AclGraph(
+        model.Collection.all(session),
+        model.PackageListing.get_acl_graph_data(session),
+        model.PackageListingAcl.get_acl_graph_data(session),
+    )
+
+
+def _get_version(session):
+    ''' Return a token changing every time the ACLs are changed. '''
+    generation = snapshots.get_generation('acls')
+    if generation is not None:
+        return generation
+    return model.Log.last_id(session)
+
+
+def get_graph(session):
+    ''' Return the ACL graph of this process, loading it if it was not
+    loaded yet or if the ACLs changed since it was loaded.
+
+    The graph is used without checking for changes for up to
+    ``PKGDB2_ACL_GRAPH_MAX_AGE`` seconds. While one thread reloads it, the
+    others keep using the previous graph.
+
+    :arg session: session with which to connect to the database.
+
+    '''
+    global _CURRENT
+
+    max_age = pkgdb2.APP.config.get('PKGDB2_ACL_GRAPH_MAX_AGE', 30)
+    current = _CURRENT
+    if current is not None and time.time() - current[2] < max_age:
+        return current[0]
+
+    if not _LOCK.acquire(current is None):
+        # Another thread is already checking the graph
+        return current[0]
+    try:
+        current = _CURRENT
+        if current is not None and time.time() - current[2] < max_age:
+            return current[0]
+
+        version = _get_version(session)
+        if current is None or current[1] != version:
+            graph = load(session)
+        else:
+            graph = current[0]
+        _CURRENT = (graph, version, time.time())
+        return graph
+    finally:
+        _LOCK.release()
+
+
+def get_version():
+    ''' Return the version of the ACLs of the graph loaded by this process,
+    None if it is not loaded yet. '''
+    current = _CURRENT
+    if current is None:
+        return None
+    return current[1]
+
+
+def reset():
+    ''' Forget the ACL graph loaded, the next call to ``get_graph`` loads
+    it again. '''
+    global _CURRENT
+    _CURRENT = None
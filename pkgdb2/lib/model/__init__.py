@@ -27,6 +27,7 @@ __requires__ = ['SQLAlchemy >= 0.7', 'jinja2 >= 2.4']
 import pkg_resources
 
 import datetime
+import itertools
 import json
 import logging
 import time
@@ -34,13 +35,19 @@ import time
 import sqlalchemy as sa
 from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import backref
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import Session
 from sqlalchemy.orm import relation
 from sqlalchemy.orm import backref
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.sql import or_
 from sqlalchemy.sql import and_
 from sqlalchemy.sql import not_
@@ -122,6 +129,378 @@ def drop_tables(db_url, engine):  # pragma: no cover
     BASE.metadata.drop_all(engine)
 
 
+class group_concat(sa.sql.functions.FunctionElement):
+    """ Aggregate the distinct values of a column into a comma separated
+    string.
+
+    This is ``string_agg`` on PostgreSQL and ``group_concat`` on SQLite
+    and MySQL. The order of the values in the string is not guaranteed.
+    """
+    type = sa.Text()
+    name = 'group_concat'
+
+
+@compiles(group_concat)
+def _group_concat_default(element, compiler, **kw):
+    """ SQLite ``group_concat`` uses a comma as separator by default. """
+    return 'group_concat(DISTINCT %s)' % compiler.process(
+        element.clauses, **kw)
+
+
+@compiles(group_concat, 'postgresql')
+def _group_concat_postgresql(element, compiler, **kw):
+    """ PostgreSQL only knows about ``string_agg``. """
+    return "string_agg(DISTINCT %s, ',')" % compiler.process(
+        element.clauses, **kw)
+
+
+@compiles(group_concat, 'mysql')
+def _group_concat_mysql(element, compiler, **kw):
+    """ MySQL needs the separator to be specified explicitly. """
+    return "group_concat(DISTINCT %s SEPARATOR ',')" % compiler.process(
+        element.clauses, **kw)
+
+
+def _stream(query, batch_size=1000):
+    """ Return an iterator over the results of the provided query, the
+    rows are fetched by batch using a server-side cursor when the database
+    supports it.
+
+    :arg query: the query to run.
+    :kwarg batch_size: the number of rows to fetch at once.
+
+    """
+    return query.execution_options(
+        stream_results=True).yield_per(batch_size)
+
+
+def _keyset(query, columns, values, descending=False):
+    """ Restrict the query to the rows coming after the provided values in
+    the order defined by the provided columns.
+
+    :arg query: the query to restrict.
+    :arg columns: the list of columns the query is ordered by, the last
+        one should be unique.
+    :arg values: the values of these columns for the last row returned.
+    :kwarg descending: a boolean specifying whether the query is sorted in
+        descending order. Defaults to False.
+
+    """
+    if len(values) != len(columns):
+        raise ValueError('Expected %s values' % len(columns))
+
+    condition = None
+    for column, value in reversed(zip(columns, values)):
+        if descending:
+            after = column < value
+        else:
+            after = column > value
+        if condition is None:
+            condition = after
+        else:
+            condition = or_(after, and_(column == value, condition))
+    return query.filter(condition)
+
+
+def _to_datetime(value):
+    """ Return the provided date as a datetime. """
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.combine(value, datetime.time())
+    return value
+
+
+def _filter_logs(query, cls, package_id=None, packager=None,
+                 from_date=None):
+    """ Restrict the query on the Log or LogArchive entries to the
+    entries matching the given criteria and order them from the most
+    recent to the oldest.
+    """
+    if package_id:
+        query = query.filter(cls.package_id == package_id)
+
+    if packager:
+        query = query.filter(cls.user == packager)
+
+    if from_date:
+        query = query.filter(cls.change_time <= from_date)
+
+    return query.order_by(cls.change_time.desc(), cls.id.desc())
+
+
+def _set_acls(listings, acls):
+    """ Attach the provided ACLs to their listing, unless the ACLs of the
+    listing are already loaded (they may have been changed in this
+    session).
+
+    :arg listings: the list of ``PackageListing`` to set the ACLs of.
+    :arg acls: the list of all the ``PackageListingAcl`` of these listings.
+
+    """
+    listing_acls = {}
+    for acl in acls:
+        listing_acls.setdefault(acl.packagelisting_id, []).append(acl)
+
+    for listing in listings:
+        if 'acls' in sa.inspect(listing).unloaded:
+            set_committed_value(
+                listing, 'acls', listing_acls.get(listing.id, []))
+
+
+def _load_listings(session, packages):
+    """ Load at once the listings of the provided packages, with their
+    collection and their ACLs, so that serializing these packages with
+    their ACLs does not query the database for each of them.
+
+    This runs two queries whatever the number of packages.
+
+    :arg session: the session with which to connect to the database.
+    :arg packages: the list of ``Package`` to load the listings of.
+
+    """
+    packages = dict((pkg.id, pkg) for pkg in packages)
+    if not packages:
+        return
+
+    listings = session.query(
+        PackageListing
+    ).filter(
+        PackageListing.package_id.in_(packages.keys())
+    ).options(
+        joinedload(PackageListing.collection)
+    ).order_by(
+        PackageListing.id
+    ).all()
+
+    acls = session.query(
+        PackageListingAcl
+    ).filter(
+        PackageListingAcl.packagelisting_id == PackageListing.id
+    ).filter(
+        PackageListing.package_id.in_(packages.keys())
+    ).order_by(
+        PackageListingAcl.id
+    ).all()
+
+    _set_acls(listings, acls)
+
+    package_listings = {}
+    for listing in listings:
+        package_listings.setdefault(listing.package_id, []).append(listing)
+        # Do not override collections already loaded, they may have been
+        # changed in this session
+        unloaded = sa.inspect(listing).unloaded
+        if 'package' in unloaded:
+            set_committed_value(
+                listing, 'package', packages[listing.package_id])
+
+    for pkg_id, package in packages.items():
+        if 'listings' in sa.inspect(package).unloaded:
+            set_committed_value(
+                package, 'listings', package_listings.get(pkg_id, []))
+
+
+_LOOKUP_KEY = 'pkgdb2_lookups'
+_ACL_CHECKS_KEY = 'pkgdb2_acl_checks'
+
+
+def _cached_lookup(session, key, creator):
+    """ Return the object stored under the provided key in the lookup
+    cache of the session, calling the creator to retrieve it if it is not
+    there yet.
+
+    The cache lives as long as the transaction of the session (so for a
+    request at most), results that are ``None`` are not cached and
+    exceptions raised by the creator are passed through.
+
+    :arg session: the session in which the object is looked up.
+    :arg key: an hashable object identifying the lookup.
+    :arg creator: a callable without argument running the query.
+
+    """
+    cache = session.info.setdefault(_LOOKUP_KEY, {})
+    if key in cache and cache[key] in session:
+        return cache[key]
+    obj = creator()
+    if obj is not None:
+        cache[key] = obj
+    return obj
+
+
+def _has_pending_changes(session):
+    """ Return whether the session has changes not flushed yet, which
+    could change the result of a lookup.
+    """
+    return bool(session.new or session.dirty or session.deleted)
+
+
+def _cache_listings(session, pkgid):
+    """ Load at once in the lookup cache of the session all the listings
+    of the provided package, with their collection and their ACLs, so that
+    looking them up one after the other does not query the database for
+    each of them.
+
+    This runs two queries whatever the number of listings.
+
+    :arg session: the session with which to connect to the database.
+    :arg pkgid: the identifier of the package to load the listings of.
+
+    """
+    listings = session.query(
+        PackageListing
+    ).filter(
+        PackageListing.package_id == pkgid
+    ).options(
+        joinedload(PackageListing.collection)
+    ).all()
+
+    acls = session.query(
+        PackageListingAcl
+    ).filter(
+        PackageListingAcl.packagelisting_id == PackageListing.id
+    ).filter(
+        PackageListing.package_id == pkgid
+    ).order_by(
+        PackageListingAcl.id
+    ).all()
+
+    cache = session.info.setdefault(_LOOKUP_KEY, {})
+    for listing in listings:
+        cache[(PackageListing, 'pkgid_collectionid', pkgid,
+               listing.collection_id)] = listing
+        cache[(Collection, 'branchname',
+               listing.collection.branchname)] = listing.collection
+        cache[(PackageListingAcl, 'packagelisting_id', listing.id)] = {}
+    for acl in acls:
+        cache[(PackageListingAcl, 'packagelisting_id',
+               acl.packagelisting_id)].setdefault((acl.fas_name, acl.acl), acl)
+    # All the listings of the package are in the cache
+    cache[(PackageListing, 'package_id', pkgid)] = True
+    return cache
+
+
+def _clear_lookups(session, *args):
+    """ Empty the lookup and ACL checks caches of the session. """
+    session.info.pop(_LOOKUP_KEY, None)
+    session.info.pop(_ACL_CHECKS_KEY, None)
+
+
+# pylint: disable=W0613
+def _invalidate_lookups(session, flush_context):
+    """ Empty the lookup cache of the session if the flush deleted one of
+    the objects that can be in it or changed one of the attributes they
+    are looked up by, add to it the listings and ACLs created, and empty
+    the ACL checks cache if ACLs were changed.
+    """
+    if _ACL_CHECKS_KEY in session.info:
+        for obj in itertools.chain(
+                session.new, session.dirty, session.deleted):
+            if isinstance(obj, PackageListingAcl):
+                session.info.pop(_ACL_CHECKS_KEY)
+                break
+
+    if _LOOKUP_KEY not in session.info:
+        return
+    lookup_attrs = {
+        Package: ['name'],
+        Collection: ['branchname'],
+        PackageListing: ['package_id', 'collection_id'],
+        PackageListingAcl: ['fas_name', 'packagelisting_id', 'acl'],
+    }
+    for obj in session.deleted:
+        if type(obj) in lookup_attrs:
+            _clear_lookups(session)
+            return
+    for obj in session.dirty:
+        state = sa.inspect(obj)
+        for attr in lookup_attrs.get(type(obj), []):
+            if state.attrs[attr].history.has_changes():
+                _clear_lookups(session)
+                return
+
+    cache = session.info[_LOOKUP_KEY]
+    new = sorted(
+        session.new, key=lambda obj: not isinstance(obj, PackageListing))
+    for obj in new:
+        if isinstance(obj, PackageListing) \
+                and (PackageListing, 'package_id', obj.package_id) in cache:
+            cache[(PackageListing, 'pkgid_collectionid', obj.package_id,
+                   obj.collection_id)] = obj
+            cache[(PackageListingAcl, 'packagelisting_id', obj.id)] = {}
+        elif isinstance(obj, PackageListingAcl):
+            acls = cache.get(
+                (PackageListingAcl, 'packagelisting_id',
+                 obj.packagelisting_id))
+            if acls is not None:
+                acls.setdefault((obj.fas_name, obj.acl), obj)
+
+
+_PENDING_ACLS_KEY = 'pkgdb2_pending_acls'
+
+
+# pylint: disable=W0613
+def _track_pending_acls(session, flush_context):
+    """ Record in the session the package listings whose ACLs, status or
+    point of contact were changed by the flush, or that the whole inbox of
+    the pending ACLs is to be refreshed if the status of a collection was
+    changed.
+    """
+    watched_attrs = {
+        PackageListingAcl: ['acl', 'status'],
+        PackageListing: ['status', 'point_of_contact'],
+        Collection: ['status'],
+    }
+    changed = []
+    for obj in itertools.chain(session.new, session.deleted):
+        if type(obj) in watched_attrs:
+            changed.append(obj)
+    for obj in session.dirty:
+        state = sa.inspect(obj)
+        for attr in watched_attrs.get(type(obj), []):
+            if state.attrs[attr].history.has_changes():
+                changed.append(obj)
+                break
+
+    if not changed:
+        return
+    # None stands for all the package listings
+    listing_ids = session.info.setdefault(_PENDING_ACLS_KEY, set())
+    for obj in changed:
+        if listing_ids is None:
+            return
+        if isinstance(obj, Collection):
+            if obj not in session.new:
+                session.info[_PENDING_ACLS_KEY] = listing_ids = None
+        elif isinstance(obj, PackageListingAcl):
+            listing_ids.add(obj.packagelisting_id)
+        else:
+            listing_ids.add(obj.id)
+
+
+def _refresh_pending_acls(session):
+    """ Refresh the inbox of the pending ACLs of the package listings
+    changed since the last refresh, once for all the flushes of the
+    transaction.
+    """
+    session.flush()
+    if _PENDING_ACLS_KEY not in session.info:
+        return
+    listing_ids = session.info.pop(_PENDING_ACLS_KEY)
+    PendingAcl.refresh(session, listing_ids)
+
+
+def _clear_pending_acls(session):
+    """ Forget the package listings changed in the transaction. """
+    session.info.pop(_PENDING_ACLS_KEY, None)
+
+
+sa.event.listen(Session, 'after_flush', _invalidate_lookups)
+sa.event.listen(Session, 'after_flush', _track_pending_acls)
+sa.event.listen(Session, 'before_commit', _refresh_pending_acls)
+sa.event.listen(Session, 'after_commit', _clear_lookups)
+sa.event.listen(Session, 'after_rollback', _clear_lookups)
+sa.event.listen(Session, 'after_rollback', _clear_pending_acls)
+
+
 def create_status(session):
     """ Fill in the status tables. """
     for acl in ['commit', 'watchbugzilla', 'watchcommits', 'approveacls']:
@@ -295,6 +674,20 @@ class PackageListingAcl(BASE):
 
     __table_args__ = (
         sa.UniqueConstraint('fas_name', 'packagelisting_id', 'acl'),
+        # Used to check the ACLs of a user, see ``has_acls``
+        sa.Index(
+            'ix_PackageListingAcl_fas_name_acl_status',
+            'fas_name', 'acl', 'status', 'packagelisting_id'),
+        # Used to join the ACLs to their package listing, see ``notify``
+        # and ``vcs_acls``
+        sa.Index(
+            'ix_PackageListingAcl_packagelisting_id_acl_status',
+            'packagelisting_id', 'acl', 'status'),
+        # Only a handful of ACLs are pending, see ``get_pending_acl``
+        sa.Index(
+            'ix_PackageListingAcl_awaiting_review',
+            'packagelisting_id',
+            postgresql_where=sa.text("status = 'Awaiting Review'")),
     )
 
     @classmethod
@@ -348,7 +741,7 @@ class PackageListingAcl(BASE):
     @classmethod
     def get_acl_packager(
             cls, session, packager, acls=None, eol=False, poc=None,
-            offset=None, limit=None, count=False):
+            offset=None, limit=None, count=False, after=None):
         """ Retrieve the ACLs associated with a packager.
 
         :arg session: the database session used to connect to the
@@ -375,6 +768,8 @@ class PackageListingAcl(BASE):
         :kwarg limit: the number of results to return
         :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+        :kwarg after: a tuple (id, ) of the last ACL returned, to return
+            the ACLs following it.
 
         """
 
@@ -420,6 +815,9 @@ class PackageListingAcl(BASE):
 
         query = query.order_by(PackageListingAcl.id)
 
+        if after:
+            query = _keyset(query, [PackageListingAcl.id], after)
+
         if offset:
             query = query.offset(offset)
         if limit:
@@ -464,6 +862,57 @@ class PackageListingAcl(BASE):
             )
         return query.all()
 
+    @classmethod
+    def has_acls(cls, session, user, package, acls, branch=None):
+        """ Return whether the specified user has one of the specified
+        approved ACLs on the specified package.
+
+        The answer is retrieved with a single EXISTS query and kept until
+        the end of the transaction or until ACLs are changed in the
+        session.
+
+        :arg session: the database session used to connect to the
+            database.
+        :arg user: the username of the packager.
+        :arg package: the name of the package.
+        :arg acls: the list of ACLs, having one of them is enough.
+        :kwarg branch: restrict the check to the specified branch.
+
+        """
+        key = (user, package, frozenset(acls), branch)
+        # Pending changes could modify the answer, rely on the query and
+        # its autoflush then
+        pending = session.new or session.dirty or session.deleted
+        cache = session.info.setdefault(_ACL_CHECKS_KEY, {})
+        if key in cache and not pending:
+            return cache[key]
+
+        exists = sa.exists().where(
+            cls.fas_name == user
+        ).where(
+            cls.acl.in_(acls)
+        ).where(
+            cls.status == 'Approved'
+        ).where(
+            cls.packagelisting_id == PackageListing.id
+        ).where(
+            PackageListing.package_id == Package.id
+        ).where(
+            Package.name == package
+        )
+
+        if branch:
+            exists = exists.where(
+                PackageListing.collection_id == Collection.id
+            ).where(
+                Collection.branchname == branch
+            )
+
+        output = session.query(exists).scalar()
+        # The query may have flushed, which empties the cache
+        session.info.setdefault(_ACL_CHECKS_KEY, {})[key] = output
+        return output
+
     @classmethod
     def get(cls, session, user, packagelisting_id, acl):
         """ Retrieve the PersonPackageListing which associates a person
@@ -477,7 +926,17 @@ class PackageListingAcl(BASE):
         :arg acl: the ACL that person has on that package
         :arg status: the status of the ACL
 
+        The ACLs of listings loaded by ``PackageListing.by_pkgid_collectionid``
+        are found in the lookup cache of the session.
+
         """
+        acls = session.info.get(_LOOKUP_KEY, {}).get(
+            (cls, 'packagelisting_id', packagelisting_id))
+        if acls is not None and not _has_pending_changes(session):
+            personpkg = acls.get((user, acl))
+            if personpkg is None or personpkg in session:
+                return personpkg
+
         return session.query(
             PackageListingAcl
         ).filter(
@@ -488,6 +947,70 @@ class PackageListingAcl(BASE):
             PackageListingAcl.acl == acl
         ).first()
 
+    @classmethod
+    def get_many(cls, session, users, packagelisting_ids):
+        """ Retrieve the ACLs of the specified users on the specified
+        package listings.
+
+        :arg session: the database session used to connect to the
+            database
+        :arg users: a list of usernames
+        :arg packagelisting_ids: a list of identifiers of PackageListing
+        :returns: a list of tuple (id, fas_name, packagelisting_id, acl,
+            status).
+
+        """
+        if not users or not packagelisting_ids:
+            return []
+        return session.query(
+            PackageListingAcl.id,
+            PackageListingAcl.fas_name,
+            PackageListingAcl.packagelisting_id,
+            PackageListingAcl.acl,
+            PackageListingAcl.status,
+        ).filter(
+            PackageListingAcl.fas_name.in_(set(users))
+        ).filter(
+            PackageListingAcl.packagelisting_id.in_(set(packagelisting_ids))
+        ).all()
+
+    @classmethod
+    def bulk_set(cls, session, new, changed, removed):
+        """ Create, update and delete ACLs using one query for each.
+
+        The objects already loaded in the session are not updated, it is
+        up to the caller to expire them.
+
+        :arg session: the database session used to connect to the
+            database
+        :arg new: a list of dict with the keys fas_name, packagelisting_id,
+            acl and status of the ACLs to create.
+        :arg changed: a list of dict with the keys id and status of the
+            ACLs to update.
+        :arg removed: a list of the identifiers of the ACLs to delete.
+
+        """
+        if new:
+            now = datetime.datetime.utcnow()
+            session.execute(cls.__table__.insert(), [
+                dict(item, date_created=now) for item in new
+            ])
+        if changed:
+            table = cls.__table__
+            session.execute(
+                table.update().where(
+                    table.c.id == sa.bindparam('acl_id')
+                ).values(status=sa.bindparam('acl_status')),
+                [
+                    dict(acl_id=item['id'], acl_status=item['status'])
+                    for item in changed
+                ]
+            )
+        if removed:
+            session.execute(cls.__table__.delete().where(
+                cls.__table__.c.id.in_(removed)))
+        _clear_lookups(session)
+
     @classmethod
     def create(cls, session, user, packagelisting_id, acl, status):
         """ Creates the PersonPackageListing which associates a person
@@ -522,6 +1045,10 @@ class PackageListingAcl(BASE):
         :arg user: the username of the person for which we are checking the
             pending ACLs.
 
+        The packages of `user` are found using the ``PendingAcl`` inbox,
+        the package listings and collections of the ACLs are loaded in the
+        same query.
+
         """
 
         # Match the other criteria
@@ -544,32 +1071,45 @@ class PackageListingAcl(BASE):
         )
 
         if user is not None:
-            subquery = session.query(
-                PackageListingAcl.packagelisting_id
-            ).filter(
-                PackageListingAcl.acl == 'approveacls'
-            ).filter(
-                PackageListingAcl.fas_name == user
+            _refresh_pending_acls(session)
+            query = query.filter(
+                PendingAcl.acl_id == cls.id
             ).filter(
-                PackageListingAcl.status == 'Approved'
+                PendingAcl.approver == user
             )
 
-            subquery2 = session.query(
-                PackageListing.id
-            ).filter(
-                PackageListing.point_of_contact == user
-            ).filter(
-                PackageListing.status == 'Approved'
-            )
+        return query.options(
+            contains_eager(cls.packagelist).contains_eager(
+                PackageListing.package),
+            contains_eager(cls.packagelist).contains_eager(
+                PackageListing.collection),
+        ).all()
 
-            query = query.filter(
-                or_(
-                    PackageListing.id.in_(subquery.subquery()),
-                    PackageListing.id.in_(subquery2.subquery()),
-                )
-            )
+    @classmethod
+    def get_acl_graph_data(cls, session):
+        """ Return the ACLs to load in the in-memory graph of the ACLs.
 
-        return query.all()
+        The ACLs are returned in the order of the rows returned by
+        ``PackageListing.get_acl_graph_data``, the rows being fetched from
+        the database by batch.
+
+        :arg session: session with which to connect to the database.
+        :returns: an iterator of tuples (packagelisting_id, fas_name, acl,
+            status).
+
+        """
+        query = session.query(
+            cls.packagelisting_id, cls.fas_name, cls.acl, cls.status
+        ).filter(
+            cls.packagelisting_id == PackageListing.id
+        ).filter(
+            PackageListing.package_id == Package.id
+        ).order_by(
+            Package.name, PackageListing.collection_id, PackageListing.id,
+            cls.id
+        )
+
+        return _stream(query)
 
     def __init__(self, fas_name, packagelisting_id, acl, status):
         """ Constructor.
@@ -598,23 +1138,143 @@ class PackageListingAcl(BASE):
                 self.id, self.fas_name, self.packagelisting_id, self.acl,
                 self.status)
 
-    def to_json(self, _seen=None, pkglist=True):
+    def to_json(self, _seen=None, pkglist=True, cache=None):
         """ Return a dictionnary representation of this object.
 
         """
-        _seen = _seen or []
-        cls = type(self)
-        _seen.append(cls)
+        if _seen is None:
+            _seen = set()
+        _seen.add(type(self))
         infos = dict(
             fas_name=self.fas_name,
             acl=self.acl,
             status=self.status,
         )
-        if type(self.packagelist) not in _seen and pkglist:
-            infos['packagelist'] = self.packagelist.to_json(_seen)
+        if pkglist and PackageListing not in _seen:
+            infos['packagelist'] = self.packagelist.to_json(
+                _seen, cache=cache)
         return infos
 
 
+class PendingAcl(BASE):
+    """Inbox of the ACLs awaiting review, with one row for each pending
+    ACL and each user who can approve it: the point of contact of the
+    package listing and the users having the `approveacls` ACL on it.
+
+    The inbox only contains the ACLs of the approved package listings of
+    the collections which are not EOL. The changes of the ACLs, the
+    package listings or the status of a collection flushed in a
+    transaction are applied to it once, before the transaction is
+    committed or the inbox is read. The changes made behind the back of
+    the ORM have to call ``refresh``.
+
+    Table -- PendingAcl
+    """
+
+    __tablename__ = 'PendingAcl'
+
+    approver = sa.Column(sa.Text, primary_key=True)
+    acl_id = sa.Column(
+        sa.Integer,
+        sa.ForeignKey(
+            'PackageListingAcl.id', ondelete='CASCADE', onupdate='CASCADE'),
+        primary_key=True)
+    packagelisting_id = sa.Column(
+        sa.Integer,
+        sa.ForeignKey(
+            'PackageListing.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False,
+        index=True)
+
+    def __repr__(self):
+        """ The string representation of this object.
+
+        """
+
+        return 'PendingAcl(%r, acl_id=%r, packagelisting_id=%r)' % (
+            self.approver, self.acl_id, self.packagelisting_id)
+
+    @classmethod
+    def refresh(cls, session, listing_ids=None):
+        """ Rebuild the inbox of the specified package listings, using
+        one ``DELETE`` query and one ``INSERT ... SELECT`` query.
+
+        :arg session: the database session used to connect to the
+            database
+        :kwarg listing_ids: the identifiers of the package listings to
+            refresh the inbox of, defaults to all of them.
+
+        """
+        table = cls.__table__
+        delete = table.delete()
+        if listing_ids is not None:
+            listing_ids = list(set(listing_ids))
+            if not listing_ids:
+                return
+            delete = delete.where(
+                table.c.packagelisting_id.in_(listing_ids))
+        session.execute(delete)
+
+        listing = PackageListing.__table__
+        collection = Collection.__table__
+        pending = PackageListingAcl.__table__
+        approver = pending.alias('approver')
+
+        def _select(column, *criteria):
+            ''' Select the pending ACLs the provided column can approve.
+            '''
+            query = sa.select([
+                column.label('approver'),
+                pending.c.id.label('acl_id'),
+                listing.c.id.label('packagelisting_id'),
+            ]).where(
+                pending.c.status == 'Awaiting Review'
+            ).where(
+                pending.c.packagelisting_id == listing.c.id
+            ).where(
+                listing.c.status == 'Approved'
+            ).where(
+                listing.c.collection_id == collection.c.id
+            ).where(
+                collection.c.status != 'EOL'
+            )
+            for criterion in criteria:
+                query = query.where(criterion)
+            if listing_ids is not None:
+                query = query.where(listing.c.id.in_(listing_ids))
+            return query
+
+        session.execute(table.insert().from_select(
+            ['approver', 'acl_id', 'packagelisting_id'],
+            sa.union(
+                _select(listing.c.point_of_contact),
+                _select(
+                    approver.c.fas_name,
+                    approver.c.packagelisting_id == listing.c.id,
+                    approver.c.acl == 'approveacls',
+                    approver.c.status == 'Approved',
+                ),
+            )
+        ))
+
+    @classmethod
+    def count(cls, session, user):
+        """ Return the number of ACLs awaiting review `user` can approve.
+
+        :arg session: the database session used to connect to the
+            database
+        :arg user: the username of the person for which we are counting
+            the pending ACLs.
+
+        """
+        _refresh_pending_acls(session)
+        return session.query(
+            sa.func.count(cls.acl_id)
+        ).filter(
+            cls.approver == user
+        ).scalar()
+
+
 class Collection(BASE):
     """A Collection of packages.
 
@@ -658,11 +1318,19 @@ class Collection(BASE):
         return 'Collection(%r, %r, %r, owner:%r)' % (
             self.name, self.version, self.status, self.owner)
 
-    def to_json(self, _seen=None):
+    def to_json(self, _seen=None, cache=None):
         """ Used by fedmsg to serialize Collections in messages.
 
+        :kwarg cache: a dictionary in which the representation is stored
+            and looked up, so that it is built and allocated only once per
+            collection when serializing many objects together.
+
         """
-        return dict(
+        key = (type(self), self.id)
+        if cache is not None and key in cache:
+            return cache[key]
+
+        result = dict(
             name=self.name,
             version=self.version,
             branchname=self.branchname,
@@ -670,6 +1338,9 @@ class Collection(BASE):
             koji_name=self.koji_name,
             dist_tag=self.dist_tag,
         )
+        if cache is not None:
+            cache[key] = result
+        return result
 
     @classmethod
     def by_name(cls, session, branch_name):
@@ -681,9 +1352,25 @@ class Collection(BASE):
 
         simple_name will be looked up as the Branch name.
         """
-        collection = session.query(cls).filter(
-            Collection.branchname == branch_name).one()
-        return collection
+        return _cached_lookup(
+            session, (cls, 'branchname', branch_name),
+            session.query(cls).filter(
+                Collection.branchname == branch_name).one)
+
+    @classmethod
+    def by_names(cls, session, branch_names):
+        """ Return the Collections having one of the given branch names.
+
+        :arg branch_names: a list of branch names.
+        :returns: a list of Collection, the branch names not found are not
+            included.
+
+        """
+        if not branch_names:
+            return []
+        return session.query(cls).filter(
+            Collection.branchname.in_(set(branch_names))
+        ).all()
 
     @classmethod
     def all(cls, session):
@@ -766,6 +1453,10 @@ class PackageListing(BASE):
                               onupdate=sa.func.now())
     __table_args__ = (
         sa.UniqueConstraint('package_id', 'collection_id'),
+        # Used to retrieve the packages of a collection
+        sa.Index(
+            'ix_PackageListing_collection_id_status',
+            'collection_id', 'status'),
     )
 
     package = relation("Package")
@@ -795,10 +1486,11 @@ class PackageListing(BASE):
                    self.package_id, self.collection_id)
 
     def to_json(self, _seen=None, acls=True, package=True,
-                not_provenpackager=None):
+                not_provenpackager=None, cache=None):
         """ Return a dictionary representation of this object. """
-        _seen = _seen or []
-        _seen.append(type(self))
+        if _seen is None:
+            _seen = set()
+        _seen.add(type(self))
         result = dict(
             point_of_contact=self.point_of_contact,
             critpath=self.critpath,
@@ -806,16 +1498,23 @@ class PackageListing(BASE):
             status_change=time.mktime(self.status_change.timetuple()),
         )
 
-        if package and self.package:
-            result['package'] = self.package.to_json(_seen)
-
-        if self.collection:
-            result['collection'] = self.collection.to_json(_seen)
-
-        if acls and self.acls and not type(self.acls[0]) in _seen:
-            tmp = []
-            for acl in self.acls:
-                tmp.append(acl.to_json(_seen + [type(self)]))
+        if package:
+            pkg = self.package
+            if pkg:
+                result['package'] = pkg.to_json(_seen, cache=cache)
+
+        collection = self.collection
+        if collection:
+            result['collection'] = collection.to_json(_seen, cache=cache)
+
+        pkg_acls = None
+        if acls and PackageListingAcl not in _seen:
+            pkg_acls = self.acls
+        if pkg_acls:
+            # The ACLs mark themselves as seen, do it on a copy so the
+            # other listings of the package still get their ACLs
+            acls_seen = set(_seen)
+            tmp = [acl.to_json(acls_seen, cache=cache) for acl in pkg_acls]
             if not_provenpackager \
                     and self.package.name not in not_provenpackager:
                 tmp.append(
@@ -858,46 +1557,258 @@ class PackageListing(BASE):
         session.flush()
 
     @classmethod
-    def by_package_id(cls, session, pkgid):
-        """ Return the PackageListing object based on the Package ID.
+    def get_packages_to_branch(cls, session, branch_from, branch_to):
+        """ Return the packages of a `Branch` which are not yet present in
+        another `Branch`.
 
-        :arg pkgid: Integer, identifier of the package in the Package
-            table
+        :arg session: session with which to connect to the database.
+        :arg branch_from: the Collection object to branch from.
+        :arg branch_to: the Collection object to branch to.
+        :returns: a list of tuples (package id, package name) ordered by
+            package name.
 
         """
+        branched = session.query(
+            PackageListing.package_id
+        ).filter(
+            PackageListing.collection_id == branch_to.id
+        )
 
-        return session.query(cls).filter(
-            PackageListing.package_id == pkgid
+        return session.query(
+            Package.id, Package.name
+        ).filter(
+            PackageListing.package_id == Package.id
+        ).filter(
+            PackageListing.collection_id == branch_from.id
+        ).filter(
+            PackageListing.status.in_(['Approved', 'Orphaned'])
+        ).filter(
+            not_(PackageListing.package_id.in_(branched.subquery()))
         ).order_by(
-            PackageListing.collection_id
+            Package.name
         ).all()
 
     @classmethod
-    def by_pkgid_collectionid(cls, session, pkgid, collectionid):
-        """Return the PackageListing for the provided package in the
-        specified collection.
+    def bulk_branch(cls, session, branch_from, branch_to, package_ids):
+        """ Clone the PackageListing of the specified packages and their
+        ACLs from a `Branch` to another using one ``INSERT ... SELECT``
+        query for the listings and one for the ACLs.
+
+        The packages already present in `branch_to` are left untouched.
+
+        :arg session: session with which to connect to the database.
+        :arg branch_from: the Collection object to branch from.
+        :arg branch_to: the Collection object to branch to.
+        :arg package_ids: the list of the identifiers of the packages to
+            branch.
+        :returns: the number of PackageListing created.
+
+        """
+        now = datetime.datetime.utcnow()
+        listing = PackageListing.__table__
+        new_listing = listing.alias('new_listing')
+        acl = PackageListingAcl.__table__
+        new_acl = acl.alias('new_acl')
+
+        query = sa.select([
+            listing.c.point_of_contact,
+            listing.c.status,
+            listing.c.package_id,
+            sa.literal(branch_to.id),
+            listing.c.critpath,
+            sa.literal(now),
+        ]).where(
+            listing.c.collection_id == branch_from.id
+        ).where(
+            listing.c.package_id.in_(package_ids)
+        ).where(
+            ~sa.exists().where(and_(
+                new_listing.c.package_id == listing.c.package_id,
+                new_listing.c.collection_id == branch_to.id,
+            ))
+        )
+        result = session.execute(listing.insert().from_select(
+            ['point_of_contact', 'status', 'package_id', 'collection_id',
+             'critpath', 'status_change'],
+            query))
+
+        query = sa.select([
+            acl.c.fas_name,
+            new_listing.c.id,
+            acl.c.acl,
+            acl.c.status,
+            sa.literal(now),
+        ]).where(
+            acl.c.packagelisting_id == listing.c.id
+        ).where(
+            new_listing.c.package_id == listing.c.package_id
+        ).where(
+            listing.c.collection_id == branch_from.id
+        ).where(
+            new_listing.c.collection_id == branch_to.id
+        ).where(
+            listing.c.package_id.in_(package_ids)
+        ).where(
+            ~sa.exists().where(and_(
+                new_acl.c.packagelisting_id == new_listing.c.id,
+                new_acl.c.fas_name == acl.c.fas_name,
+                new_acl.c.acl == acl.c.acl,
+            ))
+        )
+        session.execute(acl.insert().from_select(
+            ['fas_name', 'packagelisting_id', 'acl', 'status',
+             'date_created'],
+            query))
+        _clear_lookups(session)
+
+        return result.rowcount
+
+    @classmethod
+    def by_package_id(cls, session, pkgid, branches=None, eol=True):
+        """ Return the PackageListing object based on the Package ID,
+        loaded with their collection in the same query.
 
         :arg pkgid: Integer, identifier of the package in the Package
             table
-        :arg collectionid: Integer, identifier of the collection in the
-            Collection table
-        :returns: The PackageListing that matches this package identifier
-            and collection iddentifier
-        :raises sqlalchemy.InvalidRequestError: if the simple name is not found
+        :kwarg branches: the list of the branch names of the collections
+            to restrict the listings to.
+        :kwarg eol: a boolean to specify whether to include the listings of
+            the EOL collections or not. Defaults to True.
 
         """
-        return session.query(cls).filter(
+        query = session.query(cls).filter(
             PackageListing.package_id == pkgid
         ).filter(
-            PackageListing.collection_id == collectionid
-        ).first()
+            PackageListing.collection_id == Collection.id
+        ).options(
+            contains_eager(cls.collection)
+        )
 
-    @classmethod
-    def by_collectionid(cls, session, collectionid):
-        """Return all the PackageListing for the specified collection.
+        if branches:
+            query = query.filter(Collection.branchname.in_(branches))
+        if not eol:
+            query = query.filter(Collection.status != 'EOL')
 
-        :arg collectionid: Integer, identifier of the collection in the
-            Collection table
+        return query.order_by(
+            PackageListing.collection_id
+        ).all()
+
+    @classmethod
+    def by_package_names(cls, session, pkg_names, branches=None, eol=False,
+                         with_acls=True):
+        """ Return the PackageListing of the specified packages, loaded
+        with their package and collection in a single query.
+
+        :arg session: session with which to connect to the database.
+        :arg pkg_names: the list of the names of the packages.
+        :kwarg branches: the list of the branch names of the collections
+            to restrict the listings to.
+        :kwarg eol: a boolean to specify whether to include the listings of
+            the EOL collections or not. Defaults to False.
+        :kwarg with_acls: a boolean to load the ACLs of the listings as
+            well, in a second query. Defaults to True.
+        :returns: the list of PackageListing ordered by package name and
+            collection.
+
+        """
+        if not pkg_names:
+            return []
+
+        def restrict(query):
+            ''' Apply the filters on the package and collection. '''
+            query = query.filter(
+                PackageListing.package_id == Package.id
+            ).filter(
+                PackageListing.collection_id == Collection.id
+            ).filter(
+                Package.name.in_(pkg_names)
+            )
+            if branches:
+                query = query.filter(Collection.branchname.in_(branches))
+            if not eol:
+                query = query.filter(Collection.status != 'EOL')
+            return query
+
+        listings = restrict(
+            session.query(cls)
+        ).options(
+            contains_eager(cls.package),
+            contains_eager(cls.collection)
+        ).order_by(
+            Package.name, cls.collection_id
+        ).all()
+
+        if with_acls and listings:
+            acls = restrict(
+                session.query(PackageListingAcl)
+            ).filter(
+                PackageListingAcl.packagelisting_id == PackageListing.id
+            ).order_by(
+                PackageListingAcl.id
+            ).all()
+            _set_acls(listings, acls)
+
+        return listings
+
+    @classmethod
+    def by_pkgid_collectionid(cls, session, pkgid, collectionid):
+        """Return the PackageListing for the provided package in the
+        specified collection.
+
+        :arg pkgid: Integer, identifier of the package in the Package
+            table
+        :arg collectionid: Integer, identifier of the collection in the
+            Collection table
+        :returns: The PackageListing that matches this package identifier
+            and collection iddentifier
+        :raises sqlalchemy.InvalidRequestError: if the simple name is not found
+
+        All the listings of the package, their collection and their ACLs
+        are loaded in the lookup cache of the session at once.
+
+        """
+        if not _has_pending_changes(session):
+            cache = session.info.get(_LOOKUP_KEY, {})
+            if (cls, 'package_id', pkgid) not in cache:
+                cache = _cache_listings(session, pkgid)
+            listing = cache.get(
+                (cls, 'pkgid_collectionid', pkgid, collectionid))
+            if listing is None or listing in session:
+                return listing
+
+        return _cached_lookup(
+            session, (cls, 'pkgid_collectionid', pkgid, collectionid),
+            session.query(cls).filter(
+                PackageListing.package_id == pkgid
+            ).filter(
+                PackageListing.collection_id == collectionid
+            ).first)
+
+    @classmethod
+    def by_pkgids_collectionids(cls, session, pkgids, collectionids):
+        """ Return the PackageListing of the provided packages in the
+        provided collections.
+
+        :arg pkgids: a list of identifiers of packages.
+        :arg collectionids: a list of identifiers of collections.
+        :returns: the list of PackageListing of any of these packages in
+            any of these collections.
+
+        """
+        if not pkgids or not collectionids:
+            return []
+        return session.query(cls).filter(
+            PackageListing.package_id.in_(set(pkgids))
+        ).filter(
+            PackageListing.collection_id.in_(set(collectionids))
+        ).all()
+
+    @classmethod
+    def by_collectionid(cls, session, collectionid):
+        """Return all the PackageListing for the specified collection.
+
+        :arg collectionid: Integer, identifier of the collection in the
+            Collection table
         :returns: The PackageListing that matches the collection iddentifier
         :raises sqlalchemy.InvalidRequestError: if the simple name is not found
 
@@ -962,7 +1873,7 @@ class PackageListing(BASE):
 
     @classmethod
     def search_packagers(cls, session, pattern, eol=False, offset=None,
-                         limit=None, count=False):
+                         limit=None, count=False, after=None):
         """ Return all the packagers whose name match the pattern.
         Are packagers user having at least one commit ACL on one package.
 
@@ -978,6 +1889,8 @@ class PackageListing(BASE):
         :kwarg limit: the number of results to return
         :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+        :kwarg after: a tuple (fas_name, ) of the last packager returned,
+            to return the packagers following it.
 
         """
         query = session.query(
@@ -1005,6 +1918,9 @@ class PackageListing(BASE):
         if count:
             return query.count()
 
+        if after:
+            query = _keyset(query, [PackageListingAcl.fas_name], after)
+
         if offset:
             query = query.offset(offset)
         if limit:
@@ -1070,6 +1986,32 @@ class PackageListing(BASE):
 
         return query.all()
 
+    @classmethod
+    def get_acl_graph_data(cls, session):
+        """ Return the package listings to load in the in-memory graph of
+        the ACLs.
+
+        The rows are ordered by package name and collection and are
+        fetched from the database by batch.
+
+        :arg session: session with which to connect to the database.
+        :returns: an iterator of tuples (id, package_id, package name,
+            package status, collection_id, point_of_contact, status,
+            critpath).
+
+        """
+        query = session.query(
+            cls.id, Package.id, Package.name, Package.status,
+            cls.collection_id, cls.point_of_contact, cls.status,
+            cls.critpath
+        ).filter(
+            cls.package_id == Package.id
+        ).order_by(
+            Package.name, cls.collection_id, cls.id
+        )
+
+        return _stream(query)
+
 
 class Package(BASE):
     """Software we are packaging.
@@ -1121,7 +2063,23 @@ class Package(BASE):
         :raises sqlalchemy.InvalidRequestError: if the package name is
             not found
         """
-        return session.query(cls).filter(Package.name == pkgname).one()
+        return _cached_lookup(
+            session, (cls, 'name', pkgname),
+            session.query(cls).filter(Package.name == pkgname).one)
+
+    @classmethod
+    def by_names(cls, session, pkgnames):
+        """ Return the packages having one of the given names.
+
+        :arg pkgnames: a list of package names.
+        :returns: a list of Package, packages not found are not included.
+
+        """
+        if not pkgnames:
+            return []
+        return session.query(cls).filter(
+            Package.name.in_(set(pkgnames))
+        ).all()
 
     @property
     def requests_open(self):
@@ -1283,14 +2241,16 @@ class Package(BASE):
     def search(cls, session, pkg_name, pkg_poc=None, pkg_status=None,
                pkg_branch=None, orphaned=None, critpath=None, eol=False,
                offset=None, limit=None, count=False,
-               case_sensitive=True):
+               case_sensitive=True, with_count=False, after=None,
+               with_acls=False):
         """ Search the Packages for the one fitting the given pattern.
 
         :arg session: session with which to connect to the database
         :arg pkg_name: the name of the package
         :kwarg pkg_poc: name of the new point of contact for the package
-        :kwarg pkg_status: status of the package
-        :kwarg pkg_branch: branchname of the collection to search.
+        :kwarg pkg_status: status of the package, or list of status.
+        :kwarg pkg_branch: branchname of the collection to search, or list
+            of branchnames.
         :kwarg orphaned: a boolean specifying if the search should be
             restricted to only orphaned or not-orphaned packages.
         :kwarg critpath: Boolean to retrict the search to critpath packages.
@@ -1305,8 +2265,24 @@ class Package(BASE):
             if true, returns the data if false (default).
         :kwarg case_sensitive: a boolean to specify doing a case insensitive
             search. Defaults to True.
+        :kwarg with_count: a boolean to return, in addition to the page of
+            results, the total number of packages matching using the same
+            query. Defaults to False.
+        :kwarg after: a tuple (name, ) of the last package returned, to
+            return the packages following it. The total returned with
+            ``with_count`` is then the number of packages following it.
+        :kwarg with_acls: a boolean to load, together with the packages
+            returned, their listings, collections and ACLs. Defaults to
+            False.
+        :returns: the list of Package matching, or a tuple (list of
+            Package, total number of Package matching) if ``with_count``
+            is True.
 
         """
+        if isinstance(pkg_status, basestring):
+            pkg_status = [pkg_status]
+        if isinstance(pkg_branch, basestring):
+            pkg_branch = [pkg_branch]
 
         query = session.query(
             sa.func.distinct(Package.id)
@@ -1341,7 +2317,7 @@ class Package(BASE):
             query = query.filter(
                 PackageListing.package_id == Package.id
             ).filter(
-                PackageListing.status == pkg_status
+                PackageListing.status.in_(pkg_status)
             ).filter(
                 PackageListing.collection_id == Collection.id
             ).filter(
@@ -1354,7 +2330,7 @@ class Package(BASE):
             ).filter(
                 PackageListing.collection_id == Collection.id
             ).filter(
-                Collection.branchname == pkg_branch
+                Collection.branchname.in_(pkg_branch)
             )
 
         if orphaned is not None:
@@ -1398,12 +2374,38 @@ class Package(BASE):
         if count:
             return final_query.count()
 
+        if after:
+            final_query = _keyset(final_query, [Package.name], after)
+
+        if with_count:
+            # Retrieve the total number of results along with each row
+            page_query = final_query.add_columns(sa.func.count().over())
+        else:
+            page_query = final_query
+
         if offset:
-            final_query = final_query.offset(offset)
+            page_query = page_query.offset(offset)
         if limit:
-            final_query = final_query.limit(limit)
-
-        return final_query.all()
+            page_query = page_query.limit(limit)
+
+        if not with_count:
+            packages = page_query.all()
+            if with_acls:
+                _load_listings(session, packages)
+            return packages
+
+        rows = page_query.all()
+        if rows:
+            total = rows[0][1]
+        elif offset:
+            # Past the last page, no row to read the total from
+            total = final_query.count()
+        else:
+            total = 0
+        packages = [row[0] for row in rows]
+        if with_acls:
+            _load_listings(session, packages)
+        return packages, total
 
     @classmethod
     def count_collection(cls, session):
@@ -1461,6 +2463,143 @@ class Package(BASE):
 
         return query.all()
 
+    @classmethod
+    def get_search_data(cls, session):
+        """ Return the information used to build the search index of the
+        packages.
+
+        :arg session: session with which to connect to the database.
+        :returns: a list of tuples (name, summary, description, status)
+            ordered by name.
+
+        """
+        return session.query(
+            cls.name, cls.summary, cls.description, cls.status
+        ).order_by(
+            cls.name
+        ).all()
+
+    @classmethod
+    def by_status(cls, session, status):
+        """ Return the packages having the specified status.
+
+        :arg session: session with which to connect to the database.
+        :arg status: the status of the packages to retrieve.
+        :returns: a list of Package ordered by name.
+
+        """
+        return session.query(
+            cls
+        ).filter(
+            cls.status == status
+        ).order_by(
+            cls.name
+        ).all()
+
+    @classmethod
+    def bulk_update_info(cls, session, updates):
+        """ Update the summary, description and upstream URL of many
+        packages using one ``UPDATE`` query.
+
+        The Package objects are updated as well, as if the changes were
+        loaded from the database.
+
+        :arg session: session with which to connect to the database.
+        :arg updates: a list of tuple (package, values), ``package`` being
+            the Package object to update and ``values`` a dict with the new
+            ``summary``, ``description`` and/or ``upstream_url`` of the
+            package.
+
+        """
+        if not updates:
+            return
+        fields = ['summary', 'description', 'upstream_url']
+        table = cls.__table__
+        session.execute(
+            table.update().where(
+                table.c.id == sa.bindparam('pkg_id')
+            ).values(dict(
+                (field, sa.bindparam('pkg_%s' % field)) for field in fields
+            )),
+            [
+                dict(
+                    [('pkg_id', package.id)] + [
+                        ('pkg_%s' % field,
+                         values.get(field, getattr(package, field)))
+                        for field in fields
+                    ]
+                )
+                for package, values in updates
+            ]
+        )
+        for package, values in updates:
+            for field, value in values.items():
+                set_committed_value(package, field, value)
+
+    @classmethod
+    def search_text(cls, session, term, limit=None):
+        """ Return the packages whose name looks like the provided term or
+        whose summary and description contain its words, the most relevant
+        first.
+
+        This relies on the ``pg_trgm`` extension and the full text search
+        of PostgreSQL.
+
+        :arg session: session with which to connect to the database.
+        :arg term: the text to search, without wildcard.
+        :kwarg limit: the maximum number of packages to return.
+        :returns: a list of tuples (name, summary, status, score).
+
+        """
+        return cls._search_text_query(session, term, limit=limit).all()
+
+    @classmethod
+    def _search_text_query(cls, session, term, limit=None):
+        """ Return the query run by ``search_text``. """
+        name = sa.func.lower(cls.name)
+        term = term.lower()
+        like_term = term.replace(
+            '\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        # Same expression as the one of the ix_Package_text_search index
+        document = sa.func.to_tsvector(
+            sa.literal_column("'english'"),
+            sa.func.coalesce(cls.summary, sa.literal_column("''"))
+            .op('||')(sa.literal_column("' '"))
+            .op('||')(
+                sa.func.coalesce(cls.description, sa.literal_column("''")))
+        )
+        words = sa.func.plainto_tsquery(
+            sa.literal_column("'english'"), term)
+        score = sa.case(
+            [
+                (name == term, 3),
+                (name.like(like_term + '%', escape='\\'), 2),
+                (name.like('%' + like_term + '%', escape='\\'), 1),
+            ],
+            else_=0
+        ) + sa.func.similarity(name, term) + sa.func.ts_rank(
+            document, words)
+
+        query = session.query(
+            cls.name, cls.summary, cls.status, score.label('score')
+        ).filter(
+            or_(
+                # The similarity operator of pg_trgm, doubled as the
+                # operators are not escaped for the DBAPIs using the
+                # format or pyformat paramstyle (psycopg2)
+                name.op('%%')(term),
+                name.like('%' + like_term + '%', escape='\\'),
+                document.op('@@')(words),
+            )
+        ).order_by(
+            score.desc(), cls.name
+        )
+
+        if limit:
+            query = query.limit(limit)
+
+        return query
+
     @classmethod
     def get_package_of_user(
             cls, session, user, pkg_status=None, poc=True, eol=False):
@@ -1511,6 +2650,54 @@ class Package(BASE):
 
         return query.all()
 
+    @classmethod
+    def count_package_of_user(cls, session, user, eol=False):
+        """ Return, for each collection, the number of packages on which a
+        given user has commit rights and is the point of contact and the
+        number of packages on which they are not.
+
+        This is the same as counting the results of
+        ``get_package_of_user`` per collection, in a single query.
+
+        :arg session: session with which to connect to the database.
+        :arg user: the FAS username of the user of interest.
+        :kwarg eol: a boolean to specify wether the output should include
+            End Of Life releases or not.
+        :returns: a list of tuples (branch name, number of packages the
+            user is point of contact of, number of packages the user
+            co-maintains), only for the collections where the user has at
+            least one package.
+
+        """
+        is_poc = PackageListing.point_of_contact == user
+
+        query = session.query(
+            Collection.branchname,
+            sa.func.count(sa.func.distinct(
+                sa.case([(is_poc, PackageListing.package_id)]))),
+            sa.func.count(sa.func.distinct(
+                sa.case([(not_(is_poc), PackageListing.package_id)]))),
+        ).filter(
+            PackageListing.id == PackageListingAcl.packagelisting_id
+        ).filter(
+            PackageListing.collection_id == Collection.id
+        ).filter(
+            PackageListing.status == 'Approved'
+        ).filter(
+            PackageListingAcl.fas_name == user
+        ).filter(
+            PackageListingAcl.acl == 'commit'
+        ).filter(
+            PackageListingAcl.status == 'Approved'
+        ).group_by(
+            Collection.branchname
+        )
+
+        if eol is False:
+            query = query.filter(Collection.status != 'EOL')
+
+        return query.all()
+
     @classmethod
     def get_package_watch_by_user(
             cls, session, user, pkg_status=None, eol=False):
@@ -1603,13 +2790,27 @@ class Package(BASE):
 
         return query.all()
 
-    def to_json(self, _seen=None, acls=True, package=True, collection=None):
+    def to_json(self, _seen=None, acls=True, package=True, collection=None,
+                cache=None):
         """ Return a dictionnary representation of the object.
 
+        :kwarg cache: a dictionary in which the packages and collections
+            already serialized are stored, so that they are built only once
+            when serializing many objects together.
+
         """
-        _seen = _seen or []
+        if _seen is None:
+            _seen = set()
         cls = type(self)
 
+        # Protect against infinite recursion
+        with_acls = acls and PackageListing not in _seen
+
+        # Only the representations without ACLs are shared
+        key = (cls, self.id)
+        if not with_acls and cache is not None and key in cache:
+            return cache[key]
+
         ## pylint complains about timetuple() but it is a method
         # pylint: disable=E1102
 
@@ -1625,20 +2826,25 @@ class Package(BASE):
             'koschei_monitor': self.koschei,
         }
 
-        _seen.append(cls)
+        _seen.add(cls)
 
-        # Protect against infinite recursion
         result['acls'] = []
-        if acls and PackageListing not in _seen:
+        if with_acls:
+            if cache is None:
+                # Each listing refers to this package
+                cache = {}
             if isinstance(collection, basestring):
                 collection = [collection]
             for pkg in self.listings:
                 if collection:
                     if pkg.collection.branchname in collection:
-                        result['acls'].append(
-                            pkg.to_json(_seen, package=package))
+                        result['acls'].append(pkg.to_json(
+                            _seen, package=package, cache=cache))
                 else:
-                    result['acls'].append(pkg.to_json(_seen, package=package))
+                    result['acls'].append(pkg.to_json(
+                        _seen, package=package, cache=cache))
+        elif cache is not None:
+            cache[key] = result
 
         return result
 
@@ -1680,9 +2886,14 @@ class Log(BASE):
     @classmethod
     def search(cls, session, package_id=None, packager=None,
                from_date=None, limit=None,
-               offset=None, count=False):
+               offset=None, count=False, after=None, archived=True):
         """ Return the list of the last Log entries present in the database.
 
+        The entries are searched in the Log table first, the archived
+        entries (see ``archive``) are only searched if the Log table does
+        not have enough entries or if ``from_date`` or ``after`` are older
+        than its oldest entry.
+
         :arg cls: the class object
         :arg session: the database session used to query the information.
         :kwarg package: retrict the logs to a certain package.
@@ -1692,32 +2903,106 @@ class Log(BASE):
         :kwarg offset: start the result at row X
         :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+            The archived entries are not counted, see ``LogArchive.search``.
+        :kwarg after: a tuple (change_time, id) of the last entry returned,
+            to return the entries following it.
+        :kwarg archived: a boolean specifying whether to complete the
+            results with the archived entries. Defaults to True.
 
         """
-        query = session.query(
-            cls
-        )
+        query = _filter_logs(
+            session.query(cls), cls, package_id=package_id,
+            packager=packager, from_date=from_date)
+
+        # The Log table only contains entries more recent than its oldest
+        # one, no need to search it for older entries
+        oldest = cls.oldest(session)
+        recent = oldest is not None
+        if recent and from_date is not None:
+            recent = _to_datetime(from_date) >= oldest
+        if recent and after:
+            recent = after[0] >= oldest
 
-        if package_id:
-            query = query.filter(cls.package_id == package_id)
+        if count:
+            if not recent:
+                return 0
+            return query.count()
 
-        if packager:
-            query = query.filter(cls.user == packager)
+        logs = []
+        if recent:
+            paged_query = query
+            if after:
+                paged_query = _keyset(
+                    paged_query, [cls.change_time, cls.id], after,
+                    descending=True)
+            if offset:
+                paged_query = paged_query.offset(offset)
+            if limit:
+                paged_query = paged_query.limit(limit)
+            logs = paged_query.all()
+
+        if not archived or (limit and len(logs) >= limit):
+            return logs
+
+        # Complete the results with the archived entries
+        if logs:
+            offset = None
+        elif offset and recent:
+            offset = max(offset - query.count(), 0)
+        if limit:
+            limit = limit - len(logs)
+        logs.extend(LogArchive.search(
+            session, package_id=package_id, packager=packager,
+            from_date=from_date, limit=limit, offset=offset, after=after))
 
-        if from_date:
-            query = query.filter(cls.change_time <= from_date)
+        return logs
 
-        query = query.order_by(cls.change_time.desc())
+    @classmethod
+    def oldest(cls, session):
+        """ Return the date of the oldest entry of the Log table or None
+        if it is empty.
 
-        if count:
-            return query.count()
+        :arg cls: the class object
+        :arg session: the database session used to query the information.
 
-        if offset:
-            query = query.offset(offset)
-        if limit:
-            query = query.limit(limit)
+        """
+        return session.query(sa.func.min(cls.change_time)).scalar()
 
-        return query.all()
+    @classmethod
+    def last_id(cls, session):
+        """ Return the identifier of the most recent entry of the Log
+        table or None if it is empty.
+
+        :arg cls: the class object
+        :arg session: the database session used to query the information.
+
+        """
+        return session.query(sa.func.max(cls.id)).scalar()
+
+    @classmethod
+    def archive(cls, session, before):
+        """ Move the entries of the Log table older than the specified date
+        to the LogArchive table.
+
+        :arg cls: the class object
+        :arg session: the database session used to query the information.
+        :arg before: the datetime before which the entries are archived.
+        :returns: the number of entries archived.
+
+        """
+        columns = ['id', 'user', 'change_time', 'package_id', 'description']
+        table = cls.__table__
+        session.execute(LogArchive.__table__.insert().from_select(
+            columns,
+            sa.select(
+                [table.c[column] for column in columns]
+            ).where(
+                table.c.change_time < before
+            )
+        ))
+        result = session.execute(
+            table.delete().where(table.c.change_time < before))
+        return result.rowcount
 
     @classmethod
     def insert(cls, session, user, package, description):
@@ -1737,6 +3022,87 @@ class Log(BASE):
         session.add(log)
         session.flush()
 
+    @classmethod
+    def insert_many(cls, session, entries):
+        """ Insert the given log entries into the database in a single
+        query.
+
+        :arg session: the session to connect to the database with
+        :arg entries: a list of tuple (user, package, description), see
+            ``insert`` for the meaning of each element.
+
+        """
+        if not entries:
+            return
+        now = datetime.datetime.utcnow()
+        session.execute(cls.__table__.insert(), [
+            dict(
+                user=user,
+                package_id=package.id if package else None,
+                description=description,
+                change_time=now,
+            )
+            for user, package, description in entries
+        ])
+
+
+class LogArchive(BASE):
+    """Log records archived.
+
+    The Log entries older than a certain date are moved here by
+    ``Log.archive`` to keep the Log table small.
+
+    Table -- LogArchive
+    """
+
+    __tablename__ = 'LogArchive'
+    id = sa.Column(
+        sa.Integer, nullable=False, primary_key=True, autoincrement=False)
+    user = sa.Column(sa.String(32), nullable=False, index=True)
+    change_time = sa.Column(sa.DateTime, nullable=False, index=True)
+    package_id = sa.Column(
+        sa.Integer,
+        sa.ForeignKey(
+            'Package.id', ondelete='SET NULL', onupdate='CASCADE'),
+        nullable=True,
+        index=True)
+    description = sa.Column(sa.Text, nullable=False)
+
+    def __repr__(self):
+        """ The string representation of this object.
+
+        """
+        return 'LogArchive(user=%r, description=%r, change_time=%r)' % (
+            self.user, self.description,
+            self.change_time.strftime('%Y-%m-%d %H:%M:%S'))
+
+    @classmethod
+    def search(cls, session, package_id=None, packager=None,
+               from_date=None, limit=None,
+               offset=None, count=False, after=None):
+        """ Return the list of the last archived Log entries.
+
+        See ``Log.search`` for the arguments.
+
+        """
+        query = _filter_logs(
+            session.query(cls), cls, package_id=package_id,
+            packager=packager, from_date=from_date)
+
+        if count:
+            return query.count()
+
+        if after:
+            query = _keyset(
+                query, [cls.change_time, cls.id], after, descending=True)
+
+        if offset:
+            query = query.offset(offset)
+        if limit:
+            query = query.limit(limit)
+
+        return query.all()
+
 
 class AdminAction(BASE):
     """This table stores the actions asked by user and requiring an
@@ -1777,6 +3143,10 @@ class AdminAction(BASE):
     __table_args__ = (
         sa.UniqueConstraint(
             'user', 'action', 'status', 'package_id', 'collection_id'),
+        # Used to list the actions having a given status, see ``search``
+        sa.Index(
+            'ix_admin_actions_status_date_created',
+            'status', 'date_created', 'id'),
     )
 
     package = relation(
@@ -1801,12 +3171,12 @@ class AdminAction(BASE):
 
     @property
     def status(self):
-        """ Returns the status of the admin action. """
-        if self._status == 'Pending':
-            if (datetime.datetime.utcnow() - self.date_created).days < 7:
-                return self._status
-            else:
-                return 'Awaiting Review'
+        """ Returns the status of the admin action.
+
+        The actions ``Pending`` for 7 days are moved to ``Awaiting Review``
+        by ``pkgdb2.lib.expire_pending_actions``, run from a cron job.
+
+        """
         return self._status
 
     def to_json(self, _seen=None, acls=True, package=True, collection=None):
@@ -1839,7 +3209,8 @@ class AdminAction(BASE):
 
     @classmethod
     def search(cls, session, package_id=None, packager=None, action=None,
-               status=None, offset=None, limit=None, count=False):
+               status=None, offset=None, limit=None, count=False,
+               after=None):
         """ Return the list of actions present in the database and
         matching these criterias.
 
@@ -1854,6 +3225,8 @@ class AdminAction(BASE):
         :kwarg offset: start the result at row X
         :kwarg count: a boolean to return the result of a COUNT query
             if true, returns the data if false (default).
+        :kwarg after: a tuple (date_created, id) of the last action
+            returned, to return the actions following it.
 
         """
         query = session.query(
@@ -1870,43 +3243,16 @@ class AdminAction(BASE):
             query = query.filter(cls.action == action)
 
         if status:
-            if status not in ['Awaiting Review', 'Pending']:
-                query = query.filter(cls._status == status)
-            # Pending and Awaiting Review status are peculiar.
-            # After 7 days a Pending request is automatically converted
-            # to Awaiting Review.
-            # This gives 7 days to the packagers with approveacls on the
-            # package to block or set the request to Awaiting Review (ie
-            # ask rel-eng to review it)
-            elif status == 'Pending':
-                # To be pending a request should be Pending and less than
-                # 7 days old
-                query = query.filter(
-                    and_(
-                        cls._status == status,
-                        cls.date_created > (datetime.datetime.utcnow(
-                            ).date() - datetime.timedelta(days=6)),
-                    )
-                )
-            else:
-                # To be Awaiting Review, a request should be Awaiting Review
-                # or Pending and 7 days old or more.
-                query = query.filter(
-                    or_(
-                        cls._status == status,
-                        and_(
-                            cls._status == 'Pending',
-                            cls.date_created < (datetime.datetime.utcnow(
-                                ).date() - datetime.timedelta(days=6)),
-                        )
-                    )
-                )
+            query = query.filter(cls._status == status)
 
-        query = query.order_by(cls.date_created.asc())
+        query = query.order_by(cls.date_created.asc(), cls.id.asc())
 
         if count:
             return query.count()
 
+        if after:
+            query = _keyset(query, [cls.date_created, cls.id], after)
+
         if offset:
             query = query.offset(offset)
         if limit:
@@ -1914,6 +3260,52 @@ class AdminAction(BASE):
 
         return query.all()
 
+    @classmethod
+    def get_expired_pending(cls, session, before):
+        """ Return the actions still ``Pending`` that were created before
+        the specified date.
+
+        A ``Pending`` action gives some time to the packagers with
+        approveacls on the package to block the request or to set it to
+        ``Awaiting Review`` (ie: ask rel-eng to review it), after which it
+        is moved to ``Awaiting Review``.
+
+        The actions for which the same user already has the same request
+        ``Awaiting Review`` are left aside, they cannot be moved to this
+        status.
+
+        :arg cls: the class object
+        :arg session: the database session used to query the information.
+        :arg before: the datetime before which the actions were created.
+
+        """
+        other = aliased(cls)
+        duplicate = session.query(
+            other.id
+        ).filter(
+            other._status == 'Awaiting Review'
+        ).filter(
+            other.user == cls.user
+        ).filter(
+            other.action == cls.action
+        ).filter(
+            other.package_id == cls.package_id
+        ).filter(
+            other.collection_id == cls.collection_id
+        )
+
+        return session.query(
+            cls
+        ).filter(
+            cls._status == 'Pending'
+        ).filter(
+            cls.date_created < before
+        ).filter(
+            ~duplicate.exists()
+        ).order_by(
+            cls.date_created.asc(), cls.id.asc()
+        ).all()
+
     @classmethod
     def get(cls, session, action_id):
         """ Return the admin action object having the specified identifier.
@@ -1929,7 +3321,99 @@ class AdminAction(BASE):
         return query.first()
 
 
-def notify(session, eol=False, name=None, version=None, acls=None):
+class Notification(BASE):
+    """This table stores the fedmsg messages and emails to send once the
+    transaction which generated them is committed.
+
+    Table -- Notification
+    """
+
+    __tablename__ = 'Notification'
+    id = sa.Column(sa.Integer, nullable=False, primary_key=True)
+    # Either `fedmsg` or `email`
+    kind = sa.Column(sa.String(10), nullable=False)
+    user = sa.Column(sa.String(32), nullable=False)
+    topic = sa.Column(sa.Text, nullable=True)
+    package_name = sa.Column(sa.String(200), nullable=True)
+    subject = sa.Column(sa.Text, nullable=True)
+    content = sa.Column(sa.Text, nullable=False)
+    attempts = sa.Column(sa.Integer, nullable=False, default=0)
+    last_error = sa.Column(sa.Text, nullable=True)
+    date_created = sa.Column(sa.DateTime, nullable=False,
+                             default=datetime.datetime.utcnow)
+
+    def __init__(self, kind, user, content, topic=None,
+                 package_name=None, subject=None):
+        self.kind = kind
+        self.user = user
+        self.content = content
+        self.topic = topic
+        self.package_name = package_name
+        self.subject = subject
+
+    def __repr__(self):
+        """ The string representation of this object.
+
+        """
+        return 'Notification(%r, user=%r, topic=%r, package_name=%r)' % (
+            self.kind, self.user, self.topic, self.package_name)
+
+    @property
+    def message(self):
+        """ Return the fedmsg message stored in this notification. """
+        return json.loads(self.content)
+
+    @classmethod
+    def insert_many(cls, session, entries):
+        """ Insert the given notifications into the database in a single
+        query.
+
+        :arg session: the session to connect to the database with
+        :arg entries: a list of dictionaries whose keys are the arguments
+            of the constructor of this class. The ``message`` key, if
+            present, holds the fedmsg message to store as ``content``.
+
+        """
+        if not entries:
+            return
+        now = datetime.datetime.utcnow()
+        rows = []
+        for entry in entries:
+            row = dict(
+                topic=None, package_name=None, subject=None,
+                attempts=0, date_created=now)
+            row.update(entry)
+            if 'message' in row:
+                row['content'] = json.dumps(row.pop('message'))
+            rows.append(row)
+        session.execute(cls.__table__.insert(), rows)
+
+    @classmethod
+    def pending(cls, session, max_attempts, limit=None):
+        """ Return the notifications still to be sent, oldest first.
+
+        :arg session: the database session used to query the information.
+        :arg max_attempts: the number of attempts after which a
+            notification is no longer sent.
+        :kwarg limit: the maximum number of notifications to return.
+
+        """
+        query = session.query(
+            cls
+        ).filter(
+            cls.attempts < max_attempts
+        ).order_by(
+            cls.id
+        )
+
+        if limit:
+            query = query.limit(limit)
+
+        return query.all()
+
+
+def notify(session, eol=False, name=None, version=None, acls=None,
+           stream=False):
     """ Return the user that should be notify for each package.
 
     :arg session: the session to connect to the database with.
@@ -1943,6 +3427,9 @@ def notify(session, eol=False, name=None, version=None, acls=None):
         will return any person having one of these three acls for each
         package in the database.
         If the acls specified is ``all`` then all ACLs are used.
+    :kwarg stream: a boolean specifying whether to return an iterator
+        fetching the rows by batch rather than the list of all the rows.
+        Defaults to False.
 
     """
 
@@ -1976,7 +3463,7 @@ def notify(session, eol=False, name=None, version=None, acls=None):
     ).group_by(
         Package.name, PackageListingAcl.fas_name
     ).order_by(
-        Package.name
+        Package.name, PackageListingAcl.fas_name
     )
 
     if eol is False:
@@ -1988,14 +3475,22 @@ def notify(session, eol=False, name=None, version=None, acls=None):
     if version:
         query = query.filter(Collection.version == version)
 
+    if stream:
+        return _stream(query)
+
     return query.all()
 
 
-def bugzilla(session, name=None):
+def bugzilla(session, name=None, stream=False):
     """ Return information for each package to sync with bugzilla.
 
+    The rows are ordered by collection name and package name.
+
     :arg session: the session to connect to the database with.
     :kwarg name: restricts the output to a specific collection name.
+    :kwarg stream: a boolean specifying whether to return an iterator
+        fetching the rows by batch rather than the list of all the rows.
+        Defaults to False.
 
     """
     query = session.query(
@@ -2026,27 +3521,59 @@ def bugzilla(session, name=None):
         PackageListingAcl.fas_name, Package.summary, Collection.branchname,
         Collection.version
     ).order_by(
-        Package.name
+        Collection.name, Package.name
     )
 
     if name:
         query = query.filter(Collection.name == name)
 
+    if stream:
+        return _stream(query)
+
     return query.all()
 
 
-def vcs_acls(session, eol=False):
-    """ Return information for each package to sync with git.
+def bugzilla_grouped(session, name=None, stream=False):
+    """ Return information for each package to sync with bugzilla, grouped
+    by the database in one row per collection and package.
+
+    Only the branches having at least one approved ``watchbugzilla`` ACL
+    are considered, the point of contact returned is the one of the most
+    recent of these branches that is not orphaned (``devel`` being the
+    most recent), or ``orphan`` if they all are.
+    The watchers returned are the people watching at least one branch of
+    which they are not the point of contact.
+    The rows are ordered by collection name and package name.
 
     :arg session: the session to connect to the database with.
-    :kwarg eol: A boolean specifying whether to include information about
-        End Of Life collections or not. Defaults to ``False``.
+    :kwarg name: restricts the output to a specific collection name.
+    :kwarg stream: a boolean specifying whether to return an iterator
+        fetching the rows by batch rather than the list of all the rows.
+        Defaults to False.
 
     """
+    # The point of contact is the one of the most recent non-orphaned
+    # branch: prefix each point of contact with the rank of its branch
+    # written on five digits, the maximum of these strings is then the
+    # winning point of contact prefixed with its rank.
+    rank = sa.case(
+        [(Collection.version == 'devel', 99999)],
+        else_=10000 + sa.cast(Collection.version, sa.Integer)
+    )
+    poc = sa.func.max(sa.case([(
+        PackageListing.point_of_contact != 'orphan',
+        sa.cast(rank, sa.String) + PackageListing.point_of_contact
+    )]))
+
     query = session.query(
-        Package.name,  # 0
-        PackageListingAcl.fas_name,  # 1
-        Collection.branchname,  # 2
+        Collection.name,  # 0
+        Package.name,  # 1
+        Package.summary,  # 2
+        sa.func.coalesce(sa.func.substr(poc, 6), 'orphan'),  # 3
+        group_concat(sa.case([(
+            PackageListingAcl.fas_name != PackageListing.point_of_contact,
+            PackageListingAcl.fas_name
+        )])),  # 4
     ).filter(
         Package.id == PackageListing.package_id
     ).filter(
@@ -2054,54 +3581,80 @@ def vcs_acls(session, eol=False):
     ).filter(
         PackageListing.collection_id == Collection.id
     ).filter(
-        PackageListing.status.in_(['Approved', 'Orphaned'])
-    )
-
-    if not eol:
-        query = query.filter(
-            Collection.status != 'EOL')
-
-    query = query.filter(
-        PackageListingAcl.acl == 'commit'
+        Package.status == 'Approved'
+    ).filter(
+        Collection.status != 'EOL'
+    ).filter(
+        PackageListingAcl.acl == 'watchbugzilla'
     ).filter(
         PackageListingAcl.status == 'Approved'
     ).group_by(
-        Package.name, PackageListingAcl.fas_name,
-        Collection.branchname,
+        Collection.name, Package.id, Package.name, Package.summary
     ).order_by(
-        Package.name
+        Collection.name, Package.name
     )
 
-    data = query.all()
-    sub = set([(it[0], it[2]) for it in data])
+    if name:
+        query = query.filter(Collection.name == name)
+
+    if stream:
+        return _stream(query)
+
+    return query.all()
+
+
+def vcs_acls(session, eol=False, stream=False):
+    """ Return information for each package to sync with git.
+
+    Each row contains the name of the package, the name of a user or group
+    having commit on it (``None`` if nobody has) and the branch name.
+    The rows are ordered by package name, branch name and user name.
+
+    :arg session: the session to connect to the database with.
+    :kwarg eol: A boolean specifying whether to include information about
+        End Of Life collections or not. Defaults to ``False``.
+    :kwarg stream: a boolean specifying whether to return an iterator
+        fetching the rows by batch rather than the list of all the rows.
+        Defaults to False.
 
-    query2 = session.query(
+    """
+    query = session.query(
         Package.name,  # 0
-        Collection.branchname,  # 1
-    ).filter(
-        Package.id == PackageListing.package_id
-    ).filter(
-        PackageListing.collection_id == Collection.id
+        PackageListingAcl.fas_name,  # 1
+        Collection.branchname,  # 2
+    ).select_from(
+        PackageListing
+    ).join(
+        Package, Package.id == PackageListing.package_id
+    ).join(
+        Collection, PackageListing.collection_id == Collection.id
+    ).outerjoin(
+        PackageListingAcl,
+        and_(
+            PackageListingAcl.packagelisting_id == PackageListing.id,
+            PackageListingAcl.acl == 'commit',
+            PackageListingAcl.status == 'Approved',
+        )
     ).filter(
         PackageListing.status.in_(['Approved', 'Orphaned'])
-    ).group_by(
-        Package.name,
-        Collection.branchname,
-    ).order_by(
-        Package.name,
-        Collection.branchname
     )
 
     if not eol:
-        query2 = query2.filter(
+        query = query.filter(
             Collection.status != 'EOL')
 
-    sub2 = set(query2.all())
+    query = query.group_by(
+        Package.name, Collection.branchname,
+        PackageListingAcl.fas_name,
+    ).order_by(
+        Package.name, Collection.branchname,
+        PackageListingAcl.fas_name,
+    )
 
-    for entry in sub2 - sub:
-        data.append([entry[0], None, entry[1]])
+    if stream:
+        return _stream(query)
 
-    return data
+    return query.all()
 
 
 def get_groups(session):
@@ -2139,3 +3692,19 @@ def get_groups(session):
         groups.append(group[0].split('group::')[1])
 
     return groups
+
+
+def has_pg_trgm(session):
+    """ Return whether the database is a PostgreSQL database with the
+    ``pg_trgm`` extension installed, as required by
+    ``Package.search_text``.
+
+    :arg session: the session to connect to the database with.
+
+    """
+    if session.bind.dialect.name != 'postgresql':
+        return False
+
+    return session.execute(
+        "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+    ).scalar() is not None
@@ -39,22 +39,32 @@ def fedmsg_publish(*args, **kwargs):  # pragma: no cover
     ''' Try to publish a message on the fedmsg bus. '''
     ## We catch Exception if we want :-p
     # pylint: disable=W0703
+    try:
+        _fedmsg_send(*args, **kwargs)
+    except Exception, err:
+        warnings.warn(str(err))
+
+
+def _fedmsg_send(*args, **kwargs):  # pragma: no cover
+    ''' Publish a message on the fedmsg bus, if fedmsg is installed. '''
     ## Ignore message about fedmsg import
     # pylint: disable=F0401
     kwargs['modname'] = 'pkgdb'
     try:
         import fedmsg
-        fedmsg.publish(*args, **kwargs)
-    except Exception, err:
+    except ImportError, err:
         warnings.warn(str(err))
+        return
+    fedmsg.publish(*args, **kwargs)
 
 
-def email_publish(
-        user, package, message, subject=None,
-        to_email=None):  # pragma: no cover
-    ''' Send notification by email. '''
+def _build_email(user, package_name, message, subject=None, to_email=None):
+    ''' Return the sender, the recipients and the content of the email
+    notifying about the provided message or None if there is nobody to
+    send it to.
+    '''
 
-    if not package and not to_email:
+    if not package_name and not to_email:
         # If we have no package and no to_email, we have no way to know
         # where to send the email
         return
@@ -63,9 +73,9 @@ def email_publish(
 
     if subject:
         msg['Subject'] = '[PkgDB] %s' % subject
-    elif package:
+    elif package_name:
         msg['Subject'] = '[PkgDB] {0} updated {1}'.format(
-            user, package.name)
+            user, package_name)
     else:
         msg['Subject'] = '[PkgDB] updated by {0}'.format(user)
 
@@ -75,7 +85,7 @@ def email_publish(
     if not to_email:
         email_to_template = pkgdb2.APP.config.get(
             'PKGDB2_EMAIL_TO', '{pkg_name}-owner@fedoraproject.org')
-        to_email = email_to_template.format(pkg_name=package.name)
+        to_email = email_to_template.format(pkg_name=package_name)
 
     msg['From'] = from_email
     msg['To'] = to_email
@@ -87,11 +97,161 @@ def email_publish(
         cc_email = [cc_email]
     if isinstance(to_email, basestring):
         to_email = [to_email]
-    to_email.extend(cc_email)
+    else:
+        to_email = list(to_email)
+    if cc_email:
+        to_email.extend(cc_email)
+
+    return from_email, to_email, msg.as_string()
+
+
+def email_publish(
+        user, package, message, subject=None,
+        to_email=None):  # pragma: no cover
+    ''' Send notification by email. '''
+
+    email = _build_email(
+        user, package.name if package else None, message,
+        subject=subject, to_email=to_email)
+    if not email:
+        return
 
     # Send the message via our own SMTP server, but don't include the
     # envelope header.
     smtp = smtplib.SMTP(pkgdb2.APP.config.get(
         'PKGDB2_EMAIL_SMTP_SERVER', 'localhost'))
-    smtp.sendmail(from_email, to_email, msg.as_string())
+    smtp.sendmail(*email)
     smtp.quit()
+
+
+class SMTPConnection(object):
+    ''' Connection to the SMTP server re-used to send several emails.
+
+    The connection is opened when the first email is sent and re-opened
+    if the server closed it in the meanwhile.
+    '''
+
+    def __init__(self, server=None):
+        ''' Instanciate a SMTPConnection object.
+
+        :kwarg server: the SMTP server to connect to, defaults to the
+            ``PKGDB2_EMAIL_SMTP_SERVER`` configuration key.
+
+        '''
+        self.server = server or pkgdb2.APP.config.get(
+            'PKGDB2_EMAIL_SMTP_SERVER', 'localhost')
+        self._smtp = None
+
+    def sendmail(self, from_email, to_email, content):
+        ''' Send an email, see ``smtplib.SMTP.sendmail``. '''
+        if self._smtp is None:
+            self._smtp = smtplib.SMTP(self.server)
+        try:
+            self._smtp.sendmail(from_email, to_email, content)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = smtplib.SMTP(self.server)
+            self._smtp.sendmail(from_email, to_email, content)
+
+    def close(self):
+        ''' Close the connection to the SMTP server, if it is opened. '''
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+
+def _failed(notification, err):
+    ''' Record that sending the specified notification failed. '''
+    pkgdb2.LOG.warning(
+        'Failed to send %s: %s', notification, err)
+    notification.attempts += 1
+    notification.last_error = str(err)
+
+
+def dispatch(session, batch_size=100, max_attempts=None, smtp=None):
+    ''' Send a batch of the fedmsg messages and emails stored in the
+    outbox (the ``Notification`` table) and commit.
+
+    The emails about the same package are sent as a single email.
+    The notifications sent are removed from the outbox, the ones which
+    failed are tried again on the next call until they failed
+    ``max_attempts`` times.
+
+    This function is not meant to be run by several processes at once.
+
+    :arg session: the session with which to connect to the database.
+    :kwarg batch_size: the maximum number of notifications to send.
+    :kwarg max_attempts: the number of attempts after which a notification
+        is left in the outbox, defaults to the
+        ``PKGDB2_NOTIFICATION_MAX_ATTEMPTS`` configuration key.
+    :kwarg smtp: the ``SMTPConnection`` to send the emails with, a new
+        one is opened and closed if none is provided.
+    :returns: the number of notifications sent.
+
+    '''
+    ## We catch Exception to retry later whatever the failure was
+    # pylint: disable=W0703
+
+    # To avoid a circular import.
+    import pkgdb2.lib.model as model
+
+    if max_attempts is None:
+        max_attempts = pkgdb2.APP.config.get(
+            'PKGDB2_NOTIFICATION_MAX_ATTEMPTS', 5)
+
+    notifications = model.Notification.pending(
+        session, max_attempts, limit=batch_size)
+
+    sent = 0
+    emails = {}
+    for notification in notifications:
+        if notification.kind == 'email':
+            emails.setdefault(notification.package_name, []).append(
+                notification)
+            continue
+        try:
+            _fedmsg_send(notification.topic, notification.message)
+            session.delete(notification)
+            sent += 1
+        except Exception, err:
+            _failed(notification, err)
+
+    opened = smtp is None
+    if opened:
+        smtp = SMTPConnection()
+    try:
+        for package_name in sorted(emails, key=lambda name: name or ''):
+            pkg_notifications = emails[package_name]
+            user = ', '.join(sorted(set(
+                notification.user for notification in pkg_notifications)))
+            subject = None
+            if len(pkg_notifications) == 1:
+                subject = pkg_notifications[0].subject
+            body = '{0}\n\nTo make changes to this package see:\n' \
+                '{1}/package/{2}'.format(
+                    '\n'.join(
+                        notification.content
+                        for notification in pkg_notifications),
+                    pkgdb2.APP.config.get('SITE_URL'),
+                    package_name)
+
+            try:
+                email = _build_email(user, package_name, body, subject)
+                if email:
+                    smtp.sendmail(*email)
+            except Exception, err:
+                for notification in pkg_notifications:
+                    _failed(notification, err)
+                continue
+
+            for notification in pkg_notifications:
+                session.delete(notification)
+                sent += 1
+    finally:
+        if opened:
+            smtp.close()
+
+    session.commit()
+    return sent
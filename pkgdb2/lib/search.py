@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+Search of the packages by name, summary and description.
+
+The packages are ranked by relevance: the packages named after the term
+searched come first, then the ones whose name starts with it, contains it
+or looks like it and finally the ones whose summary or description
+contains its words.
+
+The search is done by one of the ``BACKENDS``, chosen with the
+``PKGDB2_SEARCH_BACKEND`` configuration key:
+
+- ``postgresql`` relies on the ``pg_trgm`` extension and on the full text
+  search of PostgreSQL.
+- ``memory`` searches a trigram index of the package names and an index of
+  the words of their summary and description built by each worker. The
+  index is kept as a snapshot (see ``pkgdb2.lib.snapshots``) rebuilt when
+  a package is added, updated or removed.
+- ``auto`` (the default) uses ``postgresql`` if the extension is available
+  and ``memory`` otherwise.
+'''
+
+import bisect
+import heapq
+import re
+
+import pkgdb2
+from pkgdb2.lib import model
+from pkgdb2.lib import snapshots
+from pkgdb2.lib.exceptions import PkgdbException
+
+
+# Minimal similarity between the name of a package and the term searched
+# for the package to be returned, same as the default of pg_trgm
+SIMILARITY_THRESHOLD = 0.3
+
+# Relevance of a word found in the summary or in the description
+SUMMARY_WEIGHT = 1.0
+DESCRIPTION_WEIGHT = 0.5
+
+# Words shorter than this only match identical words, not the words they
+# start
+MIN_PREFIX_LENGTH = 3
+
+_WORDS = re.compile(r'\w+', re.UNICODE)
+
+# Whether the database of each engine has the pg_trgm extension
+_PG_TRGM = {}
+
+
+def _trigrams(text):
+    ''' Return the set of trigrams of the provided lower case text. '''
+    text = '  %s ' % text
+    return set(text[cnt:cnt + 3] for cnt in range(len(text) - 2))
+
+
+class TrigramIndex(object):
+    ''' In-memory index of the packages.
+
+    The names are indexed per trigram and the summaries and descriptions
+    per word.
+    '''
+
+    def __init__(self, packages):
+        ''' Instanciate a TrigramIndex object.
+
+        :arg packages: an iterable of tuples (name, summary, description,
+            status) as returned by ``model.Package.get_search_data``.
+
+        '''
+        self.packages = []
+        self.names = []
+        self.name_trigrams = []
+        self.trigrams = {}
+        self.words = {}
+
+        for idx, (name, summary, description, status) in enumerate(
+                packages):
+            self.packages.append((name, summary, status))
+            name = name.lower()
+            self.names.append(name)
+            trigrams = _trigrams(name)
+            self.name_trigrams.append(len(trigrams))
+            for trigram in trigrams:
+                self.trigrams.setdefault(trigram, []).append(idx)
+
+            for text, weight in (
+                    (description, DESCRIPTION_WEIGHT),
+                    (summary, SUMMARY_WEIGHT)):
+                for word in _WORDS.findall((text or '').lower()):
+                    self.words.setdefault(word, {})[idx] = weight
+
+        self.vocabulary = sorted(self.words)
+
+    def _match_name(self, term):
+        ''' Return the score of the packages whose name matches the term.
+        '''
+        trigrams = _trigrams(term)
+        shared = {}
+        for trigram in trigrams:
+            for idx in self.trigrams.get(trigram, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+
+        scores = {}
+        for idx, cnt in shared.iteritems():
+            name = self.names[idx]
+            similarity = float(cnt) / (
+                len(trigrams) + self.name_trigrams[idx] - cnt)
+            if name == term:
+                score = 3
+            elif name.startswith(term):
+                score = 2
+            elif term in name:
+                score = 1
+            elif similarity >= SIMILARITY_THRESHOLD:
+                score = 0
+            else:
+                continue
+            scores[idx] = score + similarity
+        return scores
+
+    def _match_words(self, term):
+        ''' Return the score of the packages whose summary or description
+        contain all the words of the term.
+        '''
+        words = _WORDS.findall(term)
+        if not words:
+            return {}
+
+        scores = None
+        for word in words:
+            matches = [word] if word in self.words else []
+            if len(word) >= MIN_PREFIX_LENGTH:
+                start = bisect.bisect_left(self.vocabulary, word)
+                end = bisect.bisect_left(self.vocabulary, word + u'\uffff')
+                matches = self.vocabulary[start:end]
+
+            word_scores = {}
+            for match in matches:
+                for idx, weight in self.words[match].iteritems():
+                    if weight > word_scores.get(idx, 0):
+                        word_scores[idx] = weight
+
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = dict(
+                    (idx, score + word_scores[idx])
+                    for idx, score in scores.iteritems()
+                    if idx in word_scores
+                )
+            if not scores:
+                return {}
+
+        return dict(
+            (idx, score / len(words)) for idx, score in scores.iteritems())
+
+    def search(self, term, limit=None):
+        ''' Return the packages matching the provided term, the most
+        relevant first.
+
+        :arg term: the text to search.
+        :kwarg limit: the maximum number of packages to return.
+        :returns: a list of tuples (name, summary, status, score).
+
+        '''
+        term = term.lower()
+        scores = self._match_name(term)
+        for idx, score in self._match_words(term).iteritems():
+            scores[idx] = scores.get(idx, 0) + score
+
+        key = lambda item: (-item[1], self.names[item[0]])
+        if limit:
+            ranked = heapq.nsmallest(limit, scores.iteritems(), key=key)
+        else:
+            ranked = sorted(scores.iteritems(), key=key)
+
+        return [
+            self.packages[idx] + (score,)
+            for idx, score in ranked
+        ]
+
+
+def _search_postgresql(session, term, limit=None):
+    ''' Search the packages using the pg_trgm extension of PostgreSQL. '''
+    return [
+        tuple(row) for row in
+        model.Package.search_text(session, term, limit=limit)
+    ]
+
+
+def _search_memory(session, term, limit=None):
+    ''' Search the packages using the in-memory trigram index. '''
+    index = snapshots.get_snapshot(
+        'search', 'packages',
+        lambda: TrigramIndex(model.Package.get_search_data(session)))
+    return index.search(term, limit=limit)
+
+
+BACKENDS = {
+    'postgresql': _search_postgresql,
+    'memory': _search_memory,
+}
+
+
+def _get_backend(session):
+    ''' Return the backend to use to search the packages. '''
+    backend = pkgdb2.APP.config.get('PKGDB2_SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        url = str(session.bind.url)
+        if url not in _PG_TRGM:
+            _PG_TRGM[url] = model.has_pg_trgm(session)
+        backend = 'postgresql' if _PG_TRGM[url] else 'memory'
+    return BACKENDS[backend]
+
+
+def search_packages(session, term, limit=None):
+    ''' Return the packages whose name, summary or description matches the
+    provided term, the most relevant first.
+
+    :arg session: session with which to connect to the database.
+    :arg term: the text to search, the wildcards ``*`` and ``%`` are
+        ignored.
+    :kwarg limit: the maximum number of packages to return.
+    :returns: a list of dictionaries with the ``name``, ``summary``,
+        ``status`` and relevance ``score`` of each package.
+    :raises pkgdb2.lib.PkgdbException: There are two conditions leading to
+        this exception beeing raised:
+            - The provided ``limit`` is not an integer.
+            - The provided ``term`` is empty.
+
+    '''
+    if limit is not None:
+        try:
+            limit = abs(int(limit))
+        except ValueError:
+            raise PkgdbException('Wrong limit provided')
+
+    term = re.sub(r'[*%]+', ' ', term or '').strip()
+    if not term:
+        raise PkgdbException('No term provided')
+
+    return [
+        dict(name=name, summary=summary, status=status,
+             score=round(score, 3))
+        for name, summary, status, score in _get_backend(session)(
+            session, term, limit=limit)
+    ]
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+Materialized snapshots of expensive exports.
+
+Each snapshot belongs to a scope (for example ``vcs``). A scope has a
+generation token stored in the shared cache, it is changed every time a
+transaction logging one of the topics of this scope is committed.
+The snapshots themselves are kept in memory by each worker and rebuilt
+only when the generation of their scope changed.
+
+The ``data`` scope changes with every logged change and each package has
+its own scope (see ``package_scope``) changing with the changes logged
+for it, their generations are the data versions from which the API
+derives its ETags. Likewise, each user has a scope (see ``user_scope``)
+changing with the changes logged for their ACLs.
+'''
+
+import fnmatch
+import hashlib
+import uuid
+
+import sqlalchemy as sa
+from dogpile.cache.api import NO_VALUE
+from sqlalchemy.orm import Session
+
+import pkgdb2
+
+
+# fedmsg topics (as given to pkgdb2.lib.utils.log) invalidating each scope
+SCOPES = {
+    'data': ['*'],
+    # Changes impacting all the packages: the collections and the packages
+    # renamed
+    'catalog': [
+        'collection.*',
+        'branch.*',
+        'package.update',
+    ],
+    'vcs': [
+        'acl.update',
+        'acl.delete',
+        'owner.update',
+        'package.new',
+        'package.delete',
+        'package.update.status',
+        'package.branch.*',
+        'branch.complete',
+        'collection.new',
+        'collection.update',
+    ],
+    'acls': [
+        'acl.*',
+        'owner.update',
+        'package.new',
+        'package.delete',
+        'package.update.status',
+        'package.critpath.update',
+        'package.branch.*',
+        'branch.complete',
+        'collection.new',
+        'collection.update',
+    ],
+    'search': [
+        'package.new',
+        'package.update',
+        'package.update.status',
+        'package.delete',
+    ],
+    # Changes impacting the number of packages per collection and per
+    # packager
+    'stats': [
+        'acl.*',
+        'owner.update',
+        'package.new',
+        'package.delete',
+        'package.update',
+        'package.update.status',
+        'package.branch.*',
+        'branch.complete',
+        'collection.*',
+    ],
+    # Changes impacting the packages of several packagers, the changes of
+    # the ACLs of a packager are tracked per packager (see ``user_scope``)
+    'packagers': [
+        'package.new',
+        'package.delete',
+        'package.update.status',
+        'package.branch.*',
+        'branch.complete',
+        'collection.new',
+        'collection.update',
+    ],
+}
+
+# The snapshots built by this process, keyed on (scope, key)
+_SNAPSHOTS = {}
+
+_SESSION_KEY = 'pkgdb2_snapshots_changed'
+
+
+def _generation_key(scope):
+    ''' Return the key under which the generation of a scope is cached. '''
+    return 'pkgdb2.snapshots.generation.%s' % scope
+
+
+def package_scope(pkg_name):
+    ''' Return the scope changed by the changes logged for the specified
+    package.
+
+    :arg pkg_name: the name of the package.
+
+    '''
+    return 'package.%s' % pkg_name
+
+
+def user_scope(username):
+    ''' Return the scope changed by the changes logged for the ACLs of the
+    specified user.
+
+    :arg username: the FAS username of the user (or group).
+
+    '''
+    return 'user.%s' % username
+
+
+def compute_etag(content):
+    ''' Return the entity tag to use for the provided content.
+
+    :arg content: the text (or unicode) representation of the snapshot.
+
+    '''
+    if isinstance(content, unicode):
+        content = content.encode('utf-8')
+    return hashlib.sha1(content).hexdigest()
+
+
+def get_generation(scope):
+    ''' Return the current generation of the specified scope.
+
+    If the scope has no generation yet, one is created.
+
+    :arg scope: the name of the scope, one of the keys of ``SCOPES``.
+    :returns: the generation token or None if the cache backend does not
+        keep it (in which case snapshots cannot be re-used).
+
+    '''
+    key = _generation_key(scope)
+    generation = pkgdb2.CACHE.get(key)
+    if generation is NO_VALUE or not generation:
+        invalidate(scope)
+        generation = pkgdb2.CACHE.get(key)
+    if not isinstance(generation, basestring):
+        return None
+    return generation
+
+
+def get_generations(scopes):
+    ''' Return the current generation of each of the specified scopes,
+    retrieved from the cache at once.
+
+    The scopes having no generation yet get one.
+
+    :arg scopes: a list of scope names, either keys of ``SCOPES`` or
+        scopes returned by ``package_scope``.
+    :returns: the list of the generation tokens, None standing for the
+        scopes whose generation the cache backend does not keep.
+
+    '''
+    generations = pkgdb2.CACHE.get_multi(
+        [_generation_key(scope) for scope in scopes])
+    output = []
+    for scope, generation in zip(scopes, generations):
+        if generation is NO_VALUE or not generation:
+            generation = get_generation(scope)
+        elif not isinstance(generation, basestring):
+            generation = None
+        output.append(generation)
+    return output
+
+
+def invalidate(scope):
+    ''' Start a new generation for the specified scope, marking all the
+    snapshots built so far as outdated.
+
+    :arg scope: the name of the scope, one of the keys of ``SCOPES``.
+
+    '''
+    pkgdb2.CACHE.set(_generation_key(scope), uuid.uuid4().hex)
+
+
+def get_snapshot(scope, key, creator):
+    ''' Return the snapshot stored under the specified key, rebuilding it
+    if the generation of its scope changed since it was built.
+
+    :arg scope: the name of the scope, one of the keys of ``SCOPES``.
+    :arg key: an hashable object identifying the snapshot in this scope.
+    :arg creator: a callable without argument returning the snapshot.
+
+    '''
+    # Retrieve the generation before building the snapshot so that a
+    # change committed while we build it gets picked up by the next call
+    generation = get_generation(scope)
+    cached = _SNAPSHOTS.get((scope, key))
+    if generation is not None and cached and cached[0] == generation:
+        return cached[1]
+
+    snapshot = creator()
+    if generation is not None:
+        _SNAPSHOTS[(scope, key)] = (generation, snapshot)
+    return snapshot
+
+
+def mark_changed(session, topic, packages=None, users=None):
+    ''' Record in the session that the scopes impacted by the provided
+    topic will have to be invalidated once the transaction is committed.
+
+    :arg session: the session with which the change is made.
+    :arg topic: the fedmsg topic of the change, as given to
+        ``pkgdb2.lib.utils.log``.
+    :kwarg packages: the name of the packages changed, if any.
+    :kwarg users: the name of the users whose ACLs changed, if any.
+
+    '''
+    changed = session.info.setdefault(_SESSION_KEY, set())
+    for scope, topics in SCOPES.items():
+        for pattern in topics:
+            if fnmatch.fnmatch(topic, pattern):
+                changed.add(scope)
+                break
+    for pkg_name in packages or []:
+        changed.add(package_scope(pkg_name))
+    for username in users or []:
+        changed.add(user_scope(username))
+
+
+def _after_commit(session):
+    ''' Invalidate the scopes changed in the transaction just committed.
+    '''
+    for scope in session.info.pop(_SESSION_KEY, set()):
+        invalidate(scope)
+
+
+# pylint: disable=W0613
+def _after_rollback(session, previous_transaction):
+    ''' Forget about the scopes changed in the transaction rolled back.
+    '''
+    # Rolling back a savepoint leaves the session active, the changes
+    # made before the savepoint may still be committed.
+    if not session.is_active:
+        session.info.pop(_SESSION_KEY, None)
+
+
+sa.event.listen(Session, 'after_commit', _after_commit)
+sa.event.listen(Session, 'after_soft_rollback', _after_rollback)
@@ -31,6 +31,7 @@ import requests
 
 import pkgdb2
 import pkgdb2.lib.exceptions
+import pkgdb2.lib.snapshots
 
 from bugzilla import Bugzilla
 
@@ -83,8 +84,7 @@ def get_fas():  # pragma: no cover
     return _FAS
 
 
-@pkgdb2.CACHE.cache_on_arguments(expiration_time=3600)
-def __get_fas_grp_member(group='packager'):  # pragma: no cover
+def __get_fas_grp_member(group='packager'):
     ''' Retrieve from FAS the list of users in the packager group.
     '''
     fas = get_fas()
@@ -92,16 +92,22 @@ def __get_fas_grp_member(group='packager'):  # pragma: no cover
     return fas.group_members(group)
 
 
-def get_packagers():  # pragma: no cover
-    """ Return a list containing the name of all the packagers. """
-    output = []
-    for user in __get_fas_grp_member('packager'):
-        if user.role_type in ('user', 'sponsor', 'administrator'):
-            output.append(user.username)
-    return output
+@pkgdb2.FAS_CACHE.cache_on_arguments(expiration_time=3600)
+def get_packagers():
+    """ Return a set containing the name of all the packagers.
 
+    Once expired, the cached set keeps being returned while a new one is
+    retrieved from FAS in the background.
 
-@pkgdb2.CACHE.cache_on_arguments(expiration_time=3600)
+    """
+    return frozenset(
+        user.username
+        for user in __get_fas_grp_member('packager')
+        if user.role_type in ('user', 'sponsor', 'administrator')
+    )
+
+
+@pkgdb2.FAS_CACHE.cache_on_arguments(expiration_time=3600)
 def get_fas_group(group):  # pragma: no cover
     """ Return group information from FAS based on the specified group name.
     """
@@ -110,7 +116,7 @@ def get_fas_group(group):  # pragma: no cover
     return fas.group_by_name(group)
 
 
-@pkgdb2.CACHE.cache_on_arguments(expiration_time=3600)
+@pkgdb2.FAS_CACHE.cache_on_arguments(expiration_time=3600)
 def get_bz_email_user(username):  # pragma: no cover
     ''' Retrieve the bugzilla email associated to the provided username.
     '''
@@ -222,19 +228,10 @@ def _construct_substitutions(msg):
     return subs
 
 
-def log(session, package, topic, message):
-    """ Take a partial fedmsg topic and message.
-
-    Publish the message and log it in the db.
+def _format_log(topic, message):
+    """ Return the description to log in the db and the subject of the
+    email to send for the provided fedmsg topic and message.
     """
-
-    # To avoid a circular import.
-    import pkgdb2.lib.model as model
-    from pkgdb2.lib.notifications import fedmsg_publish, email_publish
-
-    if pkgdb2.APP.config.get('PKGDB2_FEDMSG_NOTIFICATION', True):
-        fedmsg_publish(topic, message)
-
     # A big lookup of fedmsg topics to model.Log template strings.
     templates = {
         'acl.update': 'user: %(agent)s set for %(username)s acl: %(acl)s of'
@@ -340,9 +337,55 @@ def log(session, package, topic, message):
     if topic in subject_templates:
         subject = subject_templates[topic] % substitutions
 
-    model.Log.insert(session, message['agent'], package, final_msg)
+    return final_msg, subject
+
+
+def _changed_users(message):
+    """ Return the users whose ACLs are changed by the change described by
+    the provided fedmsg message. """
+    return [
+        message[key]
+        for key in ('username', 'previous_owner')
+        if message.get(key)
+    ]
+
+
+def log(session, package, topic, message):
+    """ Take a partial fedmsg topic and message.
+
+    Publish the message and log it in the db.
+    If ``PKGDB2_NOTIFICATION_OUTBOX`` is set, the message and the email are
+    stored in the db to be sent once the transaction is committed.
+    """
+
+    # To avoid a circular import.
+    import pkgdb2.lib.model as model
+    from pkgdb2.lib.notifications import fedmsg_publish, email_publish
 
-    if pkgdb2.APP.config.get(
+    outbox = pkgdb2.APP.config.get('PKGDB2_NOTIFICATION_OUTBOX', False)
+    notifications = []
+
+    if pkgdb2.APP.config.get('PKGDB2_FEDMSG_NOTIFICATION', True):
+        if outbox:
+            notifications.append(dict(
+                kind='fedmsg', user=message['agent'], topic=topic,
+                message=message))
+        else:
+            fedmsg_publish(topic, message)
+
+    final_msg, subject = _format_log(topic, message)
+
+    model.Log.insert(session, message['agent'], package, final_msg)
+    pkgdb2.lib.snapshots.mark_changed(
+        session, topic, packages=[package.name] if package else None,
+        users=_changed_users(message))
+
+    if outbox and package and pkgdb2.APP.config.get(
+            'PKGDB2_EMAIL_NOTIFICATION', False):
+        notifications.append(dict(
+            kind='email', user=message['agent'], package_name=package.name,
+            subject=subject, content=final_msg))
+    elif pkgdb2.APP.config.get(
             'PKGDB2_EMAIL_NOTIFICATION', False):  # pragma: no cover
         body_email = final_msg
         if package:
@@ -353,9 +396,93 @@ def log(session, package, topic, message):
         email_publish(
             message['agent'], package, body_email, subject=subject)
 
+    model.Notification.insert_many(session, notifications)
+
     return final_msg
 
 
+def log_bulk(session, topic, entries, summary_topic, summary):
+    """ Log in the db a list of changes sharing the same fedmsg topic and
+    publish a single message summarizing them.
+
+    :arg session: the session with which to connect to the database.
+    :arg topic: the fedmsg topic of each change, used to format the log
+        entries.
+    :arg entries: a list of tuple (package, message) describing each
+        change, ``package`` being the `Package` object changed and
+        ``message`` the fedmsg message that ``log`` would have sent for
+        the change.
+    :arg summary_topic: the fedmsg topic of the summary message.
+    :arg summary: the fedmsg message summarizing all the changes.
+    :returns: the list of the descriptions of each change logged.
+
+    """
+
+    # To avoid a circular import.
+    import pkgdb2.lib.model as model
+    from pkgdb2.lib.notifications import fedmsg_publish, email_publish
+
+    if not entries:
+        return []
+
+    outbox = pkgdb2.APP.config.get('PKGDB2_NOTIFICATION_OUTBOX', False)
+    notifications = []
+
+    if pkgdb2.APP.config.get('PKGDB2_FEDMSG_NOTIFICATION', True):
+        if outbox:
+            notifications.append(dict(
+                kind='fedmsg', user=summary['agent'], topic=summary_topic,
+                message=summary))
+        else:
+            fedmsg_publish(summary_topic, summary)
+
+    messages = []
+    rows = []
+    per_package = {}
+    users = set()
+    for package, message in entries:
+        final_msg, subject = _format_log(topic, message)
+        messages.append(final_msg)
+        rows.append((message['agent'], package, final_msg))
+        users.update(_changed_users(message))
+        if package:
+            per_package.setdefault(package.name, (package, []))[1].append(
+                (final_msg, subject))
+
+    model.Log.insert_many(session, rows)
+    pkgdb2.lib.snapshots.mark_changed(
+        session, topic, packages=per_package.keys(), users=users)
+
+    if outbox and pkgdb2.APP.config.get('PKGDB2_EMAIL_NOTIFICATION', False):
+        for package, pkg_messages in per_package.values():
+            notifications.extend([
+                dict(
+                    kind='email', user=summary['agent'],
+                    package_name=package.name, subject=subject,
+                    content=final_msg)
+                for final_msg, subject in pkg_messages
+            ])
+    elif pkgdb2.APP.config.get(
+            'PKGDB2_EMAIL_NOTIFICATION', False):  # pragma: no cover
+        for package, pkg_messages in per_package.values():
+            body_email = '{0}\n\nTo make changes to this package see:\n' \
+                '{1}/package/{2}'.format(
+                    '\n'.join(final_msg for final_msg, _ in pkg_messages),
+                    pkgdb2.APP.config.get('SITE_URL'),
+                    package.name)
+            # As when dispatching the outbox, the emails about several
+            # changes get the default subject
+            subject = None
+            if len(pkg_messages) == 1:
+                subject = pkg_messages[0][1]
+            email_publish(
+                summary['agent'], package, body_email, subject=subject)
+
+    model.Notification.insert_many(session, notifications)
+
+    return messages
+
+
 def avatar_url(username, size=64, default='retro'):
     openid = "http://%s.id.fedoraproject.org/" % username
     return avatar_url_from_openid(openid, size, default)
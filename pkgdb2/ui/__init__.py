@@ -81,7 +81,7 @@ def inject_is_admin():
     """
     justlogedin = flask.session.get('_justloggedin', False)
     if justlogedin:  # pragma: no cover
-        flask.g.pending_acls = pkgdblib.get_pending_acl_user(
+        flask.g.pending_acls = pkgdblib.get_pending_acl_count(
             SESSION, flask.g.fas_user.username)
         flask.session['_justloggedin'] = None
 
@@ -114,33 +114,23 @@ def index():
 @UI.route('/stats/')
 def stats():
     ''' Display some statistics aboue the packages in the DB. '''
-    collections = pkgdblib.search_collection(SESSION, '*', 'Active')
-    collections.extend(pkgdblib.search_collection(
-        SESSION, '*', 'Under Development'))
-
-    collections = pkgdblib.count_collection(SESSION)
-    collections_fedora = pkgdblib.count_fedora_collection(SESSION)
+    stats = pkgdblib.get_stats(SESSION)
 
     cnt = 1
     collections_fedora_lbl = []
     collections_fedora_data = []
-    for item in collections_fedora:
+    for item in stats['fedora_collections']:
         collections_fedora_lbl.append([cnt, str(item[0])])
         collections_fedora_data.append([cnt, float(item[1])])
         cnt += 1
 
-    # Top maintainers
-    top_maintainers = pkgdblib.get_top_maintainers(SESSION)
-    # Top point of contact
-    top_poc = pkgdblib.get_top_poc(SESSION)
-
     return flask.render_template(
         'stats.html',
-        collections=collections,
+        collections=stats['collections'],
         collections_fedora_lbl=collections_fedora_lbl,
         collections_fedora_data=collections_fedora_data,
-        top_maintainers=top_maintainers,
-        top_poc=top_poc,
+        top_maintainers=stats['top_maintainers'],
+        top_poc=stats['top_poc'],
     )
 
 
@@ -263,6 +263,7 @@ def package_timeline(package):
     packager = flask.request.args.get('packager', None)
     limit = flask.request.args.get('limit', APP.config['ITEMS_PER_PAGE'])
     page = flask.request.args.get('page', 1)
+    after = flask.request.args.get('after', None)
 
     try:
         page = abs(int(page))
@@ -290,15 +291,21 @@ def package_timeline(package):
 
     logs = []
     cnt_logs = 0
+    more = False
     try:
+        # Past a cursor, retrieve one more log to know if others follow
         logs = pkgdblib.search_logs(
             SESSION,
             package=package or None,
             packager=packager or None,
             from_date=from_date,
             page=page,
-            limit=limit,
+            limit=limit + 1 if after and limit else limit,
+            after=after,
         )
+        if after and limit:
+            more = len(logs) > limit
+            logs = logs[:limit]
         cnt_logs = pkgdblib.search_logs(
             SESSION,
             package=package or None,
@@ -310,6 +317,12 @@ def package_timeline(package):
         flask.flash(err, 'errors')
 
     total_page = int(ceil(cnt_logs / float(limit)))
+    cursor = None
+    if not after:
+        more = limit and (max(page, 1) - 1) * limit + len(logs) \
+            < cnt_logs
+    if logs and more:
+        cursor = pkgdblib.get_cursor(logs[-1])
 
     return flask.render_template(
         'package_timeline.html',
@@ -317,6 +330,7 @@ def package_timeline(package):
         cnt_logs=cnt_logs,
         total_page=total_page,
         page=page,
+        cursor=cursor,
         package=package,
         from_date=from_date or '',
         packager=packager or '',
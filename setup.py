@@ -45,7 +45,10 @@ setup(
     include_package_data=True,
     install_requires=get_requirements(),
     scripts=[
+        'utility/pkgdb2_archive_logs.py',
         'utility/pkgdb2_branch.py',
+        'utility/pkgdb2_notifications.py',
+        'utility/pkgdb2_pending_actions.py',
         'utility/pkgdb-sync-bugzilla',
         'utility/update_package_info.py',
     ],
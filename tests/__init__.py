@@ -26,6 +26,7 @@ pkgdb tests.
 __requires__ = ['SQLAlchemy >= 0.7']
 import pkg_resources
 
+import threading
 import unittest
 import sys
 import os
@@ -88,6 +89,33 @@ class FakeFasGroupInvalid(object):
     group_type = 'tracking'
 
 
+class FakeFasMember(object):
+    """ Fake FAS group member used for the tests. """
+    def __init__(self, username, role_type='user'):
+        self.username = username
+        self.role_type = role_type
+
+
+class FakeFas(object):
+    """ Fake connection to FAS used for the tests, returning the provided
+    members without any network access.
+
+    Clearing the ``available`` event makes the requests block until it is
+    set again, like FAS would on a large group.
+    """
+    def __init__(self, members):
+        self.members = members
+        self.calls = 0
+        self.available = threading.Event()
+        self.available.set()
+
+    def group_members(self, group):
+        """ Return the members of the group. """
+        self.available.wait()
+        self.calls += 1
+        return list(self.members)
+
+
 @contextmanager
 def user_set(APP, user):
     """ Set the provided user as fas_user in the provided application."""
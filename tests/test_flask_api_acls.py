@@ -37,6 +37,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(
     os.path.abspath(__file__)), '..'))
 
 import pkgdb2
+import pkgdb2.lib as pkgdblib
 from pkgdb2 import APP
 from tests import (Modeltests, FakeFasUser, FakeFasUserAdmin,
                    create_package_acl, user_set)
@@ -222,6 +223,134 @@ class FlaskApiAclsTest(Modeltests):
             self.assertEqual(output.status_code, 200)
             self.assertEqual(json_out, exp)
 
+    @patch('pkgdb2.lib.notifications.fedmsg_publish')
+    @patch('pkgdb2.lib.utils.get_packagers')
+    @patch('pkgdb2.packager_login_required')
+    @patch('pkgdb2.lib.utils.get_bz_email_user')
+    def test_acl_update_bulk(
+            self, bz_mail_func, login_func, pkger_func, fedmsg_func):
+        """ Test the api_acl_update_bulk function.  """
+        login_func.return_value = None
+        bz_mail_func.return_value = 1
+        pkger_func.return_value = ['pingou', 'ralph', 'toshio']
+
+        user = FakeFasUser()
+        with user_set(APP, user):
+            output = self.app.post('/api/package/acl/bulk/')
+            self.assertEqual(output.status_code, 500)
+            data = json.loads(output.data)
+            self.assertEqual(data['output'], 'notok')
+            self.assertEqual(data['error'], 'Invalid input submitted')
+            self.assertEqual(
+                data['error_detail'],
+                ['pkgnames, branches, acls, users and acl_status must be '
+                 'lists of the same length'])
+
+        create_package_acl(self.session)
+
+        data = {
+            'pkgnames': ['guake', 'guake', 'guake'],
+            'branches': ['master', 'el4', 'master'],
+            'acls': ['commit', 'commit', 'nothing'],
+            'users': ['toshio', 'toshio', 'toshio'],
+            'acl_status': 'Approved',
+        }
+
+        with user_set(APP, user):
+            output = self.app.post('/api/package/acl/bulk/', data=data)
+            self.assertEqual(output.status_code, 500)
+            data_out = json.loads(output.data)
+            self.assertEqual(
+                data_out['error_detail'],
+                ['branches: "el4" is not a valid choice',
+                 'acls: "nothing" is not a valid choice'])
+
+        data = {
+            'pkgnames': ['guake', 'guake', 'guake', 'geany'],
+            'branches': ['master', 'f18', 'master', 'master'],
+            'acls': ['commit', 'commit', 'watchcommits', 'commit'],
+            'users': ['toshio', 'toshio', 'toshio', 'toshio'],
+            'acl_status': 'Awaiting Review',
+        }
+
+        # Ralph is not admin of geany, nothing is changed
+        user.username = 'ralph'
+        with user_set(APP, user):
+            output = self.app.post('/api/package/acl/bulk/', data=data)
+            self.assertEqual(output.status_code, 500)
+            self.assertEqual(
+                json.loads(output.data),
+                {
+                    "error": "You are not allowed to update ACLs of "
+                             "someone else.",
+                    "output": "notok"
+                }
+            )
+        self.assertEqual(fedmsg_func.call_count, 0)
+
+        user = FakeFasUserAdmin()
+        with user_set(APP, user):
+            output = self.app.post('/api/package/acl/bulk/', data=data)
+            self.assertEqual(output.status_code, 200)
+            self.assertEqual(
+                json.loads(output.data),
+                {
+                    "messages": [
+                        "user: admin set for toshio acl: commit of package: "
+                        "guake from:  to: Awaiting Review on branch: f18",
+                        "user: admin set for toshio acl: watchcommits of "
+                        "package: guake from:  to: Approved on branch: "
+                        "master",
+                        "user: admin set for toshio acl: commit of package: "
+                        "geany from:  to: Awaiting Review on branch: master",
+                    ],
+                    "output": "ok"
+                }
+            )
+
+        # A single summarized message is published
+        self.assertEqual(fedmsg_func.call_count, 1)
+        topic, message = fedmsg_func.call_args[0]
+        self.assertEqual(topic, 'acl.update.bulk')
+        self.assertEqual(message['agent'], 'admin')
+        self.assertEqual(len(message['changes']), 3)
+        self.assertEqual(
+            message['changes'][0],
+            {
+                'package_name': 'guake',
+                'branch': 'f18',
+                'username': 'toshio',
+                'acl': 'commit',
+                'previous_status': '',
+                'status': 'Awaiting Review',
+            }
+        )
+
+        acls = set()
+        for pkg in pkgdblib.get_acl_package(self.session, 'guake'):
+            for acl in pkg.acls:
+                if acl.fas_name == 'toshio':
+                    acls.add((pkg.collection.branchname, acl.acl,
+                              acl.status))
+        self.assertEqual(
+            acls,
+            set([
+                ('master', 'commit', 'Awaiting Review'),
+                ('master', 'watchcommits', 'Approved'),
+                ('f18', 'commit', 'Awaiting Review'),
+            ])
+        )
+
+        # Re-doing the same changes does nothing
+        with user_set(APP, user):
+            output = self.app.post('/api/package/acl/bulk/', data=data)
+            self.assertEqual(output.status_code, 200)
+            self.assertEqual(
+                json.loads(output.data),
+                {"messages": ["Nothing to update"], "output": "ok"}
+            )
+        self.assertEqual(fedmsg_func.call_count, 1)
+
     @patch('pkgdb2.lib.utils')
     @patch('pkgdb2.packager_login_required')
     def test_acl_reassign(self, login_func, mock_func):
@@ -97,6 +97,13 @@ class FlaskApiAdminTest(Modeltests):
         self.assertEqual(data['page'], 1)
         self.assertEqual(data['page_total'], 1)
         self.assertEqual(len(data['actions']), 1)
+        self.assertFalse('cursor' in data)
+
+        # No cursor when the last page is full
+        output = self.app.get('/api/admin/actions/?package=guake&limit=1')
+        data = json.loads(output.data)
+        self.assertEqual(len(data['actions']), 1)
+        self.assertFalse('cursor' in data)
         self.assertEqual(data['actions'][0]['action'], 'request.unretire')
         self.assertEqual(
             data['actions'][0]['collection']['branchname'], 'f18')
@@ -31,12 +31,18 @@ import unittest
 import sys
 import os
 
+import dogpile.cache
+from mock import patch
+
 sys.path.insert(0, os.path.join(os.path.dirname(
     os.path.abspath(__file__)), '..'))
 
 import pkgdb2
-from tests import (Modeltests, create_package_acl, create_package_acl2,
-                   create_package_critpath, create_retired_pkgs)
+import pkgdb2.lib.aclgraph
+from pkgdb2.lib import model
+from tests import (Modeltests, FakeFasUser, create_package_acl,
+                   create_package_acl2, create_package_critpath,
+                   create_retired_pkgs)
 
 
 class FlaskApiExtrasTest(Modeltests):
@@ -53,6 +59,7 @@ class FlaskApiExtrasTest(Modeltests):
 
         # Let's make sure the cache is empty for the tests
         pkgdb2.CACHE.invalidate()
+        pkgdb2.FAS_CACHE.invalidate()
 
     def test_api_bugzilla_empty(self):
         """ Test the api_bugzilla function with an empty database. """
@@ -501,6 +508,101 @@ avail | @provenpackager, | rpms/offlineimap/master"""
 
         self.assertEqual(data, expected)
 
+    @patch('pkgdb2.CACHE', dogpile.cache.make_region().configure(
+        'dogpile.cache.memory'))
+    def test_api_vcs_snapshot(self):
+        """ Test the snapshot and ETag support of the api_vcs function.
+        """
+        create_package_acl2(self.session)
+
+        output = self.app.get('/api/vcs/')
+        self.assertEqual(output.status_code, 200)
+        etag = output.headers['ETag']
+        self.assertTrue(etag)
+        data = output.data
+        self.assertTrue(
+            'avail | @provenpackager,pingou,spot | rpms/guake/master'
+            in data)
+
+        output = self.app.get(
+            '/api/vcs/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 304)
+        self.assertEqual(output.data, '')
+        self.assertEqual(output.headers['ETag'], etag)
+
+        # The JSON output has its own ETag
+        output = self.app.get('/api/vcs/?format=json')
+        self.assertEqual(output.status_code, 200)
+        self.assertNotEqual(output.headers['ETag'], etag)
+
+        # Changes made without logging them do not rebuild the snapshot
+        pkglist = pkgdb2.lib.model.PackageListing.by_collectionid(
+            self.session, 1)
+        for acl in pkglist[0].acls:
+            acl.status = 'Obsolete'
+        self.session.commit()
+
+        output = self.app.get('/api/vcs/')
+        self.assertEqual(output.status_code, 200)
+        self.assertEqual(output.headers['ETag'], etag)
+        self.assertEqual(output.data, data)
+
+        # Committing a logged change on the ACLs rebuilds it
+        pkgdb2.lib.snapshots.mark_changed(self.session, 'acl.update')
+        self.session.commit()
+
+        output = self.app.get(
+            '/api/vcs/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 200)
+        self.assertNotEqual(output.headers['ETag'], etag)
+        self.assertNotEqual(output.data, data)
+
+        # Unrelated changes do not
+        etag = output.headers['ETag']
+        pkgdb2.lib.snapshots.mark_changed(self.session, 'package.update')
+        self.session.commit()
+
+        output = self.app.get(
+            '/api/vcs/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 304)
+
+    @patch('pkgdb2.CACHE', dogpile.cache.make_region().configure(
+        'dogpile.cache.memory'))
+    def test_api_etag(self):
+        """ Test the ETags added to the GET requests of the API. """
+        create_package_acl(self.session)
+        create_package_critpath(self.session)
+
+        output = self.app.get('/api/critpath/?format=json')
+        self.assertEqual(output.status_code, 200)
+        etag = output.headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        output = self.app.get(
+            '/api/critpath/?format=json', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 304)
+        self.assertEqual(output.data, '')
+        self.assertEqual(output.headers['ETag'], etag)
+
+        # Each URL has its own ETag
+        output = self.app.get('/api/critpath/')
+        self.assertEqual(output.status_code, 200)
+        self.assertNotEqual(output.headers['ETag'], etag)
+
+        # The ETag is recomputed when a change is logged
+        pkgdb2.lib.snapshots.mark_changed(self.session, 'package.new')
+        self.session.commit()
+
+        output = self.app.get(
+            '/api/critpath/?format=json', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 200)
+        self.assertNotEqual(output.headers['ETag'], etag)
+
+        # The endpoints not answered from the database have none
+        output = self.app.get('/api/')
+        self.assertEqual(output.status_code, 200)
+        self.assertFalse('ETag' in output.headers)
+
     def test_api_critpath_empty(self):
         """ Test the api_critpath function with an empty database. """
 
@@ -666,6 +768,33 @@ guake:master has toshio waiting for commit"""
 
         self.assertEqual(data, expected)
 
+    def test_api_pendingacls_count(self):
+        """ Test the api_pendingacls_count function. """
+        output = self.app.get('/api/pendingacls/count/')
+        self.assertEqual(output.status_code, 500)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data, {'output': 'notok', 'error': 'Invalid request'})
+
+        create_package_acl(self.session)
+
+        output = self.app.get('/api/pendingacls/count/?username=pingou')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data,
+            {
+                'username': 'pingou',
+                'total_requests_pending': 2,
+                'output': 'ok',
+            }
+        )
+
+        output = self.app.get('/api/pendingacls/count?username=toshio')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(data['total_requests_pending'], 0)
+
     def test_api_groups_empty(self):
         """ Test the api_groups function with an empty database. """
 
@@ -730,6 +859,85 @@ kernel-maint"""
 
         self.assertEqual(data, expected)
 
+    @patch('pkgdb2.lib.utils.get_bz_email_user')
+    def test_api_acl_graph(self, mock_func):
+        """ Test the api_notify, api_critpath and api_groups functions
+        answered from the in-memory graph of the ACLs. """
+        mock_func.return_value = 1
+        create_package_acl(self.session)
+        create_package_critpath(self.session)
+
+        urls = [
+            '/api/notify/', '/api/notify/?format=json',
+            '/api/notify/?format=json&eol=True',
+            '/api/notify/?format=json&name=Fedora&version=18',
+            '/api/notify/all/?format=json',
+            '/api/critpath/', '/api/critpath/?format=json&branches=master',
+            '/api/groups/', '/api/groups/?format=json',
+        ]
+        expected = [self.app.get(url).data for url in urls]
+
+        pkgdb2.lib.aclgraph.reset()
+        self.addCleanup(pkgdb2.lib.aclgraph.reset)
+        config = {
+            'PKGDB2_ACL_GRAPH': True,
+            'PKGDB2_ACL_GRAPH_MAX_AGE': 3600,
+        }
+        with patch.dict(pkgdb2.APP.config, config):
+            for url, data in zip(urls, expected):
+                output = self.app.get(url)
+                self.assertEqual(output.status_code, 200)
+                self.assertEqual(output.data, data)
+
+            user = FakeFasUser()
+            user.username = 'blahblah'
+            pkgdb2.lib.set_acl_package(
+                self.session,
+                pkg_name='guake',
+                pkg_branch='master',
+                pkg_user='blahblah',
+                acl='watchbugzilla',
+                status='Approved',
+                user=user,
+            )
+            self.session.commit()
+
+            # The graph is used until it is too old
+            output = self.app.get('/api/notify/all/?format=json')
+            self.assertEqual(output.data, expected[4])
+
+            pkgdb2.APP.config['PKGDB2_ACL_GRAPH_MAX_AGE'] = 0
+            output = self.app.get('/api/notify/all/?format=json')
+            data = json.loads(output.data)
+            self.assertEqual(
+                data['packages']['guake'], ['blahblah', 'pingou'])
+
+    def test_acl_graph_changed_while_loading(self):
+        """ Test loading the ACL graph when listings are created between
+        the queries loading the listings and their ACLs. """
+        create_package_acl(self.session)
+
+        listings = list(model.PackageListing.get_acl_graph_data(
+            self.session))
+        acls = list(model.PackageListingAcl.get_acl_graph_data(
+            self.session))
+        expected = pkgdb2.lib.aclgraph.AclGraph(
+            model.Collection.all(self.session), listings, acls)
+
+        # ACLs of listings unknown to the graph, in the middle and at the
+        # end, and of a listing coming before the current one
+        acls.insert(3, (1000, 'ralph', 'commit', 'Approved'))
+        acls.insert(len(acls) // 2, (listings[0][0], 'ralph', 'commit',
+                                     'Approved'))
+        acls.append((1001, 'ralph', 'commit', 'Approved'))
+        graph = pkgdb2.lib.aclgraph.AclGraph(
+            model.Collection.all(self.session), listings, acls)
+
+        self.assertEqual(graph.acl_start, expected.acl_start)
+        self.assertEqual(
+            list(graph.iter_notify(acls='all')),
+            list(expected.iter_notify(acls='all')))
+
     def test_api_monitored_empty(self):
         """ Test the api_monitored function with an empty database. """
 
@@ -948,6 +1156,48 @@ kernel-maint"""
 
         self.assertEqual(data, expected)
 
+    @patch('pkgdb2.CACHE', dogpile.cache.make_region().configure(
+        'dogpile.cache.memory'))
+    def test_api_stats(self):
+        """ Test the api_stats function. """
+        output = self.app.get('/api/stats/')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data,
+            {
+                'collections': {},
+                'fedora_collections': [],
+                'top_maintainers': [],
+                'top_poc': [],
+                'output': 'ok',
+            }
+        )
+
+        # Changes made without logging them do not refresh the stats
+        create_package_acl(self.session)
+
+        output = self.app.get('/api/stats/')
+        self.assertEqual(json.loads(output.data)['collections'], {})
+
+        # Committing a logged change on the packages refreshes them
+        pkgdb2.lib.snapshots.mark_changed(self.session, 'package.new')
+        self.session.commit()
+
+        output = self.app.get('/api/stats/')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data['collections'], {'f17': 1, 'f18': 2, 'master': 3})
+        self.assertEqual(
+            data['fedora_collections'], [[17, 1], [18, 2], ['devel', 3]])
+        self.assertEqual(
+            sorted(data['top_maintainers']),
+            [['group::gtk-sig', 1], ['josef', 1], ['pingou', 1]])
+        self.assertEqual(data['top_poc'][0], ['pingou', 3])
+        self.assertEqual(
+            sorted(data['top_poc'][1:]), [['group::gtk-sig', 1], ['josef', 1]])
+
 
 if __name__ == '__main__':
     SUITE = unittest.TestLoader().loadTestsFromTestCase(FlaskApiExtrasTest)
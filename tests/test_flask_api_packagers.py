@@ -236,6 +236,37 @@ class FlaskApiPackagersTest(Modeltests):
         self.assertEqual(
             output['acls'][1]['packagelist']['collection']['branchname'],
             'master')
+        self.assertFalse('cursor' in output)
+
+        # Pages and cursors
+        output = self.app.get(
+            '/api/packager/acl/?packagername=pingou&acls=commit&poc=False'
+            '&limit=3')
+        output = json.loads(output.data)
+        self.assertEqual(len(output['acls']), 3)
+        self.assertFalse('cursor' in output)
+
+        output = self.app.get(
+            '/api/packager/acl/?packagername=pingou&acls=commit&poc=False'
+            '&limit=2&page=2')
+        output = json.loads(output.data)
+        self.assertEqual(len(output['acls']), 1)
+        self.assertFalse('cursor' in output)
+
+        output = self.app.get(
+            '/api/packager/acl/?packagername=pingou&acls=commit&poc=False'
+            '&limit=2')
+        output = json.loads(output.data)
+        self.assertEqual(len(output['acls']), 2)
+        self.assertEqual(
+            output['acls'][1]['packagelist']['package']['name'], 'fedocal')
+
+        output = self.app.get(
+            '/api/packager/acl/?packagername=pingou&acls=commit&poc=False'
+            '&limit=2&after=%s' % output['cursor'])
+        output = json.loads(output.data)
+        self.assertEqual(len(output['acls']), 1)
+        self.assertFalse('cursor' in output)
 
     def test_packager_list(self):
         """ Test the api_packager_list function.  """
@@ -273,6 +304,34 @@ class FlaskApiPackagersTest(Modeltests):
         self.assertEqual(len(output['packagers']), 1)
         self.assertEqual(output['packagers'][0], 'pingou')
 
+        output = self.app.get('/api/packagers/?limit=2')
+        self.assertEqual(output.status_code, 200)
+        output = json.loads(output.data)
+        self.assertEqual(
+            output['packagers'], ['group::gtk-sig', 'josef'])
+
+        output = self.app.get(
+            '/api/packagers/?limit=2&after=%s' % output['cursor'])
+        self.assertEqual(output.status_code, 200)
+        output = json.loads(output.data)
+        self.assertEqual(output['packagers'], ['pingou'])
+        self.assertFalse('cursor' in output)
+
+        # No cursor when the last page is full
+        output = self.app.get('/api/packagers/?limit=3')
+        self.assertEqual(output.status_code, 200)
+        output = json.loads(output.data)
+        self.assertEqual(len(output['packagers']), 3)
+        self.assertFalse('cursor' in output)
+
+        output = self.app.get('/api/packagers/?limit=1')
+        output = json.loads(output.data)
+        output = self.app.get(
+            '/api/packagers/?limit=2&after=%s' % output['cursor'])
+        output = json.loads(output.data)
+        self.assertEqual(output['packagers'], ['josef', 'pingou'])
+        self.assertFalse('cursor' in output)
+
     def test_packager_stats(self):
         """ Test the api_packager_stats function.  """
 
@@ -26,11 +26,14 @@ pkgdb tests for the Flask API regarding collections.
 __requires__ = ['SQLAlchemy >= 0.8']
 import pkg_resources
 
+import base64
 import json
 import unittest
 import sys
 import os
 
+import dogpile.cache
+import sqlalchemy as sa
 from mock import patch
 
 sys.path.insert(0, os.path.join(os.path.dirname(
@@ -1089,6 +1092,183 @@ class FlaskApiPackagesTest(Modeltests):
             }
         )
 
+    def test_api_search(self):
+        """ Test the api_search function.  """
+
+        output = self.app.get('/api/search/')
+        self.assertEqual(output.status_code, 500)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data,
+            {
+                "error": "No term provided",
+                "output": "notok",
+            }
+        )
+
+        create_package_acl(self.session)
+
+        output = self.app.get('/api/search/?term=gnome')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data,
+            {
+                "output": "ok",
+                "term": "gnome",
+                "packages": [
+                    {
+                        "name": "guake",
+                        "summary": "Top down terminal for GNOME",
+                        "status": "Approved",
+                        "score": 1.0,
+                    },
+                    {
+                        "name": "geany",
+                        "summary": "A fast and lightweight IDE using GTK2",
+                        "status": "Approved",
+                        "score": 0.5,
+                    },
+                ],
+            }
+        )
+
+        output = self.app.get('/api/search?term=gnome&limit=1')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(
+            [pkg['name'] for pkg in data['packages']], ['guake'])
+
+        output = self.app.get('/api/search/?term=xyz')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(data['packages'], [])
+
+    @patch('pkgdb2.CACHE', dogpile.cache.make_region().configure(
+        'dogpile.cache.memory'))
+    def test_api_package_info_etag(self):
+        """ Test the ETag of the api_package_info function, which only
+        depends on the package and the collections.  """
+        create_package_acl(self.session)
+
+        output = self.app.get('/api/package/guake/')
+        self.assertEqual(output.status_code, 200)
+        etag = output.headers['ETag']
+
+        output = self.app.get(
+            '/api/package/guake/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 304)
+
+        # Changing another package does not change the ETag
+        pkgdb2.lib.snapshots.mark_changed(
+            self.session, 'acl.update', packages=['geany'])
+        self.session.commit()
+
+        output = self.app.get(
+            '/api/package/guake/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 304)
+
+        # Changing the package or the collections does
+        pkgdb2.lib.snapshots.mark_changed(
+            self.session, 'acl.update', packages=['guake'])
+        self.session.commit()
+
+        output = self.app.get(
+            '/api/package/guake/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 200)
+        etag = output.headers['ETag']
+
+        pkgdb2.lib.snapshots.mark_changed(self.session, 'collection.update')
+        self.session.commit()
+
+        output = self.app.get(
+            '/api/package/guake/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 200)
+        etag = output.headers['ETag']
+
+        # So does changing its critpath status
+        cnt_logs = pkgdblib.search_logs(
+            self.session, package='guake', count=True)
+        pkgdblib.set_critpath_packages(
+            self.session, 'guake', 'master', critpath=True,
+            user=FakeFasUserAdmin())
+        self.session.commit()
+        # Without being logged in the timeline of the package
+        self.assertEqual(
+            pkgdblib.search_logs(self.session, package='guake', count=True),
+            cnt_logs)
+
+        output = self.app.get(
+            '/api/package/guake/', headers={'If-None-Match': etag})
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(
+            [pkg['critpath'] for pkg in data['packages']
+             if pkg['collection']['branchname'] == 'master'],
+            [True])
+
+    def test_api_package_batch(self):
+        """ Test the api_package_batch function.  """
+
+        output = self.app.get('/api/packages/batch/')
+        self.assertEqual(output.status_code, 500)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data, {"error": "No package provided", "output": "notok"})
+
+        output = self.app.get(
+            '/api/packages/batch/?%s' % '&'.join(
+                'pkgnames=pkg%s' % cnt for cnt in range(501)))
+        self.assertEqual(output.status_code, 500)
+        data = json.loads(output.data)
+        self.assertEqual(
+            data['error'], 'Too many packages requested, the maximum is 500')
+
+        create_package_acl(self.session)
+        self.session.commit()
+
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+        self.session.expunge_all()
+        output = self.app.get(
+            '/api/packages/batch/?pkgnames=guake&pkgnames=geany'
+            '&pkgnames=foo')
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+        self.assertEqual(output.status_code, 200)
+        self.assertEqual(len(queries), 2)
+
+        data = json.loads(output.data)
+        self.assertEqual(data['output'], 'ok')
+        self.assertEqual(data['not_found'], ['foo'])
+        self.assertEqual(sorted(data['packages']), ['geany', 'guake'])
+        # Same information as returned by api_package_info
+        for pkg_name in ['geany', 'guake']:
+            output = self.app.get('/api/package/%s/' % pkg_name)
+            self.assertEqual(
+                data['packages'][pkg_name],
+                json.loads(output.data)['packages'])
+
+        output = self.app.post(
+            '/api/packages/batch/',
+            data={
+                'pkgnames': ['guake', 'geany', 'offlineimap'],
+                'branches': ['f18'],
+                'acls': False,
+            })
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(data['not_found'], ['offlineimap'])
+        self.assertEqual(
+            [pkg['collection']['branchname']
+             for pkg in data['packages']['guake']],
+            ['f18'])
+        self.assertFalse('acls' in data['packages']['guake'][0])
+
     def test_api_package_list(self):
         """ Test the api_package_list function.  """
 
@@ -1235,6 +1415,123 @@ class FlaskApiPackagesTest(Modeltests):
         self.assertEqual(data['output'], 'notok')
         self.assertEqual(data['packages'], [])
 
+        # Packages present on several of the branches are counted once
+        output = self.app.get(
+            '/api/packages/g*/?branches=master&branches=f18&count=True')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(data['packages'], 2)
+
+        output = self.app.get(
+            '/api/packages/*/?branches=master&branches=f18'
+            '&status=Approved&status=Orphaned&limit=1&page=2')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(len(data['packages']), 1)
+        self.assertEqual(data['packages'][0]['name'], 'geany')
+        self.assertEqual(data['page'], 2)
+        self.assertEqual(data['page_total'], 5)
+
+        # Next page using the cursor
+        output = self.app.get(
+            '/api/packages/*/?branches=master&branches=f18'
+            '&status=Approved&status=Orphaned&limit=1&page=3&after=%s'
+            % data['cursor'])
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(len(data['packages']), 1)
+        self.assertEqual(data['packages'][0]['name'], 'guake')
+        self.assertEqual(data['page'], 3)
+        self.assertEqual(data['page_total'], 5)
+
+        # No cursor on the last page
+        output = self.app.get(
+            '/api/packages/*/?branches=master&branches=f18'
+            '&status=Approved&status=Orphaned&limit=1&page=5')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(len(data['packages']), 1)
+        self.assertEqual(data['page'], 5)
+        self.assertEqual(data['page_total'], 5)
+        self.assertFalse('cursor' in data)
+
+        output = self.app.get(
+            '/api/packages/*/?branches=master&branches=f18'
+            '&status=Approved&status=Orphaned&limit=2&page=2')
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(len(data['packages']), 2)
+        self.assertTrue('cursor' in data)
+
+        output = self.app.get(
+            '/api/packages/*/?branches=master&branches=f18'
+            '&status=Approved&status=Orphaned&limit=2&page=3&after=%s'
+            % data['cursor'])
+        self.assertEqual(output.status_code, 200)
+        data = json.loads(output.data)
+        self.assertEqual(len(data['packages']), 1)
+        self.assertEqual(data['page_total'], 3)
+        self.assertFalse('cursor' in data)
+
+        output = self.app.get('/api/packages/*/?after=foo')
+        self.assertEqual(output.status_code, 500)
+        data = json.loads(output.data)
+        self.assertEqual(data['error'], 'Invalid cursor provided')
+
+        # Only plain values are accepted in the cursor
+        for values in ([[1, 2]], [{'foo': 'bar'}], [{'date': 1}], [None]):
+            output = self.app.get(
+                '/api/packages/*/?after=%s'
+                % base64.urlsafe_b64encode(json.dumps(values)))
+            self.assertEqual(output.status_code, 500)
+            data = json.loads(output.data)
+            self.assertEqual(data['error'], 'Invalid cursor provided')
+
+        # Past the last page
+        output = self.app.get('/api/packages/g*/?limit=1&page=3')
+        self.assertEqual(output.status_code, 404)
+        data = json.loads(output.data)
+        self.assertEqual(data['packages'], [])
+
+    def test_api_package_list_acls_queries(self):
+        """ Test that the number of queries run by api_package_list with
+        the ACLs does not depend on the number of packages returned. """
+        create_package_acl(self.session)
+        self.session.commit()
+
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+
+        counts = []
+        for limit in [1, 4]:
+            self.session.expunge_all()
+            del queries[:]
+            output = self.app.get(
+                '/api/packages/*/?acls=true&limit=%s' % limit)
+            self.assertEqual(output.status_code, 200)
+            data = json.loads(output.data)
+            self.assertEqual(len(data['packages']), limit)
+            counts.append(len(queries))
+
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertTrue(counts[1] <= 4)
+
+        guake = [pkg for pkg in data['packages'] if pkg['name'] == 'guake']
+        acls = guake[0]['acls']
+        self.assertEqual(
+            sorted(acl['collection']['branchname'] for acl in acls),
+            ['f18', 'master'])
+        self.assertEqual(
+            sorted(acl['fas_name'] for acl in acls[0]['acls']),
+            ['pingou', 'pingou'])
+
     @patch('pkgdb2.lib.utils')
     @patch('pkgdb2.is_admin')
     def test_api_package_edit(self, login_func, mock_func):
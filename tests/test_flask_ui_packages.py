@@ -829,6 +829,7 @@ class FlaskUiPackagesTest(Modeltests):
                 },
             )
         )
+        self.session.commit()
 
         user = FakeFasUser()
         with user_set(pkgdb2.APP, user):
@@ -847,6 +848,15 @@ class FlaskUiPackagesTest(Modeltests):
                 'guake from: Obsolete to: Approved on branch: master'
                 in output.data)
 
+            # The next page uses a cursor, as long as there is one
+            output = self.app.get('/package/guake/timeline?limit=1')
+            self.assertEqual(output.status_code, 200)
+            self.assertTrue('after=' in output.data)
+
+            output = self.app.get('/package/guake/timeline?limit=2')
+            self.assertEqual(output.status_code, 200)
+            self.assertFalse('after=' in output.data)
+
     @patch('pkgdb2.lib.utils')
     @patch('pkgdb2.packager_login_required')
     def test_package_request_branch(self, login_func, mock_func):
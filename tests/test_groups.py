@@ -63,6 +63,7 @@ class PkgdbGrouptests(Modeltests):
 
         # Let's make sure the cache is empty for the tests
         pkgdb2.CACHE.invalidate()
+        pkgdb2.FAS_CACHE.invalidate()
 
     def set_group_acls(self):
         ''' Create some Group ACLs. '''
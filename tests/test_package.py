@@ -30,6 +30,10 @@ import unittest
 import sys
 import os
 
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.orm.exc import NoResultFound
+
 sys.path.insert(0, os.path.join(os.path.dirname(
     os.path.abspath(__file__)), '..'))
 
@@ -91,6 +95,38 @@ class Packagetests(Modeltests):
                  'koschei_monitor']))
         self.assertNotEqual(package['acls'], [])
 
+    def test_to_json_cache(self):
+        """ Test the to_json function of Package sharing the packages and
+        collections already serialized. """
+        create_package_acl(self.session)
+
+        package = model.Package.by_name(self.session, 'guake')
+        output = package.to_json()
+        self.assertEqual(len(output['acls']), 2)
+        # Every listing has its ACLs
+        for listing in output['acls']:
+            self.assertNotEqual(listing['acls'], [])
+            self.assertEqual(listing['package']['name'], 'guake')
+            self.assertEqual(listing['package']['acls'], [])
+        # The package is serialized once for all its listings
+        self.assertTrue(
+            output['acls'][0]['package'] is output['acls'][1]['package'])
+
+        cache = {}
+        output2 = [
+            pkg.to_json(cache=cache)
+            for pkg in model.Package.all(self.session)
+        ]
+        self.assertEqual(
+            [pkg for pkg in output2 if pkg['name'] == 'guake'], [output])
+        collections = {}
+        for pkg in output2:
+            for listing in pkg['acls']:
+                branch = listing['collection']['branchname']
+                collections.setdefault(branch, listing['collection'])
+                self.assertTrue(
+                    listing['collection'] is collections[branch])
+
     def test_search(self):
         """ Test the search function of Package. """
         create_package_acl(self.session)
@@ -130,6 +166,49 @@ class Packagetests(Modeltests):
         self.assertEqual(len(packages), 1)
         self.assertEqual(packages[0].name, 'geany')
 
+        packages, total = model.Package.search(
+            session=self.session,
+            pkg_name='%',
+            pkg_branch=['master', 'f18'],
+            pkg_status=['Approved', 'Orphaned'],
+            offset=1,
+            limit=2,
+            with_count=True)
+        self.assertEqual([pkg.name for pkg in packages], ['geany', 'guake'])
+        self.assertEqual(total, 4)
+
+        packages, total = model.Package.search(
+            session=self.session,
+            pkg_name='g%',
+            offset=5,
+            limit=2,
+            with_count=True)
+        self.assertEqual(packages, [])
+        self.assertEqual(total, 2)
+
+        packages, total = model.Package.search(
+            session=self.session,
+            pkg_name='%',
+            limit=2,
+            after=('geany',),
+            with_count=True)
+        self.assertEqual(
+            [pkg.name for pkg in packages], ['guake', 'offlineimap'])
+        self.assertEqual(total, 2)
+
+    def test_search_text_postgresql(self):
+        """ Test the query of the search_text method of Package, as run by
+        psycopg2. """
+        query = model.Package._search_text_query(
+            self.session, 'Guake', limit=5)
+        compiled = query.statement.compile(dialect=psycopg2.dialect())
+
+        # psycopg2 substitutes the parameters using the % operator
+        statement = compiled.string % dict(
+            (key, "'%s'" % value) for key, value in compiled.params.items())
+        self.assertIn(
+            'WHERE (lower("Package".name) % \'guake\') OR', statement)
+
     def test_get_package_of_user(self):
         """ Test the get_package_of_user function of Package. """
         create_package_acl(self.session)
@@ -191,6 +270,80 @@ class Packagetests(Modeltests):
             session=self.session, pkg_name='fedocal', limit=1)
         self.assertTrue(packages[0].retired_everywhere)
 
+    def test_by_name_cached(self):
+        """ Test that the by_name lookups are cached in the session. """
+        create_package_acl(self.session)
+
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+
+        package = model.Package.by_name(self.session, 'guake')
+        collection = model.Collection.by_name(self.session, 'f18')
+        # The listings of the package are loaded with their ACLs
+        listing = model.PackageListing.by_pkgid_collectionid(
+            self.session, package.id, collection.id)
+        self.assertEqual(len(queries), 4)
+
+        self.assertTrue(
+            model.Package.by_name(self.session, 'guake') is package)
+        self.assertTrue(
+            model.Collection.by_name(self.session, 'f18') is collection)
+        self.assertTrue(model.PackageListing.by_pkgid_collectionid(
+            self.session, package.id, collection.id) is listing)
+        # As are the collections of these listings and their ACLs
+        master = model.Collection.by_name(self.session, 'master')
+        self.assertTrue(model.PackageListing.by_pkgid_collectionid(
+            self.session, package.id, master.id) is not None)
+        acl = model.PackageListingAcl.get(
+            self.session, 'pingou', listing.id, 'commit')
+        self.assertEqual(acl.status, 'Approved')
+        self.assertEqual(model.PackageListingAcl.get(
+            self.session, 'foo', listing.id, 'commit'), None)
+        self.assertEqual(len(queries), 4)
+
+        # The ACLs created are added to the cache
+        new_acl = model.PackageListingAcl.create(
+            self.session, 'toshio', listing.id, 'watchcommits', 'Approved')
+        del queries[:]
+        self.assertTrue(model.PackageListingAcl.get(
+            self.session, 'toshio', listing.id, 'watchcommits') is new_acl)
+        self.assertEqual(queries, [])
+
+        # Lookups that fail are not cached
+        self.assertRaises(
+            NoResultFound, model.Package.by_name, self.session, 'foo')
+        self.assertRaises(
+            NoResultFound, model.Package.by_name, self.session, 'foo')
+        self.assertEqual(len(queries), 2)
+
+        # Flushing other changes keeps the cache
+        package.summary = 'Drop-down terminal'
+        self.session.flush()
+        model.Package.by_name(self.session, 'guake')
+        self.assertEqual(len(queries), 3)
+
+        # Renaming a package invalidates it
+        package.name = 'guake2'
+        self.session.flush()
+        self.assertRaises(
+            NoResultFound, model.Package.by_name, self.session, 'guake')
+        self.assertEqual(
+            model.Package.by_name(self.session, 'guake2').id, package.id)
+
+        # The cache does not survive the transaction
+        self.session.rollback()
+        del queries[:]
+        package = model.Package.by_name(self.session, 'guake')
+        self.assertEqual(package.summary, 'Top down terminal for GNOME')
+        self.assertEqual(len(queries), 1)
+
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+
 
 if __name__ == '__main__':
     SUITE = unittest.TestLoader().loadTestsFromTestCase(Packagetests)
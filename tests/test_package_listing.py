@@ -30,6 +30,8 @@ import unittest
 import sys
 import os
 
+import sqlalchemy as sa
+
 sys.path.insert(0, os.path.join(os.path.dirname(
     os.path.abspath(__file__)), '..'))
 
@@ -233,6 +235,68 @@ class PackageListingtests(Modeltests):
         self.assertEqual(pkg_list[2].collection.branchname, 'f19')
         self.assertEqual(len(pkg_list[2].acls), 5)
 
+    def test_bulk_branch(self):
+        """ Test the get_packages_to_branch and bulk_branch methods of
+        PackageListing. """
+        create_package_acl(self.session)
+
+        master = model.Collection.by_name(self.session, 'master')
+        new_collection = model.Collection(
+            name='Fedora',
+            version='19',
+            status='Active',
+            owner='toshio',
+            branchname='f19',
+            dist_tag='.fc19',
+        )
+        self.session.add(new_collection)
+        self.session.commit()
+
+        packages = model.PackageListing.get_packages_to_branch(
+            self.session, master, new_collection)
+        self.assertEqual(
+            [pkg[1] for pkg in packages], ['geany', 'guake', 'offlineimap'])
+
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+        cnt = model.PackageListing.bulk_branch(
+            self.session, master, new_collection,
+            [pkg[0] for pkg in packages])
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+        self.assertEqual(cnt, 3)
+        self.assertEqual(len(queries), 2)
+        self.session.commit()
+
+        for pkgname in ['geany', 'guake', 'offlineimap']:
+            pkg = model.Package.by_name(self.session, pkgname)
+            pkg_from = model.PackageListing.by_pkgid_collectionid(
+                self.session, pkg.id, master.id)
+            pkg_to = model.PackageListing.by_pkgid_collectionid(
+                self.session, pkg.id, new_collection.id)
+            self.assertEqual(
+                pkg_to.point_of_contact, pkg_from.point_of_contact)
+            self.assertEqual(pkg_to.status, pkg_from.status)
+            self.assertEqual(
+                sorted((acl.fas_name, acl.acl, acl.status)
+                       for acl in pkg_to.acls),
+                sorted((acl.fas_name, acl.acl, acl.status)
+                       for acl in pkg_from.acls))
+
+        # Branching again does nothing
+        self.assertEqual(
+            model.PackageListing.get_packages_to_branch(
+                self.session, master, new_collection),
+            [])
+        cnt = model.PackageListing.bulk_branch(
+            self.session, master, new_collection,
+            [pkg[0] for pkg in packages])
+        self.assertEqual(cnt, 0)
+
     def test_get_critpath_packages(self):
         """ Test the get_critpath_packages method of PackageListing. """
         create_package_acl(self.session)
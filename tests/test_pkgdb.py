@@ -26,15 +26,23 @@ pkgdb tests for the Collection object.
 __requires__ = ['SQLAlchemy >= 0.8']
 import pkg_resources
 
+import time
 import unittest
 import sys
 import os
 
+import dogpile.cache
+from mock import patch
+
 sys.path.insert(0, os.path.join(os.path.dirname(
     os.path.abspath(__file__)), '..'))
 
 import pkgdb2
-from tests import Modeltests, FakeFasUser, FakeFasUserAdmin
+import pkgdb2.lib.notifications
+import pkgdb2.lib.utils
+from pkgdb2.lib import model
+from tests import (Modeltests, FakeFasUser, FakeFasUserAdmin, FakeFas,
+                   FakeFasMember, create_package_acl)
 
 
 class Pkgdbtests(Modeltests):
@@ -66,6 +74,192 @@ class Pkgdbtests(Modeltests):
         # Reset the ADMIN_GROUP for the other tests
         pkgdb2.APP.config['ADMIN_GROUP'] = ('sysadmin-main', 'sysadmin-cvs')
 
+    def test_refresh_in_background(self):
+        """ Test the refresh_in_background function of pkgdb2. """
+        fas = FakeFas([FakeFasMember('pingou')])
+        region = dogpile.cache.make_region(
+            async_creation_runner=pkgdb2.refresh_in_background,
+        ).configure('dogpile.cache.memory')
+
+        @region.cache_on_arguments(expiration_time=3600)
+        def get_members():
+            ''' Return the name of the members. '''
+            return [user.username for user in fas.group_members('packager')]
+
+        self.assertEqual(get_members(), ['pingou'])
+        self.assertEqual(fas.calls, 1)
+
+        # Expire the value while FAS is slow to answer
+        fas.members.append(FakeFasMember('ralph'))
+        fas.available.clear()
+        region.invalidate(hard=False)
+
+        # The expired value is returned without waiting for FAS
+        self.assertEqual(get_members(), ['pingou'])
+        self.assertEqual(get_members(), ['pingou'])
+
+        # And replaced once FAS answered
+        fas.available.set()
+        for _ in range(100):
+            if get_members() != ['pingou']:
+                break
+            time.sleep(0.01)
+        self.assertEqual(get_members(), ['pingou', 'ralph'])
+        self.assertEqual(fas.calls, 2)
+
+        # Only the FAS lookups are refreshed in the background
+        self.assertEqual(
+            pkgdb2.FAS_CACHE.async_creation_runner,
+            pkgdb2.refresh_in_background)
+        self.assertEqual(pkgdb2.CACHE.async_creation_runner, None)
+
+    def test_get_packagers(self):
+        """ Test the get_packagers function of pkgdb2.lib.utils. """
+        fas = FakeFas([
+            FakeFasMember('pingou', 'administrator'),
+            FakeFasMember('ralph', 'sponsor'),
+            FakeFasMember('toshio'),
+            FakeFasMember('kevin', 'pending'),
+        ])
+        former_fas = pkgdb2.lib.utils._FAS
+        pkgdb2.lib.utils._FAS = fas
+        try:
+            pkgdb2.lib.utils.get_packagers.invalidate()
+            packagers = pkgdb2.lib.utils.get_packagers()
+        finally:
+            pkgdb2.lib.utils._FAS = former_fas
+            pkgdb2.lib.utils.get_packagers.invalidate()
+
+        self.assertEqual(
+            packagers, frozenset(['pingou', 'ralph', 'toshio']))
+
+    @patch('pkgdb2.lib.notifications._fedmsg_send')
+    def test_notification_outbox(self, fedmsg_send):
+        """ Test storing the notifications in the outbox and sending them
+        with pkgdb2.lib.notifications.dispatch. """
+        create_package_acl(self.session)
+        package = model.Package.by_name(self.session, 'guake')
+
+        class FakeSMTP(object):
+            ''' Record the emails sent. '''
+            def __init__(self):
+                self.emails = []
+
+            def sendmail(self, from_email, to_email, content):
+                ''' Record the email sent. '''
+                self.emails.append((from_email, to_email, content))
+
+        def log(user):
+            ''' Log a change of point of contact made by user. '''
+            pkgdb2.lib.utils.log(
+                self.session, package, 'owner.update', dict(
+                    agent=user,
+                    username=user,
+                    previous_owner='pingou',
+                    package_name='guake',
+                    package_listing=dict(
+                        collection=dict(branchname='master')),
+                ))
+
+        pkgdb2.APP.config['PKGDB2_NOTIFICATION_OUTBOX'] = True
+        pkgdb2.APP.config['PKGDB2_EMAIL_NOTIFICATION'] = True
+        try:
+            log('pingou')
+            self.assertEqual(
+                [(notif.kind, notif.user) for notif in
+                 model.Notification.pending(self.session, 5)],
+                [('fedmsg', 'pingou'), ('email', 'pingou')])
+            # The notifications are rolled back with the changes
+            self.session.rollback()
+            self.assertEqual(model.Notification.pending(self.session, 5), [])
+
+            package = model.Package.by_name(self.session, 'guake')
+            log('pingou')
+            log('toshio')
+            self.session.commit()
+            self.assertFalse(fedmsg_send.called)
+
+            smtp = FakeSMTP()
+            sent = pkgdb2.lib.notifications.dispatch(
+                self.session, smtp=smtp)
+            self.assertEqual(sent, 4)
+            self.assertEqual(fedmsg_send.call_count, 2)
+            self.assertEqual(
+                fedmsg_send.call_args[0][0], 'owner.update')
+            self.assertEqual(
+                fedmsg_send.call_args[0][1]['agent'], 'toshio')
+            # The emails about guake are sent together
+            self.assertEqual(len(smtp.emails), 1)
+            self.assertEqual(
+                smtp.emails[0][1], ['guake-owner@fedoraproject.org'])
+            self.assertTrue(
+                'Subject: [PkgDB] pingou, toshio updated guake'
+                in smtp.emails[0][2])
+            self.assertTrue(
+                'user: toshio changed point of contact of package: guake'
+                in smtp.emails[0][2])
+            self.assertEqual(model.Notification.pending(self.session, 5), [])
+
+            # Failed notifications are tried again
+            fedmsg_send.side_effect = IOError('fedmsg is down')
+            package = model.Package.by_name(self.session, 'guake')
+            log('pingou')
+            self.session.commit()
+            sent = pkgdb2.lib.notifications.dispatch(
+                self.session, smtp=smtp)
+            self.assertEqual(sent, 1)
+            self.assertEqual(len(smtp.emails), 2)
+            notifications = model.Notification.pending(self.session, 5)
+            self.assertEqual(len(notifications), 1)
+            self.assertEqual(notifications[0].kind, 'fedmsg')
+            self.assertEqual(notifications[0].attempts, 1)
+            self.assertEqual(notifications[0].last_error, 'fedmsg is down')
+
+            sent = pkgdb2.lib.notifications.dispatch(
+                self.session, smtp=smtp, max_attempts=2)
+            self.assertEqual(sent, 0)
+            self.assertEqual(
+                model.Notification.pending(self.session, 2), [])
+        finally:
+            pkgdb2.APP.config['PKGDB2_NOTIFICATION_OUTBOX'] = False
+            pkgdb2.APP.config['PKGDB2_EMAIL_NOTIFICATION'] = False
+
+    def test_log_bulk_outbox(self):
+        """ Test the notifications stored by log_bulk in the outbox. """
+        create_package_acl(self.session)
+        package = model.Package.by_name(self.session, 'guake')
+
+        entries = [
+            (package, dict(
+                agent='pingou',
+                username=user,
+                acl='commit',
+                previous_status='Awaiting Review',
+                status='Approved',
+                package_name='guake',
+                package_listing=dict(collection=dict(branchname='master')),
+            ))
+            for user in ['ralph', 'toshio']
+        ]
+
+        pkgdb2.APP.config['PKGDB2_NOTIFICATION_OUTBOX'] = True
+        pkgdb2.APP.config['PKGDB2_EMAIL_NOTIFICATION'] = True
+        try:
+            pkgdb2.lib.utils.log_bulk(
+                self.session, 'acl.update', entries, 'acl.update.bulk',
+                dict(agent='pingou', changes=[]))
+            self.assertEqual(
+                [(notif.kind, notif.subject) for notif in
+                 model.Notification.pending(self.session, 5)],
+                [
+                    ('fedmsg', None),
+                    ('email', 'pingou:guake commit  set to Approved'),
+                    ('email', 'pingou:guake commit  set to Approved'),
+                ])
+        finally:
+            pkgdb2.APP.config['PKGDB2_NOTIFICATION_OUTBOX'] = False
+            pkgdb2.APP.config['PKGDB2_EMAIL_NOTIFICATION'] = False
+
 
 if __name__ == '__main__':
     SUITE = unittest.TestLoader().loadTestsFromTestCase(Pkgdbtests)
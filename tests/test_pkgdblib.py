@@ -26,26 +26,32 @@ pkgdb tests for the Collection object.
 __requires__ = ['SQLAlchemy >= 0.8']
 import pkg_resources
 
+import itertools
 import mock
 import unittest
 import sys
 import os
 
-from datetime import date
+from datetime import date, datetime, timedelta
 
 from mock import patch
+import sqlalchemy as sa
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.exc import IntegrityError
 
 sys.path.insert(0, os.path.join(os.path.dirname(
     os.path.abspath(__file__)), '..'))
 
+import dogpile.cache
+
 import pkgdb2
 import pkgdb2.lib as pkgdblib
+import pkgdb2.lib.search
 from tests import (FakeFasUser, FakeFasUserAdmin, Modeltests,
                    FakeFasGroupValid, FakeFasGroupInvalid,
                    create_collection, create_package_acl,
-                   create_package_acl2, create_package_critpath)
+                   create_package_acl2, create_package_critpath,
+                   create_admin_actions)
 
 
 class PkgdbLibtests(Modeltests):
@@ -245,6 +251,30 @@ class PkgdbLibtests(Modeltests):
         pkg_acl = pkgdblib.get_acl_package(self.session, 'guake', 'unknown')
         self.assertEqual(pkg_acl, [])
 
+        # The branches and the EOL collections are filtered in the query
+        # loading the listings with their collection
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        self.session.expunge_all()
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+        pkg_acl = pkgdblib.get_acl_package(self.session, 'offlineimap')
+        self.assertEqual(
+            [pkg.collection.branchname for pkg in pkg_acl], ['master'])
+        pkg_acl = pkgdblib.get_acl_package(
+            self.session, 'offlineimap', eol=True)
+        self.assertEqual(
+            [pkg.collection.branchname for pkg in pkg_acl],
+            ['master', 'el4'])
+        pkg_acl = pkgdblib.get_acl_package(
+            self.session, 'offlineimap', ['el4'])
+        self.assertEqual(pkg_acl, [])
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+        self.assertEqual(len(queries), 4)
+
     @patch('pkgdb2.lib.utils.get_bz_email_user')
     def test_set_acl_package(self, mock_func):
         """ Test the set_acl_package function. """
@@ -463,6 +493,128 @@ class PkgdbLibtests(Modeltests):
         self.assertEqual(pkg_acl[0].package.name, 'guake')
         self.assertEqual(len(pkg_acl[0].acls), 7)
 
+    @patch('pkgdb2.lib.utils.get_packagers')
+    @patch('pkgdb2.lib.utils.get_bz_email_user')
+    def test_set_acl_package_lookups(self, mock_func, mock_packagers):
+        """ Test that setting several ACLs on several branches looks up
+        the package, collections, listings and ACLs only once. """
+        create_package_acl(self.session)
+        mock_func.return_value = 1
+        mock_packagers.return_value = ['ralph']
+
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the lookup queries run. '''
+            if statement.startswith('SELECT'):
+                queries.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+        branches = ['f17', 'f18', 'master', 'el6', 'el4']
+        acls_names = [
+            'commit', 'watchbugzilla', 'watchcommits', 'approveacls']
+        for branch, acl in itertools.product(branches, acls_names):
+            pkgdblib.set_acl_package(
+                self.session,
+                pkg_name='guake',
+                pkg_branch=branch,
+                pkg_user='ralph',
+                acl=acl,
+                status='Approved',
+                user=FakeFasUserAdmin(),
+            )
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+        self.session.commit()
+
+        # 1 package, the 3 collections the package is not in yet, 1 for
+        # all the listings and 1 for all their ACLs, plus the ACLs of each
+        # of the 5 listings serialized in the logs
+        self.assertEqual(len(queries), 11)
+
+        acls = self.session.query(
+            pkgdblib.model.PackageListingAcl
+        ).filter_by(fas_name='ralph', status='Approved').all()
+        self.assertEqual(
+            set([(acl.packagelist.collection.branchname, acl.acl)
+                 for acl in acls
+                 if acl.packagelist.package.name == 'guake']),
+            set(itertools.product(branches, acls_names)))
+
+    @patch('pkgdb2.lib.utils.get_packagers')
+    @patch('pkgdb2.lib.utils.get_bz_email_user')
+    def test_set_acl_packages(self, mock_func, mock_packagers):
+        """ Test the set_acl_packages function. """
+        create_package_acl(self.session)
+        mock_func.return_value = 1
+        mock_packagers.return_value = ['pingou', 'ralph', 'toshio']
+
+        self.assertEqual(
+            pkgdblib.set_acl_packages(self.session, [], FakeFasUserAdmin()),
+            [])
+
+        # Users not in the packager group cannot get commit
+        self.assertRaises(
+            pkgdblib.PkgdbException,
+            pkgdblib.set_acl_packages,
+            self.session,
+            [('guake', 'master', 'kevin', 'commit', 'Approved')],
+            FakeFasUserAdmin(),
+        )
+
+        # Unknown packages are refused
+        self.assertRaises(
+            pkgdblib.PkgdbException,
+            pkgdblib.set_acl_packages,
+            self.session,
+            [('guake', 'master', 'ralph', 'commit', 'Approved'),
+             ('foo', 'master', 'ralph', 'commit', 'Approved')],
+            FakeFasUserAdmin(),
+        )
+        self.session.rollback()
+        mock_packagers.reset_mock()
+        mock_func.reset_mock()
+
+        acls = [
+            ('guake', branch, username, acl, 'Approved')
+            for branch in ['f18', 'master']
+            for username in ['ralph', 'kevin']
+            for acl in ['watchbugzilla', 'watchcommits']
+        ]
+        msgs = pkgdblib.set_acl_packages(
+            self.session, acls, FakeFasUserAdmin())
+        self.session.commit()
+        self.assertEqual(len(msgs), 8)
+        self.assertEqual(
+            msgs[0],
+            'user: admin set for ralph acl: watchbugzilla of package: guake '
+            'from:  to: Approved on branch: f18')
+
+        # FAS is queried once for the packagers and once for kevin only
+        self.assertEqual(mock_packagers.call_count, 1)
+        mock_func.assert_called_once_with('kevin')
+
+        logs = pkgdblib.search_logs(self.session, package='guake')
+        self.assertEqual(
+            sorted(log.description for log in logs[:8]), sorted(msgs))
+
+        # Removing ACLs deletes them
+        msgs = pkgdblib.set_acl_packages(
+            self.session,
+            [('guake', 'f18', 'kevin', 'watchbugzilla', ''),
+             ('guake', 'f18', 'kevin', 'watchcommits', 'Obsolete'),
+             ('guake', 'master', 'kevin', 'watchcommits', 'Approved')],
+            FakeFasUserAdmin())
+        self.session.commit()
+        self.assertEqual(len(msgs), 2)
+
+        acls = pkgdblib.get_acl_package(self.session, 'guake', 'f18')
+        kevin = [
+            (acl.acl, acl.status)
+            for acl in acls[0].acls
+            if acl.fas_name == 'kevin'
+        ]
+        self.assertEqual(kevin, [('watchcommits', 'Obsolete')])
+
     @patch('pkgdb2.lib.utils')
     def test_update_pkg_poc(self, mock_func):
         """ Test the update_pkg_poc function. """
@@ -1043,6 +1195,13 @@ class PkgdbLibtests(Modeltests):
         self.assertEqual(len(pkg), 1)
         self.assertEqual(pkg[0][0], 'pingou')
 
+        pkg = pkgdblib.search_packagers(self.session, '*', limit=1)
+        self.assertEqual(pkg[0][0], 'group::gtk-sig')
+        pkg = pkgdblib.search_packagers(
+            self.session, '*', limit=1, page=3,
+            after=pkgdblib.get_cursor(pkg[0]))
+        self.assertEqual(pkg[0][0], 'josef')
+
         self.assertRaises(pkgdblib.PkgdbException,
                           pkgdblib.search_packagers,
                           self.session,
@@ -1096,6 +1255,14 @@ class PkgdbLibtests(Modeltests):
         self.assertEqual(acls[1][0].packagelist.package.name, 'fedocal')
         self.assertEqual(acls[1][0].packagelist.collection.branchname, 'master')
 
+        page1 = pkgdblib.get_acl_packager(
+            self.session, 'pingou', acls='commit', page=1, limit=2)
+        acls2 = pkgdblib.get_acl_packager(
+            self.session, 'pingou', acls='commit', limit=2,
+            after=pkgdblib.get_cursor(page1[-1]))
+        self.assertEqual(
+            [acl[0].id for acl in acls2], [acl[0].id for acl in acls])
+
         acls = pkgdblib.get_acl_packager(
             self.session, 'pingou', acls=['commit', 'watchbugzilla'])
         self.assertEqual(len(acls), 9)
@@ -1142,6 +1309,101 @@ class PkgdbLibtests(Modeltests):
         self.assertEqual(pending_acls[1]['acl'], 'commit')
         self.assertEqual(pending_acls[1]['status'], 'Awaiting Review')
 
+    @patch('pkgdb2.lib.utils.set_bugzilla_owner')
+    @patch('pkgdb2.lib.utils.get_packagers')
+    @patch('pkgdb2.lib.utils.get_bz_email_user')
+    def test_get_pending_acl_count(self, mock_func, mock_packagers, mock_bz):
+        """ Test the get_pending_acl_count function. """
+        mock_func.return_value = 1
+        mock_packagers.return_value = ['pingou', 'toshio']
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'pingou'), 0)
+
+        create_package_acl(self.session)
+
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'pingou'), 2)
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'toshio'), 0)
+
+        # Approving a request removes it from the inbox
+        pkgdblib.set_acl_package(self.session,
+                                 pkg_name='guake',
+                                 pkg_branch='master',
+                                 pkg_user='toshio',
+                                 acl='commit',
+                                 status='Approved',
+                                 user=FakeFasUser(),
+                                 )
+        self.session.commit()
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'pingou'), 1)
+        pending_acls = pkgdblib.get_pending_acl_user(
+            self.session, 'pingou')
+        self.assertEqual(len(pending_acls), 1)
+        self.assertEqual(pending_acls[0]['user'], 'ralph')
+        self.assertEqual(pending_acls[0]['acl'], 'approveacls')
+
+        # Granting approveacls adds the pending requests to the inbox
+        pkgdblib.set_acl_package(self.session,
+                                 pkg_name='guake',
+                                 pkg_branch='master',
+                                 pkg_user='toshio',
+                                 acl='approveacls',
+                                 status='Approved',
+                                 user=FakeFasUser(),
+                                 )
+        self.session.commit()
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'toshio'), 1)
+
+        # The inbox is refreshed once per transaction, and before being
+        # read in the transaction
+        refreshes = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the refreshes of the inbox. '''
+            if statement.startswith('DELETE FROM "PendingAcl"'):
+                refreshes.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+        for acl in ('commit', 'watchcommits', 'watchbugzilla'):
+            pkgdblib.set_acl_package(self.session,
+                                     pkg_name='guake',
+                                     pkg_branch='master',
+                                     pkg_user='toshio',
+                                     acl=acl,
+                                     status='Awaiting Review',
+                                     user=FakeFasUser(),
+                                     )
+        self.assertEqual(refreshes, [])
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'pingou'), 4)
+        self.assertEqual(len(refreshes), 1)
+        pkgdblib.set_acl_package(self.session,
+                                 pkg_name='guake',
+                                 pkg_branch='master',
+                                 pkg_user='toshio',
+                                 acl='commit',
+                                 status='Approved',
+                                 user=FakeFasUser(),
+                                 )
+        self.session.commit()
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+        self.assertEqual(len(refreshes), 2)
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'pingou'), 3)
+
+        # The requests on EOL collections are not pending anymore
+        collection = pkgdblib.model.Collection.by_name(
+            self.session, 'master')
+        collection.status = 'EOL'
+        self.session.commit()
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'pingou'), 0)
+        self.assertEqual(
+            pkgdblib.get_pending_acl_count(self.session, 'toshio'), 0)
+
     def test_get_acl_user_package(self):
         """ Test the get_acl_user_package function. """
         pending_acls = pkgdblib.get_acl_user_package(
@@ -1188,6 +1450,39 @@ class PkgdbLibtests(Modeltests):
             self.session, 'toshio', 'guake', acl='commit'))
         self.assertFalse(pkgdblib.has_acls(
             self.session, 'toshio', 'guake', acl=['commit', 'approveacls']))
+        self.assertFalse(pkgdblib.has_acls(
+            self.session, 'pingou', 'guake', acl='commit', branch='el4'))
+
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+
+        # The answers are kept in the session
+        self.assertTrue(pkgdblib.has_acls(
+            self.session, 'pingou', 'guake', acl='commit'))
+        self.assertFalse(pkgdblib.has_acls(
+            self.session, 'toshio', 'guake', acl=['commit', 'approveacls']))
+        self.assertEqual(len(queries), 0)
+
+        # Until the ACLs change
+        acl = self.session.query(pkgdblib.model.PackageListingAcl).filter_by(
+            fas_name='toshio', acl='commit').one()
+        acl.status = 'Approved'
+        self.assertTrue(pkgdblib.has_acls(
+            self.session, 'toshio', 'guake', acl=['commit', 'approveacls']))
+
+        pkgdblib.model.PackageListingAcl.bulk_set(
+            self.session, [], [dict(id=acl.id, status='Obsolete')], [])
+        del queries[:]
+        self.assertFalse(pkgdblib.has_acls(
+            self.session, 'toshio', 'guake', acl=['commit', 'approveacls']))
+        self.assertEqual(len(queries), 1)
+
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
 
     def test_get_status(self):
         """ Test the get_status function. """
@@ -1235,6 +1530,89 @@ class PkgdbLibtests(Modeltests):
         pkg = pkgdblib.get_package_maintained(self.session, 'ralph')
         self.assertEqual(pkg, [])
 
+    @patch('pkgdb2.CACHE', dogpile.cache.make_region().configure(
+        'dogpile.cache.memory'))
+    @patch('pkgdb2.lib.utils.set_bugzilla_owner')
+    @patch('pkgdb2.lib.utils.get_packagers')
+    @patch('pkgdb2.lib.utils.get_bz_email_user')
+    def test_get_packager_stats(self, mock_func, mock_packagers, mock_bz):
+        """ Test the get_packager_stats function. """
+        create_package_acl(self.session)
+        mock_func.return_value = 1
+        mock_packagers.return_value = ['ralph']
+
+        expected = {
+            'el6': {'point of contact': 0, 'co-maintainer': 0},
+            'f17': {'point of contact': 0, 'co-maintainer': 0},
+            'f18': {'point of contact': 1, 'co-maintainer': 0},
+            'master': {'point of contact': 1, 'co-maintainer': 0},
+        }
+        stats = pkgdblib.get_packager_stats(self.session, 'pingou')
+        self.assertEqual(stats, expected)
+
+        # The packages are not counted on the EOL collections
+        stats = pkgdblib.get_packager_stats(self.session, 'dodji', eol=True)
+        self.assertEqual(
+            stats['el4'], {'point of contact': 0, 'co-maintainer': 0})
+
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        config = {'PKGDB2_PACKAGER_STATS_CACHE': True}
+        with patch.dict(pkgdb2.APP.config, config):
+            self.assertEqual(
+                pkgdblib.get_packager_stats(self.session, 'pingou'),
+                expected)
+            stats = pkgdblib.get_packager_stats(self.session, 'ralph')
+            self.assertEqual(stats['f18']['co-maintainer'], 0)
+
+            sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+            self.assertEqual(
+                pkgdblib.get_packager_stats(self.session, 'pingou'),
+                expected)
+            sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+            self.assertEqual(queries, [])
+
+            # Changing the ACLs of ralph only changes his stats
+            pkgdblib.set_acl_package(
+                self.session,
+                pkg_name='guake',
+                pkg_branch='f18',
+                pkg_user='ralph',
+                acl='commit',
+                status='Approved',
+                user=FakeFasUserAdmin(),
+            )
+            self.session.commit()
+
+            stats = pkgdblib.get_packager_stats(self.session, 'ralph')
+            self.assertEqual(stats['f18']['co-maintainer'], 1)
+
+            sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+            self.assertEqual(
+                pkgdblib.get_packager_stats(self.session, 'pingou'),
+                expected)
+            sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+            self.assertEqual(queries, [])
+
+            # Orphaning the package changes the stats of its point of contact
+            pkgdblib.update_pkg_poc(
+                self.session,
+                pkg_name='guake',
+                pkg_branch='f18',
+                pkg_poc='orphan',
+                user=FakeFasUserAdmin(),
+            )
+            self.session.commit()
+
+            stats = pkgdblib.get_packager_stats(self.session, 'pingou')
+            self.assertEqual(
+                stats['f18'], {'point of contact': 0, 'co-maintainer': 0})
+            self.assertEqual(stats['master'], expected['master'])
+
     def test_get_package_watch(self):
         """ Test the get_package_watch function. """
         create_package_acl(self.session)
@@ -1336,6 +1714,87 @@ class PkgdbLibtests(Modeltests):
         self.assertEqual(package.summary, 'Youhou Fedora is awesome!')
         self.assertEqual(package.status, 'Orphaned')
 
+    def test_sync_package_info(self):
+        """ Test the sync_package_info function. """
+        create_package_acl(self.session)
+
+        packages_info = {
+            'guake': (
+                'Top down terminal for GNOME', 'Top down terminal...',
+                'http://guake.org'),
+            'geany': (
+                'A fast and lightweight IDE', '', 'http://www.geany.org'),
+            'fedocal': (
+                'A web-based calendar for Fedora', 'Web calendar app',
+                None),
+            'foobar': ('Foo', 'Bar', None),
+        }
+
+        self.assertRaises(pkgdblib.PkgdbException,
+                          pkgdblib.sync_package_info,
+                          self.session,
+                          packages_info,
+                          user=FakeFasUser())
+
+        expected = [
+            {
+                'name': 'fedocal',
+                'fields': {
+                    'description': ('Web calendar ...', 'Web calendar app'),
+                },
+            },
+            {
+                'name': 'geany',
+                'fields': {
+                    'summary': (
+                        'A fast and lightweight IDE using GTK2',
+                        'A fast and lightweight IDE'),
+                    'upstream_url': (None, 'http://www.geany.org'),
+                },
+            },
+        ]
+
+        # The dry run only reports the changes
+        logs = pkgdblib.model.Log.search(self.session, count=True)
+        changes, unknown = pkgdblib.sync_package_info(
+            self.session, packages_info, FakeFasUserAdmin(), dry_run=True)
+        self.assertEqual(changes, expected)
+        self.assertEqual(unknown, ['offlineimap'])
+        self.session.rollback()
+        package = pkgdblib.model.Package.by_name(self.session, 'geany')
+        self.assertEqual(
+            package.summary, 'A fast and lightweight IDE using GTK2')
+        self.assertEqual(
+            pkgdblib.model.Log.search(self.session, count=True), logs)
+
+        changes, unknown = pkgdblib.sync_package_info(
+            self.session, packages_info, FakeFasUserAdmin())
+        self.assertEqual(changes, expected)
+        self.assertEqual(unknown, ['offlineimap'])
+        self.session.commit()
+
+        self.session.expire_all()
+        package = pkgdblib.model.Package.by_name(self.session, 'geany')
+        self.assertEqual(package.summary, 'A fast and lightweight IDE')
+        self.assertEqual(package.description, 'Lightweight GNOME IDE...')
+        self.assertEqual(package.upstream_url, 'http://www.geany.org')
+        package = pkgdblib.model.Package.by_name(self.session, 'fedocal')
+        self.assertEqual(package.description, 'Web calendar app')
+        self.assertEqual(
+            pkgdblib.model.Log.search(self.session, count=True), logs + 2)
+        log = pkgdblib.model.Log.search(
+            self.session, package_id=package.id)[0]
+        self.assertEqual(
+            log.description,
+            "user: admin updated ['description'] package: fedocal")
+
+        # Nothing changes the second time
+        changes, unknown = pkgdblib.sync_package_info(
+            self.session, packages_info, FakeFasUserAdmin())
+        self.assertEqual(changes, [])
+        self.assertEqual(
+            pkgdblib.model.Log.search(self.session, count=True), logs + 2)
+
     def test_get_top_maintainers(self):
         """ Test the get_top_maintainers funtion. """
         create_package_acl(self.session)
@@ -1418,6 +1877,176 @@ class PkgdbLibtests(Modeltests):
         logs = pkgdblib.search_logs(self.session, packager='pingou')
         self.assertEqual(len(logs), 0)
 
+        # Walk through all the logs using the cursors
+        all_logs = [log.id for log in pkgdblib.search_logs(self.session)]
+        logs = []
+        cursor = None
+        while True:
+            page = pkgdblib.search_logs(self.session, limit=5, after=cursor)
+            if not page:
+                break
+            logs.extend([log.id for log in page])
+            cursor = pkgdblib.get_cursor(page[-1])
+        self.assertEqual(logs, all_logs)
+
+        # Invalid cursor
+        self.assertRaises(pkgdblib.PkgdbException,
+                          pkgdblib.search_logs,
+                          self.session,
+                          after='foo'
+                          )
+        self.assertRaises(pkgdblib.PkgdbException,
+                          pkgdblib.search_logs,
+                          self.session,
+                          after=pkgdblib.get_cursor(['foo'])
+                          )
+
+    def test_expire_pending_actions(self):
+        """ Test the expire_pending_actions function. """
+        create_package_acl(self.session)
+        create_admin_actions(self.session, n=2)
+
+        self.assertRaises(pkgdblib.PkgdbException,
+                          pkgdblib.expire_pending_actions,
+                          self.session,
+                          user=FakeFasUserAdmin(),
+                          days='a'
+                          )
+        self.assertRaises(pkgdblib.PkgdbException,
+                          pkgdblib.expire_pending_actions,
+                          self.session,
+                          user=FakeFasUserAdmin(),
+                          days=0
+                          )
+
+        # Nothing is pending for more than 7 days yet
+        self.assertEqual(
+            pkgdblib.expire_pending_actions(
+                self.session, user=FakeFasUserAdmin()),
+            [])
+
+        actions = pkgdblib.model.AdminAction.search(
+            self.session, status='Pending')
+        self.assertEqual(len(actions), 2)
+        actions[0].date_created = datetime.utcnow() - timedelta(days=8)
+        self.session.commit()
+
+        logs = pkgdblib.model.Log.search(self.session, count=True)
+        msgs = pkgdblib.expire_pending_actions(
+            self.session, user=FakeFasUserAdmin())
+        self.session.commit()
+        self.assertEqual(
+            msgs,
+            ['user: admin updated action: 1 of guake from `Pending` to '
+             '`Awaiting Review`'])
+        self.assertEqual(
+            pkgdblib.model.Log.search(self.session, count=True), logs + 1)
+
+        # The status is stored and searched with a simple equality
+        actions = pkgdblib.model.AdminAction.search(
+            self.session, status='Awaiting Review')
+        self.assertEqual([action.id for action in actions], [1])
+        self.assertEqual(actions[0].status, 'Awaiting Review')
+        actions = pkgdblib.model.AdminAction.search(
+            self.session, status='Pending')
+        self.assertEqual([action.id for action in actions], [2])
+
+        # The same request is already Awaiting Review
+        guake = pkgdblib.model.Package.by_name(self.session, 'guake')
+        el6 = pkgdblib.model.Collection.by_name(self.session, 'el6')
+        action = pkgdblib.model.AdminAction(
+            package_id=guake.id,
+            collection_id=el6.id,
+            user='ralph',
+            _status='Pending',
+            action='request.branch',
+            date_created=datetime.utcnow() - timedelta(days=10),
+        )
+        self.session.add(action)
+        self.session.commit()
+
+        self.assertEqual(
+            pkgdblib.expire_pending_actions(
+                self.session, user=FakeFasUserAdmin()),
+            [])
+
+    def test_archive_logs(self):
+        """ Test the archive_logs function and searching the archived logs
+        with search_logs. """
+        self.test_add_package()
+
+        # Age the first 10 logs
+        old = datetime.utcnow() - timedelta(days=30)
+        for log in pkgdblib.model.Log.search(self.session)[-10:]:
+            log.change_time = old
+            old = old + timedelta(hours=1)
+        self.session.commit()
+        all_logs = [log.id for log in pkgdblib.search_logs(self.session)]
+        self.assertEqual(len(all_logs), 23)
+
+        self.assertRaises(pkgdblib.PkgdbException,
+                          pkgdblib.archive_logs,
+                          self.session,
+                          days='a'
+                          )
+        self.assertRaises(pkgdblib.PkgdbException,
+                          pkgdblib.archive_logs,
+                          self.session,
+                          days=0
+                          )
+
+        self.assertEqual(pkgdblib.archive_logs(self.session, days=7), 10)
+        self.session.commit()
+        self.assertEqual(
+            len(pkgdblib.model.Log.search(self.session, archived=False)),
+            13)
+        self.assertEqual(pkgdblib.archive_logs(self.session, days=7), 0)
+
+        self.assertEqual(pkgdblib.search_logs(self.session, count=True), 23)
+        self.assertEqual(
+            [log.id for log in pkgdblib.search_logs(self.session)],
+            all_logs)
+
+        # Walk through all the logs using the pages and the cursors
+        logs = []
+        for page in range(1, 6):
+            logs.extend([log.id for log in pkgdblib.search_logs(
+                self.session, page=page, limit=5)])
+        self.assertEqual(logs, all_logs)
+
+        logs = []
+        cursor = None
+        while True:
+            page = pkgdblib.search_logs(self.session, limit=5, after=cursor)
+            if not page:
+                break
+            logs.extend([log.id for log in page])
+            cursor = pkgdblib.get_cursor(page[-1])
+        self.assertEqual(logs, all_logs)
+
+        # Old dates only search the archive
+        from_date = (datetime.utcnow() - timedelta(days=20)).date()
+        logs = pkgdblib.search_logs(self.session, from_date=from_date)
+        self.assertEqual([log.id for log in logs], all_logs[13:])
+        self.assertEqual(
+            pkgdblib.search_logs(
+                self.session, from_date=from_date, count=True),
+            10)
+
+        # The first page of recent logs does not touch the archive
+        queries = []
+
+        def count(conn, cursor, statement, *args):
+            ''' Record the queries run. '''
+            queries.append(statement)
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', count)
+        logs = pkgdblib.search_logs(self.session, limit=5)
+        sa.event.remove(self.session.bind, 'before_cursor_execute', count)
+        self.assertEqual([log.id for log in logs], all_logs[:5])
+        self.assertFalse(
+            [query for query in queries if 'LogArchive' in query])
+
     def test_unorphan_package(self):
         """ Test the unorphan_package function. """
         create_package_acl(self.session)
@@ -1577,12 +2206,37 @@ class PkgdbLibtests(Modeltests):
                           user=FakeFasUserAdmin()
                           )
 
-        pkgdblib.add_branch(
+        # Branch guake first, as if a previous run had stopped after it
+        guake = pkgdblib.model.Package.by_name(self.session, 'guake')
+        pkgdblib.model.PackageListing.bulk_branch(
+            self.session,
+            pkgdblib.model.Collection.by_name(self.session, 'master'),
+            new_collection,
+            [guake.id])
+        self.session.commit()
+
+        steps = []
+
+        def progress(done, total):
+            ''' Record the progress of the branching. '''
+            steps.append((done, total))
+
+        messages = pkgdblib.add_branch(
             session=self.session,
             clt_from='master',
             clt_to='f19',
-            user=FakeFasUserAdmin()
+            user=FakeFasUserAdmin(),
+            chunk_size=1,
+            progress=progress,
+        )
+        self.assertEqual(
+            messages,
+            [
+                'geany branched successfully from Fedora to Fedora 19',
+                'offlineimap branched successfully from Fedora to Fedora 19',
+            ]
         )
+        self.assertEqual(steps, [(1, 2), (2, 2)])
 
         pkg_acl = pkgdblib.get_acl_package(self.session, 'guake')
         self.assertEqual(len(pkg_acl), 3)
@@ -1595,6 +2249,23 @@ class PkgdbLibtests(Modeltests):
         self.assertEqual(pkg_acl[2].collection.branchname, 'f19')
         self.assertEqual(len(pkg_acl[2].acls), 5)
 
+        pkg_acl = pkgdblib.get_acl_package(self.session, 'geany')
+        self.assertEqual(
+            [pkg.collection.branchname for pkg in pkg_acl],
+            ['f18', 'master', 'f19'])
+        self.assertEqual(
+            [(acl.fas_name, acl.acl, acl.status) for acl in pkg_acl[1].acls],
+            [(acl.fas_name, acl.acl, acl.status) for acl in pkg_acl[2].acls])
+
+        # Everything is branched already
+        messages = pkgdblib.add_branch(
+            session=self.session,
+            clt_from='master',
+            clt_to='f19',
+            user=FakeFasUserAdmin(),
+        )
+        self.assertEqual(messages, [])
+
     def test_get_critpath_packages(self):
         """ Test the get_critpath_packages method of pkgdblib. """
         create_package_acl(self.session)
@@ -1675,6 +2346,59 @@ class PkgdbLibtests(Modeltests):
             data,
             {u'guake': u'pingou', u'geany': u'group::gtk-sig,josef'})
 
+    def test_iter_notify(self):
+        """ Test the iter_notify function. """
+        create_package_acl(self.session)
+
+        data = pkgdblib.iter_notify(self.session, acls='commit')
+        self.assertFalse(isinstance(data, list))
+        self.assertEqual(
+            list(data),
+            [(u'geany', u'group::gtk-sig,josef'), (u'guake', u'pingou')]
+        )
+
+    def test_iter_vcs_acls(self):
+        """ Test the iter_vcs_acls function. """
+        create_package_acl2(self.session)
+
+        data = list(pkgdblib.iter_vcs_acls(self.session, skip_pp=['geany']))
+        self.assertEqual(
+            [(it['name'], it['branch']) for it in data],
+            [
+                (u'fedocal', u'f17'), (u'fedocal', u'f18'),
+                (u'geany', u'f18'), (u'geany', u'master'),
+                (u'guake', u'f18'), (u'guake', u'master'),
+                (u'offlineimap', u'master'),
+            ]
+        )
+        self.assertEqual(
+            data[3],
+            {
+                'name': u'geany',
+                'branch': u'master',
+                'user': u'pingou',
+                'group': u'@gtk-sig',
+            }
+        )
+        self.assertEqual(
+            data[5],
+            {
+                'name': u'guake',
+                'branch': u'master',
+                'user': u'pingou,spot',
+                'group': u'@provenpackager',
+            }
+        )
+        self.assertEqual(
+            data[6],
+            {
+                'name': u'offlineimap',
+                'branch': u'master',
+                'user': u'',
+                'group': u'@provenpackager',
+            }
+        )
+
     def test_set_monitor_package(self):
         """ Test the set_monitor_package function. """
         self.assertFalse(
@@ -2088,6 +2812,53 @@ class PkgdbLibtests(Modeltests):
         self.assertEqual(
             msg, 'user: pingou request package: zsh on branch master')
 
+    def test_search_packages(self):
+        """ Test the search_packages function. """
+        self.assertRaises(
+            pkgdblib.PkgdbException,
+            pkgdb2.lib.search.search_packages,
+            self.session, '*')
+        self.assertRaises(
+            pkgdblib.PkgdbException,
+            pkgdb2.lib.search.search_packages,
+            self.session, 'guake', limit='a')
+
+        create_package_acl(self.session)
+
+        def search(term, **kwargs):
+            ''' Return the name and score of the packages found. '''
+            return [
+                (pkg['name'], pkg['score'])
+                for pkg in pkgdb2.lib.search.search_packages(
+                    self.session, term, **kwargs)
+            ]
+
+        # Exact name
+        self.assertEqual(search('guake'), [('guake', 4.0)])
+        # Start of the name, wildcards are ignored
+        self.assertEqual(search('GUA*'), [('guake', 2.429)])
+        # Misspelled name
+        self.assertEqual(search('geny'), [('geany', 0.375)])
+        # Summary ranked before description
+        self.assertEqual(
+            search('gnome'), [('guake', 1.0), ('geany', 0.5)])
+        # All the words must match, the last ones may be prefixes
+        self.assertEqual(search('imap sync'), [('offlineimap', 1.0)])
+        self.assertEqual(search('imap terminal'), [])
+        self.assertEqual(search('xyz'), [])
+
+        self.assertEqual(
+            search('g'), [('geany', 2.143), ('guake', 2.143)])
+        self.assertEqual(search('g', limit=1), [('geany', 2.143)])
+
+        # The index is rebuilt when a package is updated
+        package = pkgdblib.search_package(self.session, 'geany')[0]
+        pkgdblib.edit_package(
+            self.session, package, pkg_summary='Terminal based IDE',
+            user=FakeFasUserAdmin())
+        self.session.commit()
+        self.assertEqual(search('terminal'), [('geany', 1.0), ('guake', 1.0)])
+
 
 if __name__ == '__main__':
     SUITE = unittest.TestLoader().loadTestsFromTestCase(PkgdbLibtests)
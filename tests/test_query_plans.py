@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+pkgdb tests checking that the most used queries rely on indexes.
+'''
+
+__requires__ = ['SQLAlchemy >= 0.8']
+import pkg_resources
+
+import unittest
+import sys
+import os
+
+import sqlalchemy as sa
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..'))
+
+from pkgdb2.lib import model
+from tests import Modeltests, create_package_acl
+
+
+class QueryPlantests(Modeltests):
+    """ Query plan tests. """
+
+    def setUp(self):
+        """ Set up the environnment, ran before every tests. """
+        super(QueryPlantests, self).setUp()
+        create_package_acl(self.session)
+
+    def get_scans(self, function, *args, **kwargs):
+        """ Run the specified function and return the full table scans
+        done by the SELECT queries it ran.
+        """
+        statements = []
+
+        def record(conn, cursor, statement, parameters, *args):
+            ''' Record the SELECT queries run. '''
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        sa.event.listen(self.session.bind, 'before_cursor_execute', record)
+        try:
+            function(self.session, *args, **kwargs)
+        finally:
+            sa.event.remove(
+                self.session.bind, 'before_cursor_execute', record)
+        self.assertNotEqual(statements, [])
+
+        scans = []
+        conn = self.session.connection()
+        if conn.dialect.name == 'postgresql':
+            # On a small dataset PostgreSQL prefers sequential scans, so
+            # only report the ones no index could avoid.
+            conn.execute('SET LOCAL enable_seqscan = off')
+            for statement, parameters in statements:
+                for row in conn.execute(
+                        'EXPLAIN ' + statement, parameters):
+                    if 'Seq Scan' in row[0]:
+                        scans.append(row[0].strip())
+            conn.execute('SET LOCAL enable_seqscan = on')
+        else:
+            for statement, parameters in statements:
+                for row in conn.execute(
+                        'EXPLAIN QUERY PLAN ' + statement, parameters):
+                    detail = tuple(row)[-1]
+                    if detail.startswith('SCAN '):
+                        scans.append(detail)
+        return scans
+
+    def test_get_package_of_user(self):
+        """ Test the query plan of Package.get_package_of_user. """
+        scans = self.get_scans(
+            model.Package.get_package_of_user, 'pingou')
+        self.assertEqual(scans, [])
+
+        scans = self.get_scans(
+            model.Package.get_package_of_user, 'pingou', poc=False,
+            eol=True)
+        self.assertEqual(scans, [])
+
+    def test_get_acl_packager(self):
+        """ Test the query plan of PackageListingAcl.get_acl_packager. """
+        scans = self.get_scans(
+            model.PackageListingAcl.get_acl_packager, 'pingou')
+        self.assertEqual(scans, [])
+
+        scans = self.get_scans(
+            model.PackageListingAcl.get_acl_packager, 'pingou',
+            acls=['commit', 'approveacls'], poc=True)
+        self.assertEqual(scans, [])
+
+    def test_get_pending_acl(self):
+        """ Test the query plan of PackageListingAcl.get_pending_acl. """
+        scans = self.get_scans(model.PackageListingAcl.get_pending_acl)
+        self.assertEqual(scans, [])
+
+        scans = self.get_scans(
+            model.PackageListingAcl.get_pending_acl, 'pingou')
+        self.assertEqual(scans, [])
+
+    def test_pending_acl_count(self):
+        """ Test the query plan of PendingAcl.count. """
+        scans = self.get_scans(model.PendingAcl.count, 'pingou')
+        self.assertEqual(scans, [])
+
+    def test_notify(self):
+        """ Test the query plan of notify. """
+        scans = self.get_scans(model.notify)
+        self.assertEqual(scans, [])
+
+        scans = self.get_scans(
+            model.notify, name='Fedora', version='17', acls='all')
+        self.assertEqual(scans, [])
+
+    def test_vcs_acls(self):
+        """ Test the query plan of vcs_acls. """
+        scans = self.get_scans(model.vcs_acls)
+        self.assertEqual(scans, [])
+
+        scans = self.get_scans(model.vcs_acls, eol=True)
+        self.assertEqual(scans, [])
+
+
+if __name__ == '__main__':
+    SUITE = unittest.TestLoader().loadTestsFromTestCase(QueryPlantests)
+    unittest.TextTestRunner(verbosity=2).run(SUITE)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+Benchmark the generation of the bugzilla export.
+
+This script fills a database with a synthetic dataset and compares the
+time needed to build the bugzilla export by merging the rows of
+``model.bugzilla`` in python with the time needed when the rows are
+aggregated by the database using ``model.bugzilla_grouped``.
+
+Usage: benchmark_bugzilla.py [--packages N] [--watchers N] [--db URL]
+
+'''
+
+import argparse
+import itertools
+import operator
+import os
+import sys
+import time
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..'))
+
+import pkgdb2.lib
+from pkgdb2.lib import model
+
+
+COLLECTIONS = [
+    ('Fedora', '20', 'f20'),
+    ('Fedora', '21', 'f21'),
+    ('Fedora', '22', 'f22'),
+    ('Fedora', 'devel', 'master'),
+    ('Fedora EPEL', '7', 'epel7'),
+]
+
+
+def fill_database(session, packages, watchers):
+    ''' Fill the database with ``packages`` packages branched on each of
+    the collections, each listing having ``watchers`` people watching
+    bugzilla.
+    '''
+    engine = session.bind
+    now = datetime.datetime.utcnow()
+
+    engine.execute(model.Collection.__table__.insert(), [
+        dict(id=cnt + 1, name=name, version=version, branchname=branch,
+             dist_tag='.%s' % branch, status='Active', owner='admin',
+             date_created=now)
+        for cnt, (name, version, branch) in enumerate(COLLECTIONS)
+    ])
+    engine.execute(model.Package.__table__.insert(), [
+        dict(id=cnt + 1, name='package-%05d' % cnt,
+             summary='Summary of package %s' % cnt, status='Approved',
+             monitor='False', koschei=False, date_created=now)
+        for cnt in range(packages)
+    ])
+
+    listings = []
+    acls = []
+    for pkgid in range(1, packages + 1):
+        for cltid in range(1, len(COLLECTIONS) + 1):
+            listingid = len(listings) + 1
+            # Orphan one listing out of seven
+            poc = 'user%d' % (pkgid % 300)
+            if (pkgid + cltid) % 7 == 0:
+                poc = 'orphan'
+            listings.append(dict(
+                id=listingid, package_id=pkgid, collection_id=cltid,
+                point_of_contact=poc, status='Approved', critpath=False,
+                status_change=now))
+            for cnt in range(watchers):
+                acls.append(dict(
+                    fas_name='user%d' % ((pkgid + cnt * 37) % 300),
+                    packagelisting_id=listingid, acl='watchbugzilla',
+                    status='Approved', date_created=now))
+            acls.append(dict(
+                fas_name='group::sig%d' % (pkgid % 20),
+                packagelisting_id=listingid, acl='watchbugzilla',
+                status='Approved', date_created=now))
+
+    engine.execute(model.PackageListing.__table__.insert(), listings)
+    engine.execute(model.PackageListingAcl.__table__.insert(), acls)
+    return len(listings), len(acls)
+
+
+def legacy_bugzilla(session):
+    ''' Build the bugzilla export the way it was done before the rows
+    were aggregated in the database.
+    '''
+    output = {}
+    pkgs = model.bugzilla(session=session, stream=True)
+    for (clt, name), rows in itertools.groupby(
+            pkgs, operator.itemgetter(0, 2)):
+        entry = None
+        for pkg in rows:
+            version = pkg[1]
+            if pkg[1] == 'devel':
+                version = 10000 if pkg[4] != 'orphan' else 0
+            if entry is None:
+                entry = {
+                    'collection': pkg[0], 'name': pkg[2],
+                    'summary': pkg[3], 'poc': pkg[4], 'qa': '',
+                    'cc': pkg[5] if pkg[5] != pkg[4] else '',
+                    'version': version,
+                }
+                continue
+            if pkg[4] == 'orphan':
+                pass
+            elif entry['poc'] == 'orphan' \
+                    or int(version) > int(entry['version']):
+                entry['poc'] = pkg[4]
+                entry['version'] = version
+            if pkg[5] != 'orphan' \
+                    and pkg[5] != entry['poc'] \
+                    and pkg[5] not in entry['cc']:
+                if entry['cc']:
+                    entry['cc'] += ','
+                entry['cc'] += pkg[5]
+        output.setdefault(clt, {})[name] = entry
+    return output
+
+
+def timeit(function, session, repeat):
+    ''' Return the best time out of ``repeat`` calls of the function. '''
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        function(session)
+        duration = time.time() - start
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def main():
+    ''' Fill the database and run the benchmark. '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--packages', type=int, default=10000,
+        help='Number of packages, each is branched on %s collections '
+        '(default: 10000)' % len(COLLECTIONS))
+    parser.add_argument(
+        '--watchers', type=int, default=4,
+        help='Number of people watching each listing (default: 4)')
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help='Number of runs of each implementation (default: 3)')
+    parser.add_argument(
+        '--db', default='sqlite://',
+        help='URL of an empty database to use (default: in memory sqlite)')
+    args = parser.parse_args()
+
+    session = model.create_tables(args.db)
+    nlistings, nacls = fill_database(session, args.packages, args.watchers)
+    print('%s listings, %s ACLs' % (nlistings, nacls))
+
+    legacy = timeit(legacy_bugzilla, session, args.repeat)
+    grouped = timeit(pkgdb2.lib.bugzilla, session, args.repeat)
+    print('python merge:    %.2fs' % legacy)
+    print('SQL aggregation: %.2fs' % grouped)
+    print('speedup:         %.1fx' % (legacy / grouped))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+Benchmark the cache of the packager group retrieved from FAS.
+
+This script uses a fake FAS returning a synthetic packager group after a
+configurable delay and measures the time a request needs to get the list
+of packagers once the cached entry expired, when the request waits for
+FAS and when the expired entry is returned while it is refreshed in the
+background. It also compares looking up packagers in a list and in a set.
+
+Usage: benchmark_fas_cache.py [--members N] [--delay SECONDS]
+
+'''
+
+import argparse
+import os
+import sys
+import time
+
+import dogpile.cache
+
+sys.path.insert(0, os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), '..'))
+
+import pkgdb2
+
+
+class FakeMember(object):
+    ''' A member of a FAS group. '''
+    def __init__(self, username, role_type):
+        self.username = username
+        self.role_type = role_type
+
+
+class FakeFas(object):
+    ''' A FAS returning ``members`` packagers after ``delay`` seconds. '''
+    def __init__(self, members, delay):
+        self.members = [
+            FakeMember('packager%05d' % cnt, 'user') for cnt in range(members)
+        ]
+        self.delay = delay
+
+    def group_members(self, group):
+        ''' Return the members of the group. '''
+        time.sleep(self.delay)
+        return self.members
+
+
+def time_expired_access(fas, runner):
+    ''' Return the time needed to retrieve the packagers once the cached
+    entry expired, using the provided ``async_creation_runner``.
+    '''
+    region = dogpile.cache.make_region(
+        async_creation_runner=runner).configure('dogpile.cache.memory')
+
+    @region.cache_on_arguments(expiration_time=3600)
+    def get_packagers():
+        ''' Return the set of the packagers. '''
+        return frozenset(
+            user.username for user in fas.group_members('packager'))
+
+    get_packagers()
+    region.invalidate(hard=False)
+    start = time.time()
+    get_packagers()
+    return time.time() - start
+
+
+def time_lookups(packagers, names):
+    ''' Return the time needed to check whether the names are packagers.
+    '''
+    start = time.time()
+    for name in names:
+        name in packagers
+    return time.time() - start
+
+
+def main():
+    ''' Run the benchmark. '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--members', type=int, default=5000,
+        help='Number of members of the packager group (default: 5000)')
+    parser.add_argument(
+        '--delay', type=float, default=2.0,
+        help='Seconds FAS needs to return the group (default: 2)')
+    parser.add_argument(
+        '--lookups', type=int, default=1000,
+        help='Number of packagers looked up (default: 1000)')
+    args = parser.parse_args()
+
+    fas = FakeFas(args.members, args.delay)
+    blocking = time_expired_access(fas, None)
+    background = time_expired_access(fas, pkgdb2.refresh_in_background)
+    print('expired entry, waiting for FAS:       %.3fs' % blocking)
+    print('expired entry, refreshed in thread:   %.3fs' % background)
+
+    names = [
+        fas.members[cnt % args.members].username
+        for cnt in range(0, args.lookups * 7, 7)
+    ]
+    packagers = [member.username for member in fas.members]
+    as_list = time_lookups(packagers, names)
+    as_set = time_lookups(frozenset(packagers), names)
+    print('%s lookups in a list: %.4fs' % (args.lookups, as_list))
+    print('%s lookups in a set:  %.4fs' % (args.lookups, as_set))
+
+
+if __name__ == '__main__':
+    main()
@@ -91,6 +91,15 @@ install -m 644 createdb.py $RPM_BUILD_ROOT/%{_datadir}/pkgdb2/pkgdb2_createdb.py
 # Install the pkgdb2_branch script
 install -m 644 utility/pkgdb2_branch.py $RPM_BUILD_ROOT/%{_datadir}/pkgdb2/pkgdb2_branch.py
 
+# Install the pkgdb2_archive_logs script
+install -m 644 utility/pkgdb2_archive_logs.py $RPM_BUILD_ROOT/%{_datadir}/pkgdb2/pkgdb2_archive_logs.py
+
+# Install the pkgdb2_notifications script
+install -m 644 utility/pkgdb2_notifications.py $RPM_BUILD_ROOT/%{_datadir}/pkgdb2/pkgdb2_notifications.py
+
+# Install the pkgdb2_pending_actions script
+install -m 644 utility/pkgdb2_pending_actions.py $RPM_BUILD_ROOT/%{_datadir}/pkgdb2/pkgdb2_pending_actions.py
+
 # Install the set_monitoring_script
 install -m 644 utility/set_monitoring_status.py $RPM_BUILD_ROOT/%{_datadir}/pkgdb2/set_monitoring_status.py
 
@@ -112,7 +121,10 @@ install -m 644 utility/alembic.ini $RPM_BUILD_ROOT/%{_sysconfdir}/pkgdb2/alembic
 %{_datadir}/pkgdb2/
 %{python_sitelib}/pkgdb2/
 %{python_sitelib}/%{name}*.egg-info
+%{_bindir}/pkgdb2_archive_logs.py
 %{_bindir}/pkgdb2_branch.py
+%{_bindir}/pkgdb2_notifications.py
+%{_bindir}/pkgdb2_pending_actions.py
 %{_bindir}/update_package_info.py
 %{_bindir}/pkgdb-sync-bugzilla
 
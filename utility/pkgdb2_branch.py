@@ -95,10 +95,23 @@ def get_arguments():
     parser.add_argument(
         '--nomail', dest='nomail', action='store_true', default=False,
         help='Print the repo instead of sending it by email')
+    parser.add_argument(
+        '--chunk-size', dest='chunk_size', type=int, default=500,
+        help='Number of packages to branch per transaction')
 
     return parser.parse_args()
 
 
+def print_progress(done, total):
+    ''' Print the progress of the branching.
+
+    :arg done: the number of packages processed so far.
+    :arg total: the total number of packages to branch.
+
+    '''
+    print '%s/%s packages processed' % (done, total)
+
+
 def main():
     ''' Retrieve all the package associated to the collection `devel` and
     branch them into the specified collection.
@@ -118,6 +131,8 @@ def main():
             clt_from='master',
             clt_to=args.new_branch,
             user=user,
+            chunk_size=args.chunk_size,
+            progress=print_progress,
         )
     except pkgdb2.lib.PkgdbException, err:
         print err
@@ -125,7 +140,7 @@ def main():
 
     try:
         pkgdb2.SESSION.commit()
-    except SQLAlchemyError. err:
+    except SQLAlchemyError, err:
         print err
         return 1
 
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+Script sending the fedmsg messages and emails stored in the database when
+``PKGDB2_NOTIFICATION_OUTBOX`` is set in the configuration.
+
+Only one instance of this script should run at a time.
+'''
+
+## These two lines are needed to run on EL6
+__requires__ = ['SQLAlchemy >= 0.7', 'jinja2 >= 2.4']
+import pkg_resources
+
+import argparse
+import os
+import time
+
+
+if 'PKGDB2_CONFIG' not in os.environ \
+        and os.path.exists('/etc/pkgdb2/pkgdb2.cfg'):
+    print 'Using configuration file `/etc/pkgdb2/pkgdb2.cfg`'
+    os.environ['PKGDB2_CONFIG'] = '/etc/pkgdb2/pkgdb2.cfg'
+
+
+try:
+    import pkgdb2
+except ImportError:
+    import sys
+    sys.path.insert(
+        0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+    import pkgdb2
+
+import pkgdb2.lib.notifications as notify
+
+
+def get_arguments():
+    ''' Set the command line parser and retrieve the arguments provided
+    by the command line.
+    '''
+    parser = argparse.ArgumentParser(
+        description='pkgdb2_notifications')
+    parser.add_argument(
+        '--batch-size', dest='batch_size', type=int, default=100,
+        help='Number of notifications to send at once')
+    parser.add_argument(
+        '--interval', dest='interval', type=int, default=5,
+        help='Number of seconds to wait when there is nothing to send')
+    parser.add_argument(
+        '--once', dest='once', action='store_true', default=False,
+        help='Send the notifications waiting and exit')
+
+    return parser.parse_args()
+
+
+def main():
+    ''' Send the notifications stored in the database, batch after batch,
+    re-using the same connection to the SMTP server.
+    '''
+    args = get_arguments()
+
+    smtp = notify.SMTPConnection()
+    try:
+        while True:
+            sent = notify.dispatch(
+                pkgdb2.SESSION, batch_size=args.batch_size, smtp=smtp)
+            if sent < args.batch_size:
+                if args.once:
+                    break
+                # Nothing left to send, do not keep the SMTP connection
+                # opened while waiting
+                smtp.close()
+                time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        smtp.close()
+        pkgdb2.SESSION.remove()
+
+    return 0
+
+
+if __name__ == '__main__':
+    main()
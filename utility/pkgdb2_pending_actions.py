@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright © 2015  Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions
+# of the GNU General Public License v.2, or (at your option) any later
+# version.  This program is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY expressed or implied, including the
+# implied warranties of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.  You
+# should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# Any Red Hat trademarks that are incorporated in the source
+# code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission
+# of Red Hat, Inc.
+#
+
+'''
+Script to run (from a cron job) to move the admin actions Pending for more
+than 7 days to Awaiting Review.
+'''
+
+## These two lines are needed to run on EL6
+__requires__ = ['SQLAlchemy >= 0.7', 'jinja2 >= 2.4']
+import pkg_resources
+
+import argparse
+import os
+import sys
+
+from sqlalchemy.exc import SQLAlchemyError
+
+
+if 'PKGDB2_CONFIG' not in os.environ \
+        and os.path.exists('/etc/pkgdb2/pkgdb2.cfg'):
+    print 'Using configuration file `/etc/pkgdb2/pkgdb2.cfg`'
+    os.environ['PKGDB2_CONFIG'] = '/etc/pkgdb2/pkgdb2.cfg'
+
+
+try:
+    import pkgdb2
+except ImportError:
+    sys.path.insert(
+        0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+    import pkgdb2
+
+import pkgdb2.lib
+
+
+class FakeFasUser(object):
+    ''' Fake FAS user sent to pkgdb2 to behave as if we had logged in
+    normally.
+    We can do that since we are running directly from the host and thus
+    calling directly the internal method.
+    '''
+
+    def __init__(self, username):
+        ''' Instanciate a FakeFasUser object.
+
+        :arg username: the username of the user in FAS.
+        :type username: str
+
+        '''
+
+        self.username = username
+        self.groups = []
+        self.cla_done = True
+
+
+def get_arguments():
+    ''' Set the command line parser and retrieve the arguments provided
+    by the command line.
+    '''
+    parser = argparse.ArgumentParser(
+        description='pkgdb2_pending_actions')
+    parser.add_argument(
+        '--days', dest='days', type=int, default=7,
+        help='Number of days an action stays Pending')
+    parser.add_argument(
+        '--user', dest='user', default='pkgdb2',
+        help='Username recorded as performing the change')
+
+    return parser.parse_args()
+
+
+def main():
+    ''' Move the actions Pending for more than the specified number of
+    days to Awaiting Review. '''
+    args = get_arguments()
+
+    try:
+        messages = pkgdb2.lib.expire_pending_actions(
+            pkgdb2.SESSION, FakeFasUser(args.user), days=args.days)
+        pkgdb2.SESSION.commit()
+    except pkgdb2.lib.PkgdbException, err:
+        print err
+        return 1
+    except SQLAlchemyError, err:
+        pkgdb2.SESSION.rollback()
+        print err
+        return 1
+
+    for message in messages:
+        print message
+    print '%s actions moved to Awaiting Review' % len(messages)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,11 @@
 This script queries the summary and description information from
 yum's metadata and update the pgkdb2 database with them.
 
+The metadata of all the repositories of ``REPO_MAP`` are read first, the
+first repository providing a package wins, and the packages which changed
+are then updated at once. With ``--dry-run`` the changes are only
+reported.
+
 Background and history:
 https://fedorahosted.org/fedora-infrastructure/ticket/3792
 """
@@ -13,6 +18,7 @@ __requires__ = ['SQLAlchemy >= 0.7', 'jinja2 >= 2.4']
 import pkg_resources
 
 
+import argparse
 import contextlib
 import lzma
 import os
@@ -54,8 +60,8 @@ import pkgdb2
 import pkgdb2.lib
 
 
-BASE_URL = pkgdb2.config.fet('BASE_REPO_URL')
-VERSIONS = pkgdb2.config.get('REPO_MAP', [])
+BASE_URL = pkgdb2.APP.config.get('BASE_REPO_URL')
+VERSIONS = pkgdb2.APP.config.get('REPO_MAP', [])
 
 
 class User(object):
@@ -114,18 +120,48 @@ def decompress_primary_db(archive, location):
                 out.write(inp.read())
 
 
-def get_pkg_info(session, pkg_name):
-    ''' Query the sqlite database for the package specified. '''
-    pkg = session.query(Package).filter(Package.name == pkg_name).one()
-    return pkg
+def get_packages_info(db_url):
+    ''' Read the summary, description and upstream URL of all the packages
+    of the specified sqlite database in one query.
+
+    :arg db_url: the URL of the primary_db of the repository.
+    :returns: a dict associating the name of each package to a tuple
+        (summary, description, url).
+
+    '''
+    session = sessionmaker(bind=create_engine(db_url))()
+    packages = {}
+    try:
+        for name, summary, description, url in session.query(
+                Package.name, Package.summary, Package.description,
+                Package.url):
+            # The package may be there once per arch
+            packages.setdefault(name, (summary, description, url))
+    finally:
+        session.close()
+    return packages
+
+
+def get_arguments():
+    ''' Set the command line parser and retrieve the arguments provided
+    by the command line.
+    '''
+    parser = argparse.ArgumentParser(
+        description='update_package_info')
+    parser.add_argument(
+        '--dry-run', dest='dry_run', action='store_true', default=False,
+        help='Only report the changes, without applying them')
+
+    return parser.parse_args()
 
 
 def main():
+    args = get_arguments()
+
     working_dir = tempfile.mkdtemp()
     print working_dir
 
-    UNKNOWN = set()
-    KNOWN = set()
+    packages_info = {}
     for name, version in VERSIONS:
         print '%s: %s' % (name, version)
         base_url = BASE_URL % version
@@ -142,87 +178,33 @@ def main():
         dbfile = os.path.join(working_dir, 'primary_db_%s.sqlite' % name)
         decompress_primary_db(dbfile_xz, dbfile)
 
-        db_url = 'sqlite:///%s' % dbfile
-        db_session = sessionmaker(bind=create_engine(db_url))
-        session = db_session()
-
-        # Update the package in pkgdb
-        count = 0
-        updated = 0
-        if name == 'rawhide':
-            for pkg in pkgdb2.lib.search_package(
-                    pkgdb2.SESSION, '*', status='Approved'):
-
-                try:
-                    pkgobj = get_pkg_info(session, pkg.name)
-                except Exception, err:
-                    UNKNOWN.add(pkg.name)
-                    continue
-
-                if not pkgobj:
-                    UNKNOWN.add(pkg.name)
-                    continue
-
-                KNOWN.add(pkg.name)
-                msg = pkgdb2.lib.edit_package(
-                    session=pkgdb2.SESSION,
-                    package=pkg,
-                    pkg_summary=pkgobj.summary,
-                    pkg_description=pkgobj.description,
-                    pkg_upstream_url=pkgobj.url,
-                    user=User()
-                )
-                if msg:
-                    updated += 1
-        else:
-            tmp = set()
-            for pkgname in UNKNOWN:
-                pkg = pkgdb2.lib.search_package(
-                    pkgdb2.SESSION, pkgname, status='Approved')
-
-                if len(pkg) == 1:
-                    pkg = pkg[0]
-                else:
-                    print pkgname, pkg
-
-                try:
-                    pkgobj = get_pkg_info(session, pkg.name)
-                except Exception, err:
-                    tmp.add(pkg.name)
-                    continue
-
-                if not pkgobj:
-                    tmp.add(pkg.name)
-                    continue
-
-                KNOWN.add(pkg.name)
-                msg = pkgdb2.lib.edit_package(
-                    session=pkgdb2.SESSION,
-                    package=pkg,
-                    pkg_summary=pkgobj.summary,
-                    pkg_description=pkgobj.description,
-                    pkg_upstream_url=pkgobj.url,
-                    user=User()
-                )
-                if msg:
-                    updated += 1
-            # Add the package we didn't find here (in case)
-            UNKNOWN.update(tmp)
-            # Remove the ones we found
-            UNKNOWN.difference_update(KNOWN)
+        for pkg_name, info in get_packages_info(
+                'sqlite:///%s' % dbfile).items():
+            packages_info.setdefault(pkg_name, info)
 
+    # Drop the temp directory
+    shutil.rmtree(working_dir)
+
+    # Update the packages in pkgdb
+    changes, unknown = pkgdb2.lib.sync_package_info(
+        pkgdb2.SESSION, packages_info, User(), dry_run=args.dry_run)
+
+    if args.dry_run:
+        for change in changes:
+            print change['name']
+            for field in sorted(change['fields']):
+                old, new = change['fields'][field]
+                print '  %s: %r -> %r' % (field, old, new)
+        pkgdb2.SESSION.rollback()
+    else:
         pkgdb2.SESSION.commit()
 
-    print '%s packages found' % len(KNOWN)
-    print '%s packages updated' % updated
-    print '%s packages not found' % len(UNKNOWN)
-    for pkg in sorted(UNKNOWN)[:5]:
+    print '%s packages in the repositories' % len(packages_info)
+    print '%s packages updated' % len(changes)
+    print '%s packages not found' % len(unknown)
+    for pkg in unknown[:5]:
         print "No such package %s found in yum's metadata." % pkg
 
 
-    # Drop the temp directory
-    shutil.rmtree(working_dir)
-
-
 if __name__ == '__main__':
     main()